@@ -7,33 +7,11 @@ Created on Tue Oct 27 21:06:22 2020
 
 
 import numpy as np
+from hydrology import precipitation as ppt
+from hydrology import evaporation as evap
 
 
 # %%
-def thiessenPolygonEUD(area, precip) -> float:
-    """
-    Calculates Equivalent Uniform Depth of precipitation using
-    Thiessen Polygons
-
-    Parameters
-    ------------
-    area = list of area of individual Thiessen Polygons (km2)
-    precip = list of rain gauge readings from each Thiessen Polygon (mm)
-
-    Returns
-    ---------
-    EUD = EUD of entire watershed
-    """
-
-    area = np.array(area)
-    totalArea = np.sum(area)
-    precip = np.array(precip)
-
-    EUDsingles = precip*area/totalArea
-    EUD = np.sum(EUDsingles)
-    return EUD
-
-
 precipA = 17.3
 areaA = 125
 
@@ -62,7 +40,7 @@ areaList = [areaA, areaB, areaC, areaD, areaE, areaF, areaG, areaH]
 pptList = [precipA, precipB, precipC, precipD,
            precipE, precipF, precipG, precipH]
 
-thiessenEUD = thiessenPolygonEUD(areaList, pptList)
+thiessenEUD = ppt.thiessenPolygonEUD(areaList, pptList)
 # %%
 isohyeteBelow17 = np.array(17)
 areaBelow17 = 70
@@ -89,65 +67,35 @@ totalArea = np.sum([areaBelow17, area17_18, area18_19, area19_20, area20_21,
                     area21_22, area22])
 
 
-def isohyetalSinglesEUD(isohyetes, area) -> float:
-    """
-    Calculates Equivalent Uniform Depth of precipitation of a single region
-    between isohyetes. It does so by taking the mean of the isohyetes
-    and multiplying that by the area between the 2 isohyetes in the watershed
-    or the area bounded by that isohyete and the watershed
-
-
-    Parameters
-    -----------
-    isohyetes = numpy array of 1 or 2 isohyetes (mm)
-    area = area between isohyetes (km2)
-    """
-    isohyeteMean = np.mean(isohyetes)
-    EUDsingle = area*isohyeteMean/totalArea
-
-    return EUDsingle
-
-
-isohyetalEUD = np.sum([isohyetalSinglesEUD(isohyeteBelow17, areaBelow17),
-                       isohyetalSinglesEUD(isohyete17_18, area17_18),
-                       isohyetalSinglesEUD(isohyete18_19, area18_19),
-                       isohyetalSinglesEUD(isohyete19_20, area19_20),
-                       isohyetalSinglesEUD(isohyete20_21, area20_21),
-                       isohyetalSinglesEUD(isohyete21_22, area21_22),
-                       isohyetalSinglesEUD(isohyete22, area22)])
+isohyetalEUD = np.sum([ppt.isohyetalSinglesEUD(isohyeteBelow17, areaBelow17,
+                                               totalArea),
+                       ppt.isohyetalSinglesEUD(isohyete17_18, area17_18,
+                                               totalArea),
+                       ppt.isohyetalSinglesEUD(isohyete18_19, area18_19,
+                                               totalArea),
+                       ppt.isohyetalSinglesEUD(isohyete19_20, area19_20,
+                                               totalArea),
+                       ppt.isohyetalSinglesEUD(isohyete20_21, area20_21,
+                                               totalArea),
+                       ppt.isohyetalSinglesEUD(isohyete21_22, area21_22,
+                                               totalArea),
+                       ppt.isohyetalSinglesEUD(isohyete22, area22,
+                                               totalArea)])
 # %%
+# Air temperature and dewpoint are in degrees Celsius, wind speed is in
+# miles/hour
+airTemp = 21
+dewpoint = 11
+windSpeed = 2.1
 
-
-def vaporPressure(temp: float) -> float:
-    """Calculates the saturation vapor pressure of water at a particular
-    temperature using the Clausius-Clayperon equation
-
-    Parameter
-    ----------
-    temp = air temperature in degrees Celsius
-
-    Returns
-    --------
-    vp = vapor pressure in Pascal"""
-    exponent = (17.27*temp)/(temp + 237.3)
-    vp = 611*np.exp(exponent)
-
-    return vp
-
-
-saturationVP_Pa = vaporPressure(21)
+saturationVP_Pa = evap.vaporPressure(airTemp)
 saturationVP_inHg = saturationVP_Pa*2.9533*(10**(-4))
-actualVP_Pa = vaporPressure(11)
+actualVP_Pa = evap.vaporPressure(dewpoint)
 actualVP_inHg = actualVP_Pa*2.9533*(10**(-4))
 actualVP_mb = actualVP_Pa/100
 
-RH = 100*actualVP_Pa/saturationVP_Pa
-
-# The units of the evaporation rate in the Meyer equation are inches/day
-evapoMeyer_in = 0.36*(saturationVP_inHg - actualVP_inHg)*(1 + (2.1/10))
-
-# Conversion of rate to cm/day
-evapoMeyer = evapoMeyer_in*2.54
+RH = evap.relativeHumidity(actualVP_Pa, saturationVP_Pa)
 
-# units of evaporation rate in Dunne equation is in cm/day
-evapoDunne = (0.013 + (0.00016*2.1*1.61*24))*actualVP_mb*((100 - RH)/100)
+# units of evaporation rates in the Meyer and Dunne equations are in cm/day
+evapoMeyer = evap.meyerEvaporation(saturationVP_Pa, actualVP_Pa, windSpeed)
+evapoDunne = evap.dunneEvaporation(actualVP_Pa, RH, windSpeed)
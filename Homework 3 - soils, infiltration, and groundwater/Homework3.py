@@ -6,9 +6,10 @@ Created on Sun Nov 15 01:41:49 2020
 Contains my work for Homework 3
 """
 
-import infiltration as infil
+from hydrology import infiltration as infil
+from hydrology import uncertainty as unc
 import matplotlib.pyplot as py
-from scipy import optimize as op
+import numpy as np
 # %%
 # Question 1: characterizing soils
 
@@ -94,34 +95,12 @@ pondingTime = infil.timep(Fp, rainfallRate)
 # of the storm, total amount of runoff, infiltration rates at the beginning and
 # end of the storm
 totalRain = rainfallRate*rainDuration
-
-
-def stormEndOptimize(totalInfiltration):
-    """This function calls the infiltration.stormEnd() method and will be fed
-    into the root-finding algorithms to solve for roots (the total amount
-    infiltrated by the end of the storm)
-
-    Parameters
-    ----------
-    totalInfiltration = the total amount infiltrated BY THE END OF THE STORM;
-    the root of the function to be solved for (length)
-
-    Returns
-    -------
-    time = the 'time' when the total amount infiltrated is totalInfiltration;
-    should be 0 if properly optimized (hours, minutes, seconds)
-    """
-    time = infil.stormEnd(pondingTime, Ksat, totalInfiltration, Fp, presHead,
-                          thetaSat, thetaInit, rainDuration)
-    return time
-
-
-rootResults = op.root(stormEndOptimize, 1.4)
-# rootResults.x is a numpy array of size 1 so I coerced it into a float
-finalF = float(rootResults.x)
+stormResults = infil.stormEndBatch(Ksat, presHead, thetaSat, thetaInit,
+                                   rainfallRate, rainDuration)
+# stormEndBatch() returns numpy arrays of size 1 so I coerced them into floats
+finalF = float(stormResults[0])
+finalInfilRate = float(stormResults[2])
 runoffHeight = totalRain - finalF
-finalInfilRate = infil.infilRateGA(Ksat, presHead, thetaSat,
-                                   thetaInit, finalF, pondingTime)
 
 # Making a numpy 2-D array of values to plot infiltration rate vs time
 # I define the "critical point" as the point when the infiltration capacity
@@ -140,3 +119,19 @@ greenAmptSubplot.set_xlabel(figureXaxis)
 greenAmptSubplot.set_ylabel(figureYaxis)
 greenAmptSubplot.plot(plotValues[0, :], plotValues[1, :])
 greenAmptFigure.savefig("Green-Ampt model infiltration rate")
+# %%
+# Uncertainty in the Green-Ampt results. The soil parameters above are only
+# estimates, so here they're treated as random: Ks and the pressure head are
+# lognormal (and negatively correlated, since finer soils have lower Ks and
+# stronger suction), and the water contents are normal
+parameterDistributions = {"Ks": ("lognormal", np.log(Ksat), 0.5),
+                          "presHead": ("lognormal", np.log(presHead), 0.3),
+                          "thetaSat": ("normal", thetaSat, 0.02),
+                          "thetaInit": ("normal", thetaInit, 0.03)}
+parameterCorrelation = np.eye(4)
+parameterCorrelation[0, 1] = parameterCorrelation[1, 0] = -0.6
+uncertaintyResults = unc.greenAmptMonteCarlo(parameterDistributions,
+                                             rainfallRate, rainDuration,
+                                             200000, parameterCorrelation,
+                                             seed=132)
+runoffQuantiles = uncertaintyResults["runoff"]["quantiles"]
@@ -6,8 +6,7 @@ Created on Wed Nov 18 10:06:39 2020
 Contains my work for the week 7 discussion section
 """
 
-import infiltration as infil
-import scipy.optimize as opti
+from hydrology import infiltration as infil
 import matplotlib.pyplot as py
 
 # Units of time are in hours
@@ -25,20 +24,10 @@ satContent = 0.5
 Fp = infil.Fpond(presHead, Ksat, satContent, initContent, precipRate)
 pondingTime = infil.timep(Fp, precipRate)
 
-
-def stormEndOptimize(totalInfiltration):
-    """Gets plugged into root-finding algorithms to be optimized to solve
-    for the amount of infiltration at the end
-    """
-    time = infil.stormEnd(pondingTime, Ksat, totalInfiltration, Fp, presHead,
-                          satContent, initContent, stormDuration)
-    return time
-
-
-rootResults = opti.root(stormEndOptimize, 1.66)
-endingInfiltrationTotal = float(rootResults.x)
-endingInfilRate = infil.infilRateGA(Ksat, presHead, satContent, initContent,
-                                    endingInfiltrationTotal, pondingTime)
+stormResults = infil.stormEndBatch(Ksat, presHead, satContent, initContent,
+                                   precipRate, stormDuration)
+endingInfiltrationTotal = float(stormResults[0])
+endingInfilRate = float(stormResults[2])
 infilAfterPonding = endingInfiltrationTotal - Fp
 totalRain = precipRate*stormDuration
 runOff = totalRain - endingInfiltrationTotal
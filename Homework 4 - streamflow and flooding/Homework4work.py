@@ -6,7 +6,8 @@ Created on Wed Dec  2 23:15:59 2020
 This script carries out my work for homework 4
 """
 # Importing necessary libraries
-import streamflow as sf
+from hydrology import streamflow as sf
+from hydrology import workbooks
 import pandas as pd
 import matplotlib.pyplot as py
 # %%
@@ -42,22 +43,28 @@ runoffLandscaping = (Qlandscaping/12)*areaLandscaping
 totalRunoffInitial = runoffForestInitial
 totalRunoffFinal = runoffForestFinal + runoffDeveloped + runoffLandscaping
 
-# b) Calculating percent change in runoff after development
-runoffChange = 100*(totalRunoffFinal - totalRunoffInitial)/totalRunoffInitial
+# b) Calculating percent change in runoff after development. Scenario 0 is
+# the land before development and scenario 1 is the land after development
+parcelAreas = [areaForestInitial, areaForestFinal, areaDeveloped,
+               areaLandscaping]
+parcelCNs = [CNforest, CNforest, CNdeveloped, CNlandscaping]
+parcelScenarios = [0, 1, 1, 1]
+scenarioResults = sf.scenarioRunoff(parcelAreas, parcelCNs, parcelScenarios,
+                                    precip)
+runoffChange = float(scenarioResults[2][1, 0])
 
 # %%
 # Question 2: Making & using a unit hydrograph to predict streamflow after
 # a hypothetical storm
-unitHydro = pd.read_excel(io="Homework 4 hydrograph example.xlsx",
-                          sheet_name="Making unit hydrograph")
+# every sheet of the workbook is parsed once and cached
+hydrographSheets = workbooks.readWorkbook("Homework 4 hydrograph example.xlsx")
+unitHydro = hydrographSheets["Making unit hydrograph"]
 unitHydro["DataframeNum"] = 1
 unitHydroCols = unitHydro.columns.tolist()
-newStorm = pd.read_excel(io="Homework 4 hydrograph example.xlsx",
-                         sheet_name="New storm hyetograph")
+newStorm = hydrographSheets["New storm hyetograph"]
 newStorm["DataframeNum"] = 2
 newHyetoCols = newStorm.columns.tolist()
-newHydro = pd.read_excel(io="Homework 4 hydrograph example.xlsx",
-                         sheet_name="New storm hydrograph")
+newHydro = hydrographSheets["New storm hydrograph"]
 newHydrographColumns = newHydro.columns.tolist()
 newName = "Unit hydrograph (m3/sec for 1cm of runoff)"
 newColumn = {unitHydroCols[3]: newName}
@@ -104,14 +111,18 @@ stormDuration = interval*4  # hours
 intervalInfil = totalInfil*interval/stormDuration
 newStorm[newHyetoCols[3]] = newStorm["Total rainfall (cm)"] - intervalInfil
 
-# So it turns out that calculating the streamflow for the new storm is
-# exceedingly difficult, so imma just export the first 2 dataframes into new
-# Excel files and then finish the math in Excel instead
-unitHydro.to_excel("Homework 4 unit hydrograph.xlsx")
-newStorm.to_excel("Homework 4 new storm hyetograph.xlsx")
-
-# Now, time to plot the modeled streamflow that I worked out in Excel
-model = pd.read_excel("Homework 4 unit hydrograph - fully worked out.xlsx")
+# Calculating the streamflow for the new storm by convolving the unit
+# hydrograph with the effective rainfall. The unit hydrograph has 1 hour
+# ordinates while the hyetograph has 2 hour intervals, so each pulse of
+# effective rainfall starts 2 ordinates after the previous one
+baseflow = 50  # m3/sec
+modelFlow = sf.stormHydrograph(unitHydro[newName].to_numpy(),
+                               newStorm[newHyetoCols[3]].to_numpy(),
+                               baseflow, pulseSpacing=interval)
+model = pd.DataFrame({"Time (hrs)": range(modelFlow.size),
+                      "Streamflow (m3/s)": modelFlow})
+
+# Now, time to plot the modeled streamflow
 py.figure(num=2, figsize=(8, 6))
 py.title("Modeled streamflow")
 py.xlabel("Time (hrs)")
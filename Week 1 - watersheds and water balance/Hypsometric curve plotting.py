@@ -7,20 +7,21 @@ Created on Mon Oct  5 17:59:39 2020
 # %%
 import pandas as pd
 import matplotlib.pyplot as py
+from hydrology import hypsometry as hypso
+from hydrology import workbooks
 
-pd.set_option("max_columns", None)
+pd.set_option("display.max_columns", None)
 # %%
-hypsometricData = pd.read_excel("Week 1 - Hypsometric curve data.xlsx")
+# the workbook is parsed once and cached; numpy-backed columns are kept so
+# the cumulative areas come back as a pandas series
+hypsometricData = workbooks.readWorkbook("Week 1 - Hypsometric curve data.xlsx",
+                                         sheetName="Sheet1",
+                                         arrowBacked=False)
 
 areaInAltRange = hypsometricData["Area within altitude range (km2)"]
-cumulAreaInAltRange = hypsometricData["Cumulative area above lower altitude (km2)"]
 print(hypsometricData.head())
 
-for index, value in areaInAltRange.iteritems():
-    areaValues = areaInAltRange.iloc[:index + 1]
-    cumulArea = areaValues.sum()
-    cumulAreaInAltRange.iloc[index] = cumulArea
-
+cumulAreaInAltRange = hypso.cumulativeAreaAbove(areaInAltRange)
 
 hypsometricData["Cumulative area above lower altitude (km2)"] = cumulAreaInAltRange
 
@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the hot paths of the hydrology modules: the Green-Ampt and
+Horton infiltration functions, the SCS Curve Number runoff, Thiessen polygon
+EUDs, vapor pressure, and hypsometric cumulative areas. Each benchmark is
+timed at several array sizes, and its throughput (elements per second) and
+peak memory (from tracemalloc, which numpy reports its arrays to) are
+compared against the stored baselines in baselines.json. Throughput is
+stored relative to a simple numpy reference kernel at the same size, timed
+in samples that alternate with the benchmark's so that both see the same
+machine load, and the baselines carry over between machines. The relative
+throughput is the median of the ratios of the paired samples, and only sizes
+of at least --gate-size (1e4 by default) fail on a throughput drop, since the
+runs at smaller sizes are short enough for timing noise to dominate. A
+benchmark whose throughput drops is rerun (--retries times) before the drop
+is reported. The script reruns itself with glibc's malloc thresholds fixed
+(see allocatorSettings), since otherwise the speed of a benchmark depends on
+the sizes of the earlier ones. The homework inputs are checked first as small
+correctness fixtures, and every submodule of the hydrology package is checked
+against an import-time budget.
+
+Run from anywhere with:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 1e3,1e5,1e8
+    python benchmarks/run_benchmarks.py --update-baselines
+
+The script exits with status 1 if a fixture gives the wrong answer, if a
+submodule takes longer than the budget to import or imports one of the
+libraries that should only load on first use, if a result differs from its
+baseline, or if throughput drops or peak memory grows by more than the
+tolerance.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+repoRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoRoot)
+
+import hydrology  # noqa: E402
+from hydrology import evaporation as evap  # noqa: E402
+from hydrology import hypsometry as hypso  # noqa: E402
+from hydrology import infiltration as infil  # noqa: E402
+from hydrology import precipitation as ppt  # noqa: E402
+from hydrology import streamflow as sf  # noqa: E402
+
+baselinePath = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "baselines.json")
+# %%
+# Correctness fixtures from the homework
+
+
+def checkFixtures():
+    """Runs the homework inputs through the functions and compares them with
+    the answers worked out in the homework
+
+    Returns
+    -------
+    failures = list of strings describing each fixture that failed
+    """
+    checks = []
+
+    # homework 3, question 3 (Green-Ampt)
+    Fp = infil.Fpond(20.8, 0.032, 0.5, 0.15, 0.7)
+    tp = infil.timep(Fp, 0.7)
+    finalF, _, finalRate = infil.stormEndBatch(0.032, 20.8, 0.5, 0.15, 0.7, 4)
+    checks += [("HW3 Fpond", Fp, 0.3487425149700599),
+               ("HW3 timep", tp, 0.4982035928143714),
+               ("HW3 end-of-storm F", finalF, 1.4039454583284972),
+               ("HW3 end-of-storm rate", finalRate, 0.19793237195792238),
+               ("HW3 stormEnd residual",
+                infil.stormEnd(tp, 0.032, 1.4039454583284972, Fp, 20.8, 0.5,
+                               0.15, 4), 0.0)]
+
+    # week 7 discussion (Green-Ampt)
+    finalF = infil.stormEndBatch(0.1, 15, 0.5, 0.15, 0.6, 3)[0]
+    checks.append(("Week 7 end-of-storm F", finalF, 1.6608532725362994))
+
+    # homework 3, question 2 (Horton)
+    timeCrit = infil.kOrt(8, 1, 2, 1.1, "t")[1]
+    checks += [("HW3 Horton critical time", timeCrit, 1.7690092264139212),
+               ("HW3 Horton infiltration after critical time",
+                infil.totalInfilHorton2time(8, 1, 1.1, timeCrit, 4),
+                3.0619531560210977)]
+
+    # homework 4, question 1 (Curve Number)
+    checks += [("HW4 Q forest", sf.QfromP_CN(4.8, 55), 0.882167832167832),
+               ("HW4 Q developed", sf.QfromP_CN(4.8, 98), 4.563493555316863),
+               ("HW4 Q landscaping", sf.QfromP_CN(4.8, 70),
+                1.8892857142857142)]
+
+    # homework 2 (EUD and evaporation)
+    checks += [("HW2 Thiessen EUD",
+                ppt.thiessenPolygonEUD([125, 310, 190, 210, 290, 130, 205,
+                                        105],
+                                       [17.3, 18.6, 20.1, 22.7, 21.3, 19.8,
+                                        18.1, 16.9]), 19.64888178913738),
+               ("HW2 vapor pressure at 21 C", evap.vaporPressure(21),
+                2487.8197408886)]
+
+    # week 1 (hypsometric curve workbook)
+    areas = [8.4, 10.9, 15.6, 11.3, 9.2, 8.4, 5.7, 6.4, 4.3, 2.4, 1.5]
+    checks.append(("Week 1 total area", hypso.cumulativeAreaAbove(areas)[-1],
+                   84.1))
+
+    failures = []
+    for name, value, expected in checks:
+        if not np.isclose(float(value), expected, rtol=1e-8, atol=1e-9):
+            failures.append(f"{name}: got {float(value)!r}, "
+                            f"expected {expected!r}")
+    return failures
+# %%
+# Benchmarks. Each one takes an array size and returns a function that runs
+# the benchmark once and returns its result
+
+
+def benchStormEnd(n, rng):
+    Ks = rng.uniform(0.01, 1, n)
+    presHead = rng.uniform(5, 30, n)
+    thetaInit = rng.uniform(0.1, 0.4, n)
+    rate = Ks + rng.uniform(0.1, 2, n)
+    Fp = infil.Fpond(presHead, Ks, 0.5, thetaInit, rate)
+    tp = infil.timep(Fp, rate)
+    F = Fp*rng.uniform(1, 5, n)
+    return lambda: infil.stormEnd(tp, Ks, F, Fp, presHead, 0.5, thetaInit, 4)
+
+
+def benchStormEndBatch(n, rng):
+    Ks = rng.uniform(0.01, 1, n)
+    presHead = rng.uniform(5, 30, n)
+    thetaInit = rng.uniform(0.1, 0.4, n)
+    rate = rng.uniform(0.1, 3, n)
+    duration = rng.uniform(0.5, 48, n)
+    return lambda: infil.stormEndBatch(Ks, presHead, 0.5, thetaInit, rate,
+                                       duration)[0]
+
+
+def benchGreenAmptFast(n, rng):
+    Ks = rng.uniform(0.01, 1, n)
+    presHead = rng.uniform(5, 30, n)
+    thetaInit = rng.uniform(0.1, 0.4, n)
+    rate = rng.uniform(0.1, 3, n)
+    t = rng.uniform(0.5, 48, n)
+    return lambda: infil.greenAmptFast(t, Ks, presHead, 0.5, thetaInit,
+                                       rate)[0]
+
+
+def benchInfilRateGA(n, rng):
+    Ks = rng.uniform(0.01, 1, n)
+    presHead = rng.uniform(5, 30, n)
+    F = rng.uniform(0.1, 10, n)
+    return lambda: infil.infilRateGA(Ks, presHead, 0.5, 0.2, F, 0)
+
+
+def benchGraphData(n, rng):
+    # graphData() makes 100 points per call, so n/100 calls are timed
+    nCalls = max(n//100, 1)
+    Ks = rng.uniform(0.01, 0.5, nCalls)
+    rate = Ks + rng.uniform(0.2, 2, nCalls)
+    finalF = infil.stormEndBatch(Ks, 20, 0.5, 0.2, rate, 24)[0]
+    return lambda: np.concatenate(
+        [infil.graphData(finalF[call], rate[call], Ks[call], 20, 0.5, 0.2)[1]
+         for call in range(nCalls)])
+
+
+def benchGraphDataAdaptive(n, rng):
+    # the same curves as benchGraphData, sampled to within 1e-3 cm/hr
+    nCalls = max(n//100, 1)
+    Ks = rng.uniform(0.01, 0.5, nCalls)
+    rate = Ks + rng.uniform(0.2, 2, nCalls)
+    finalF = infil.stormEndBatch(Ks, 20, 0.5, 0.2, rate, 24)[0]
+    return lambda: np.concatenate(
+        [infil.graphData(finalF[call], rate[call], Ks[call], 20, 0.5, 0.2,
+                         tol=1e-3)[1]
+         for call in range(nCalls)])
+
+
+def benchHortonCapacity(n, rng):
+    t = rng.uniform(0, 10, n)
+    return lambda: infil.infilCapaHorton(8, 1, 1.1, t)
+
+
+def benchHortonTotal1(n, rng):
+    t = rng.uniform(0, 10, n)
+    return lambda: infil.totalInfilHorton1time(8, 1, 1.1, t)
+
+
+def benchHortonTotal2(n, rng):
+    t1 = rng.uniform(0, 5, n)
+    t2 = t1 + rng.uniform(0, 5, n)
+    return lambda: infil.totalInfilHorton2time(8, 1, 1.1, t1, t2)
+
+
+def benchQfromP_CN(n, rng):
+    P = rng.exponential(1, n)
+    CN = rng.uniform(30, 100, n)
+    return lambda: sf.QfromP_CN(P, CN)
+
+
+def benchThiessen(n, rng):
+    area = rng.uniform(1, 100, n)
+    precip = rng.uniform(0, 50, n)
+    return lambda: ppt.thiessenPolygonEUD(area, precip)
+
+
+def benchVaporPressure(n, rng):
+    temp = rng.uniform(-10, 40, n)
+    return lambda: evap.vaporPressure(temp)
+
+
+def benchCumulativeArea(n, rng):
+    area = rng.uniform(0, 10, n)
+    return lambda: hypso.cumulativeAreaAbove(area)
+
+
+# name: (benchmark, largest size it runs at)
+benchmarks = {"infiltration.stormEnd": (benchStormEnd, 10**8),
+              "infiltration.stormEndBatch": (benchStormEndBatch, 10**8),
+              "infiltration.greenAmptFast": (benchGreenAmptFast, 10**8),
+              "infiltration.infilRateGA": (benchInfilRateGA, 10**8),
+              "infiltration.graphData": (benchGraphData, 10**6),
+              "infiltration.graphDataAdaptive": (benchGraphDataAdaptive,
+                                                 10**6),
+              "infiltration.infilCapaHorton": (benchHortonCapacity, 10**8),
+              "infiltration.totalInfilHorton1time": (benchHortonTotal1,
+                                                     10**8),
+              "infiltration.totalInfilHorton2time": (benchHortonTotal2,
+                                                     10**8),
+              "streamflow.QfromP_CN": (benchQfromP_CN, 10**8),
+              "precipitation.thiessenPolygonEUD": (benchThiessen, 10**8),
+              "evaporation.vaporPressure": (benchVaporPressure, 10**8),
+              "hypsometry.cumulativeAreaAbove": (benchCumulativeArea, 10**8)}
+# %%
+# Import-time budget
+
+# longest time a submodule may take to import on top of numpy (seconds)
+importBudget = 0.02
+# libraries that submodules only import inside the functions that use them
+lazyLibraries = ("scipy", "pandas", "pyarrow", "matplotlib")
+# imports numpy, then times the import of a submodule and lists the lazy
+# libraries that it pulled in
+_importScript = """
+import sys, time
+import numpy
+started = time.perf_counter()
+import hydrology.{name}
+elapsed = time.perf_counter() - started
+loaded = [name for name in {lazy!r} if name in sys.modules]
+print(elapsed, *loaded)
+"""
+
+
+def timeImport(name, repeats=5):
+    """Times the import of a submodule of the hydrology package in fresh
+    Python processes, keeping the fastest of several runs
+
+    Parameters
+    ----------
+    name = name of the submodule
+    repeats = number of processes to time it in
+
+    Returns
+    -------
+    elapsed = fastest import time (seconds)
+    loaded = list of the lazy libraries that the import pulled in
+    """
+    script = _importScript.format(name=name, lazy=lazyLibraries)
+    environment = dict(os.environ, PYTHONPATH=repoRoot)
+    environment.pop("HYDROLOGY_PROFILE", None)
+    times = []
+    for repeat in range(repeats):
+        output = subprocess.run([sys.executable, "-c", script],
+                                capture_output=True, text=True, check=True,
+                                env=environment).stdout.split()
+        times.append(float(output[0]))
+        loaded = output[1:]
+    return min(times), loaded
+
+
+def checkImports():
+    """Times the import of every submodule of the hydrology package and
+    compares it with the budget
+
+    Returns
+    -------
+    failures = list of strings describing each submodule over its budget
+    """
+    failures = []
+    print(f"{'import':40s} {'ms':>8s}")
+    for name in hydrology.__all__:
+        elapsed, loaded = timeImport(name)
+        print(f"{'hydrology.' + name:40s} {elapsed*1e3:8.1f}")
+        if elapsed > importBudget:
+            failures.append(f"hydrology.{name}: import took "
+                            f"{elapsed*1e3:.1f} ms, over the budget of "
+                            f"{importBudget*1e3:.0f} ms")
+        if loaded:
+            failures.append(f"hydrology.{name}: importing it loaded "
+                            f"{', '.join(loaded)}")
+    return failures
+# %%
+# Timing and comparing with baselines
+
+
+def _runsPerSample(run, sampleTime):
+    """Doubles the number of back-to-back runs until they last at least
+    sampleTime seconds, so that short runs aren't lost in timer noise"""
+    runs = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(runs):
+            run()
+        if time.perf_counter() - started >= sampleTime:
+            return runs
+        runs *= 2
+
+
+def _sampleTime(run, runs):
+    """Returns the time of a single run averaged over a sample (seconds)"""
+    started = time.perf_counter()
+    for _ in range(runs):
+        run()
+    return (time.perf_counter() - started)/runs
+
+
+def interleavedTimes(run, reference, minTime=0.2, sampleTime=1e-3):
+    """Times a function and a reference function in alternating samples
+    until minTime seconds have passed (at least 5 pairs of samples), so that
+    both see the same machine load
+
+    Parameters
+    ----------
+    run = function to time
+    reference = reference function, timed between the samples of run
+    minTime = least amount of time spent repeating the samples (seconds)
+    sampleTime = least length of a single sample (seconds)
+
+    Returns
+    -------
+    time = median time of a single run (seconds)
+    ratio = median over the pairs of samples of the reference time divided by
+    the run time
+    """
+    runs = _runsPerSample(run, sampleTime)
+    referenceRuns = _runsPerSample(reference, sampleTime)
+
+    times, ratios = [], []
+    started = time.perf_counter()
+    while len(times) < 5 or time.perf_counter() - started < minTime:
+        times.append(_sampleTime(run, runs))
+        ratios.append(_sampleTime(reference, referenceRuns)/times[-1])
+    return float(np.median(times)), float(np.median(ratios))
+
+
+def referenceKernel(n):
+    """Returns the reference kernel, sqrt(x*x + 1) on an array of n floats,
+    which the benchmarks' throughputs are divided by"""
+    x = np.random.default_rng(0).uniform(1, 2, n)
+    return lambda: np.sqrt(x*x + 1.0)
+
+
+def runBenchmark(benchmark, n, minTime=0.2):
+    """Times a benchmark at an array size with interleavedTimes(), which
+    alternates its samples with those of the reference kernel and keeps the
+    medians
+
+    Parameters
+    ----------
+    benchmark = benchmark function from the benchmarks dict
+    n = array size
+    minTime = least amount of time spent repeating the benchmark (seconds)
+
+    Returns
+    -------
+    record = dict of the throughput (elements/second), the throughput
+    relative to the reference kernel at the same size, the peak memory of a
+    single run (bytes), and a checksum of the result
+    """
+    rng = np.random.default_rng(0)
+    run = benchmark(n, rng)
+
+    tracemalloc.start()
+    result = run()
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    runTime, relativeThroughput = interleavedTimes(run, referenceKernel(n),
+                                                   minTime)
+    record = {"throughput": n/runTime,
+              "relativeThroughput": relativeThroughput,
+              "peakMemory": peakMemory,
+              "checksum": float(np.nansum(np.asarray(result, dtype=float)))}
+    return record
+
+
+def throughputDropped(record, baseline, tolerance):
+    """Returns True if the relative throughput of a record is more than the
+    tolerance below its baseline"""
+    return (record["relativeThroughput"]
+            < baseline["relativeThroughput"]*(1 - tolerance))
+
+
+def compare(name, size, record, baseline, tolerance, checkThroughput=True):
+    """Compares a benchmark's record with its baseline. The checksum and peak
+    memory are always compared, and the throughput only if checkThroughput
+    is True
+
+    Returns
+    -------
+    failures = list of strings describing each regression
+    """
+    failures = []
+    label = f"{name} @ {size:.0e}"
+    if not np.isclose(record["checksum"], baseline["checksum"], rtol=1e-6):
+        failures.append(f"{label}: result checksum {record['checksum']!r} "
+                        f"differs from baseline {baseline['checksum']!r}")
+    if checkThroughput and throughputDropped(record, baseline, tolerance):
+        failures.append(f"{label}: throughput "
+                        f"{record['relativeThroughput']:.3g} x reference is "
+                        f"below baseline "
+                        f"{baseline['relativeThroughput']:.3g} x reference")
+    if record["peakMemory"] > baseline["peakMemory"]*(1 + tolerance) + 4096:
+        failures.append(f"{label}: peak memory {record['peakMemory']} B is "
+                        f"above baseline {baseline['peakMemory']} B")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1e3,1e4,1e5,1e6",
+                        help="comma-separated array sizes (default: "
+                             "1e3,1e4,1e5,1e6)")
+    parser.add_argument("--only", default=None,
+                        help="only run benchmarks whose names contain this")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed fractional drop in throughput or "
+                             "growth in peak memory (default: 0.5)")
+    parser.add_argument("--gate-size", type=float, default=1e4,
+                        help="smallest size whose throughput is checked "
+                             "against the baseline; smaller sizes are only "
+                             "reported, since timing noise dominates them "
+                             "(default: 1e4)")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="number of times a benchmark whose throughput "
+                             "dropped below its baseline is rerun, with fresh "
+                             "inputs, before the drop is reported "
+                             "(default: 2)")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="store these results as the new baselines")
+    parser.add_argument("--skip-imports", action="store_true",
+                        help="don't check the import-time budget")
+    args = parser.parse_args()
+    sizes = [int(float(size)) for size in args.sizes.split(",")]
+
+    failures = checkFixtures()
+    for failure in failures:
+        print("FIXTURE FAILED:", failure)
+
+    if not args.skip_imports:
+        importFailures = checkImports()
+        for failure in importFailures:
+            print("IMPORT BUDGET:", failure)
+        failures += importFailures
+
+    baselines = {}
+    if os.path.exists(baselinePath):
+        with open(baselinePath) as file:
+            baselines = json.load(file)
+
+    print(f"{'benchmark':40s} {'size':>8s} {'elements/s':>12s} "
+          f"{'x reference':>12s} {'peak MB':>9s}")
+    for name, (benchmark, largest) in benchmarks.items():
+        if args.only is not None and args.only not in name:
+            continue
+        for size in sizes:
+            if size > largest:
+                continue
+            key = str(size)
+            baseline = baselines.get(name, {}).get(key)
+            gated = size >= args.gate_size
+            record = runBenchmark(benchmark, size)
+            # a slow run is rerun before it's reported, since a real
+            # regression is slow every time and a busy machine is not
+            for _ in range(args.retries):
+                if (args.update_baselines or baseline is None or not gated
+                        or not throughputDropped(record, baseline,
+                                                 args.tolerance)):
+                    break
+                retry = runBenchmark(benchmark, size)
+                if retry["relativeThroughput"] > record["relativeThroughput"]:
+                    record = retry
+            print(f"{name:40s} {size:8.0e} {record['throughput']:12.4g} "
+                  f"{record['relativeThroughput']:12.4g} "
+                  f"{record['peakMemory']/1e6:9.2f}"
+                  + ("" if gated else "  (not gated)"))
+            if args.update_baselines:
+                # absolute throughput depends on the machine, so it isn't kept
+                baselines.setdefault(name, {})[key] = {
+                    field: record[field] for field in (
+                        "relativeThroughput", "peakMemory", "checksum")}
+            elif baseline is not None:
+                failures += compare(name, size, record, baseline,
+                                    args.tolerance, checkThroughput=gated)
+
+    if args.update_baselines:
+        with open(baselinePath, "w") as file:
+            json.dump(baselines, file, indent=1, sort_keys=True)
+        print("baselines written to", baselinePath)
+
+    for failure in failures:
+        print("REGRESSION:", failure)
+    return 1 if failures else 0
+
+
+# glibc's malloc returns freed memory to the system, or hands out new
+# mmap'd pages, depending on the sizes of the earlier allocations, so
+# the same benchmark can run at half speed after a different set of earlier
+# benchmarks. Fixing both thresholds keeps the timings independent of the
+# order and sizes the benchmarks run in; other allocators ignore them.
+allocatorSettings = {"MALLOC_TRIM_THRESHOLD_": str(2**28),
+                     "MALLOC_MMAP_THRESHOLD_": str(2**25)}
+
+
+if __name__ == "__main__":
+    if any(os.environ.get(key) != value
+           for key, value in allocatorSettings.items()):
+        os.environ.update(allocatorSettings)
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+    sys.exit(main())
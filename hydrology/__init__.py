@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this package is to collect the hydrology code of the
+homeworks and weeks of ESS 132 into one library that scripts can import,
+e.g.
+    from hydrology import infiltration as infil
+    import hydrology
+    hydrology.streamflow.QfromP_CN(P, CN)
+
+Submodules are only imported when they are first used, and they import
+scipy, pandas, pyarrow and matplotlib inside the functions that need them, so
+importing the package or one of its submodules stays fast. The import time of
+every submodule is checked against a budget by benchmarks/run_benchmarks.py
+"""
+
+import importlib
+
+__version__ = "0.1.0"
+
+__all__ = ["evaporation", "hypsometry", "infiltration", "instrumentation",
+           "parallel", "pipeline", "plots", "precipitation", "soils",
+           "streamflow", "uncertainty", "waterBalance", "workbooks"]
+
+
+def __getattr__(name):
+    """Imports a submodule the first time it is used as an attribute of the
+    package
+
+    Parameters
+    ----------
+    name = name of the submodule
+
+    Returns
+    -------
+    module = the submodule
+
+    """
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to calculate vapor pressures and evaporation
+rates from open water (lakes and evaporation pans) using the Meyer, Dunne,
+and Penman equations. Every function works on floats or on whole columns of
+station data as numpy arrays. This module can be imported by other scripts,
+which would then use the methods within this module
+"""
+
+import numpy as np
+
+# %%
+# Vapor pressure and humidity
+
+
+def vaporPressure(temp, out=None):
+    """Calculates the saturation vapor pressure of water at a particular
+    temperature using the Clausius-Clayperon equation. The actual vapor
+    pressure of the air is the saturation vapor pressure at the dewpoint
+
+    Parameter
+    ----------
+    temp = air temperature (or dewpoint) in degrees Celsius
+    out = optional numpy array that the vapor pressure is written into, so
+    that no new arrays are made
+
+    Returns
+    --------
+    vp = vapor pressure in Pascal"""
+    if out is None:
+        exponent = (17.27*temp)/(temp + 237.3)
+        vp = 611*np.exp(exponent)
+        return vp
+
+    np.add(temp, 237.3, out=out)
+    np.divide(temp, out, out=out)
+    np.multiply(out, 17.27, out=out)
+    np.exp(out, out=out)
+    np.multiply(out, 611, out=out)
+    return out
+
+
+def relativeHumidity(actualVP, saturationVP):
+    """Calculates the relative humidity of the air
+
+    Parameters
+    ----------
+    actualVP = actual vapor pressure of the air (any pressure unit)
+    saturationVP = saturation vapor pressure at the air temperature (same unit)
+
+    Returns
+    -------
+    RH = relative humidity (%)
+    """
+    RH = 100*actualVP/saturationVP
+    return RH
+# %%
+# Evaporation rates
+
+
+def meyerEvaporation(saturationVP, actualVP, windSpeed):
+    """Calculates the evaporation rate from open water using the Meyer
+    equation, E = 0.36*(es - ea)*(1 + u/10), which takes vapor pressures in
+    inches of mercury and gives inches/day
+
+    Parameters
+    ----------
+    saturationVP = saturation vapor pressure at the water temperature (Pa)
+    actualVP = actual vapor pressure of the air (Pa)
+    windSpeed = wind speed (miles/hour)
+
+    Returns
+    -------
+    evapo = evaporation rate (cm/day)
+    """
+    saturationVP_inHg = saturationVP*2.9533*(10**(-4))
+    actualVP_inHg = actualVP*2.9533*(10**(-4))
+    evapo_in = 0.36*(saturationVP_inHg - actualVP_inHg)*(1 + (windSpeed/10))
+    evapo = evapo_in*2.54
+    return evapo
+
+
+def _meyerEvaporationTile(saturationVP, actualVP, windSpeed, out, scratch):
+    """Calculates Meyer evaporation rates like meyerEvaporation() without
+    allocating any arrays. Every step is a numpy ufunc writing into out or
+    scratch, which have the shape of the result
+
+    Parameters
+    ----------
+    saturationVP = saturation vapor pressure at the water temperature (Pa)
+    actualVP = actual vapor pressure of the air (Pa)
+    windSpeed = wind speed (miles/hour)
+    out = numpy array that the evaporation rate is written into
+    scratch = numpy array that holds intermediate values
+
+    Returns
+    -------
+    out = evaporation rate (cm/day)
+    """
+    np.subtract(saturationVP, actualVP, out=out)
+    np.multiply(out, 0.36*2.9533*(10**(-4))*2.54, out=out)
+    np.divide(windSpeed, 10, out=scratch)
+    np.add(scratch, 1, out=scratch)
+    np.multiply(out, scratch, out=out)
+    return out
+
+
+def dunneEvaporation(actualVP, RH, windSpeed):
+    """Calculates the evaporation rate from open water using the Dunne
+    equation, E = (0.013 + 0.00016*u)*ea*(100 - RH)/100, which takes wind
+    speed in km/day and vapor pressure in millibars and gives cm/day
+
+    Parameters
+    ----------
+    actualVP = actual vapor pressure of the air (Pa)
+    RH = relative humidity (%)
+    windSpeed = wind speed (miles/hour)
+
+    Returns
+    -------
+    evapo = evaporation rate (cm/day)
+    """
+    windSpeed_kmday = windSpeed*1.61*24
+    actualVP_mb = actualVP/100
+    evapo = (0.013 + (0.00016*windSpeed_kmday))*actualVP_mb*((100 - RH)/100)
+    return evapo
+
+
+def penmanEvaporation(temp, actualVP, windSpeed, netRadiation,
+                      pressure=101.3):
+    """Calculates the evaporation rate from open water using the Penman
+    equation, which combines the energy available for evaporation (net
+    radiation) with the drying power of the air (the Penman 1948 wind
+    function)
+
+    Parameters
+    ----------
+    temp = air temperature in degrees Celsius
+    actualVP = actual vapor pressure of the air (Pa)
+    windSpeed = wind speed (miles/hour)
+    netRadiation = net radiation at the water surface (MJ/m2/day)
+    pressure = air pressure (kPa)
+
+    Returns
+    -------
+    evapo = evaporation rate (cm/day)
+    """
+    saturationVP_kPa = vaporPressure(temp)/1000
+    actualVP_kPa = actualVP/1000
+    windSpeed_ms = windSpeed*0.44704
+
+    # slope of the saturation vapor pressure curve (kPa/degrees Celsius) and
+    # the psychrometric constant (kPa/degrees Celsius)
+    slope = 4098*saturationVP_kPa/((temp + 237.3)**2)
+    psychrometric = 0.000665*pressure
+
+    # both terms are in mm/day; 2.45 MJ/kg is the latent heat of vaporization
+    radiationTerm = netRadiation/2.45
+    aerodynamicTerm = 2.6*(1 + (0.54*windSpeed_ms))*(saturationVP_kPa
+                                                     - actualVP_kPa)
+    evapo_mm = (((slope*radiationTerm) + (psychrometric*aerodynamicTerm))
+                / (slope + psychrometric))
+    evapo = evapo_mm/10
+    return evapo
+
+
+def evaporationRates(temp, windSpeed, dewpoint=None, RH=None,
+                     netRadiation=None, pressure=101.3):
+    """Calculates vapor pressures, relative humidity, and evaporation rates
+    for whole columns of station data in one vectorized pass. Either the
+    dewpoint or the relative humidity has to be given
+
+    Parameters
+    ----------
+    temp = numpy array of air temperatures in degrees Celsius
+    windSpeed = numpy array of wind speeds (miles/hour)
+    dewpoint = numpy array of dewpoints in degrees Celsius
+    RH = numpy array of relative humidities (%), used if dewpoint is not given
+    netRadiation = numpy array of net radiation (MJ/m2/day); the Penman
+    evaporation rate is only calculated if this is given
+    pressure = air pressure (kPa)
+
+    Returns
+    -------
+    rates = dict of numpy arrays: saturation vapor pressure ("saturationVP",
+    Pa), actual vapor pressure ("actualVP", Pa), relative humidity ("RH", %),
+    and the Meyer, Dunne, and (if netRadiation is given) Penman evaporation
+    rates ("meyer", "dunne", "penman", cm/day)
+    """
+    temp = np.asarray(temp, dtype=float)
+    windSpeed = np.asarray(windSpeed, dtype=float)
+    saturationVP = vaporPressure(temp)
+    if dewpoint is not None:
+        actualVP = vaporPressure(np.asarray(dewpoint, dtype=float))
+        RH = relativeHumidity(actualVP, saturationVP)
+    elif RH is not None:
+        RH = np.asarray(RH, dtype=float)
+        actualVP = saturationVP*RH/100
+    else:
+        raise ValueError("either dewpoint or RH has to be given")
+
+    rates = {"saturationVP": saturationVP,
+             "actualVP": actualVP,
+             "RH": RH,
+             "meyer": meyerEvaporation(saturationVP, actualVP, windSpeed),
+             "dunne": dunneEvaporation(actualVP, RH, windSpeed)}
+    if netRadiation is not None:
+        rates["penman"] = penmanEvaporation(temp, actualVP, windSpeed,
+                                            np.asarray(netRadiation,
+                                                       dtype=float),
+                                            pressure)
+    return rates
+
+
+def evaporationFromCSV(path, tempColumn, windColumn, dewpointColumn=None,
+                       RHColumn=None, radiationColumn=None, pressure=101.3,
+                       chunksize=100000, **readOptions):
+    """Reads a station CSV file in chunks and calculates evaporation rates for
+    each chunk with evaporationRates(), so years of hourly data from many
+    stations can be worked through without holding the whole file in memory.
+    pandas is only imported when this function is called
+
+    Parameters
+    ----------
+    path = path of the CSV file
+    tempColumn = name of the air temperature column (degrees Celsius)
+    windColumn = name of the wind speed column (miles/hour)
+    dewpointColumn = name of the dewpoint column (degrees Celsius)
+    RHColumn = name of the relative humidity column (%), used if
+    dewpointColumn is not given
+    radiationColumn = name of the net radiation column (MJ/m2/day), needed for
+    the Penman evaporation rate
+    pressure = air pressure (kPa)
+    chunksize = number of rows read at a time
+    readOptions = other keyword arguments that are passed to pandas.read_csv
+
+    Yields
+    ------
+    chunk = pandas dataframe of the rows in the chunk, with the results of
+    evaporationRates() added as new columns
+    """
+    import pandas as pd
+
+    reader = pd.read_csv(path, chunksize=chunksize, **readOptions)
+    for chunk in reader:
+        rates = evaporationRates(
+            chunk[tempColumn].to_numpy(dtype=float),
+            chunk[windColumn].to_numpy(dtype=float),
+            dewpoint=(None if dewpointColumn is None
+                      else chunk[dewpointColumn].to_numpy(dtype=float)),
+            RH=(None if RHColumn is None
+                else chunk[RHColumn].to_numpy(dtype=float)),
+            netRadiation=(None if radiationColumn is None
+                          else chunk[radiationColumn].to_numpy(dtype=float)),
+            pressure=pressure)
+        for name, values in rates.items():
+            chunk[name] = values
+        yield chunk
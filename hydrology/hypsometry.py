@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to calculate hypsometric curves, which show how
+much of a watershed's area lies above each altitude, and hypsometric
+integrals, which are the areas under the curves after both axes are scaled
+to go from 0 to 1. The curves can be calculated from a table of areas within
+altitude ranges, like the one from week 1, or directly from an elevation
+raster (DEM) and a raster of sub-basin labels. This module can be imported by
+other scripts, which would then use the methods within this module
+"""
+
+import numpy as np
+
+# %%
+# Hypsometric curves from a table of areas within altitude ranges
+
+
+def cumulativeAreaAbove(areaInAltRange):
+    """Calculates the cumulative area above the lower altitude of each
+    altitude range
+
+    Parameters
+    ----------
+    areaInAltRange = area within each altitude range, ordered from the highest
+    altitude range to the lowest (area); can be a numpy array or pandas series
+
+    Returns
+    -------
+    cumulArea = area above the lower altitude of each altitude range, of the
+    same type as areaInAltRange (area)
+    """
+    cumulArea = np.cumsum(areaInAltRange)
+    return cumulArea
+
+
+def hypsometricIntegral(binEdges, counts):
+    """Calculates hypsometric integrals from elevation histograms. Elevations
+    are assumed to be spread evenly within each bin, which makes the
+    hypsometric integral equal to (mean elevation - minimum elevation)/relief,
+    with the minimum and maximum elevations taken from the lowest and highest
+    bins that have any cells in them
+
+    Parameters
+    ----------
+    binEdges = 1-D numpy array of the edges of the elevation bins, from lowest
+    to highest (length)
+    counts = numpy array of the number of cells in each bin, with the bins
+    along the last axis
+
+    Returns
+    -------
+    integral = numpy array of hypsometric integrals, with the shape of counts
+    without its last axis; NaN where there are no cells
+    """
+    counts = np.asarray(counts, dtype=float)
+    binEdges = np.asarray(binEdges, dtype=float)
+    midpoints = (binEdges[:-1] + binEdges[1:])/2
+    nonEmpty = counts > 0
+    lowestBin = np.argmax(nonEmpty, axis=-1)
+    highestBin = counts.shape[-1] - 1 - np.argmax(nonEmpty[..., ::-1], axis=-1)
+    minAltitude = binEdges[lowestBin]
+    maxAltitude = binEdges[highestBin + 1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        meanAltitude = (counts @ midpoints)/counts.sum(axis=-1)
+        integral = (meanAltitude - minAltitude)/(maxAltitude - minAltitude)
+    return integral
+# %%
+# Hypsometric curves from an elevation raster and a sub-basin label raster
+
+
+def _rasterTiles(raster, tileRows):
+    """Yields row blocks of a raster so that only 1 block at a time is read
+    into memory from a memory-mapped raster
+
+    Parameters
+    ----------
+    raster = 2-D numpy array or memory-mapped array
+    tileRows = number of rows in each block
+
+    Yields
+    ------
+    block = 1-D numpy array of the cells in the block
+    """
+    for start in range(0, raster.shape[0], tileRows):
+        yield np.asarray(raster[start:start + tileRows]).ravel()
+
+
+def elevationHistogram(dem, labels, binEdges=None, nBins=100, nLabels=None,
+                       nodata=None, tileRows=1024):
+    """Counts the number of cells of each sub-basin that fall in each
+    elevation bin. The rasters are read in blocks of rows, and every block is
+    added to the histograms of all sub-basins at once with a single bincount
+    over (label, elevation bin) pairs, so memory use stays flat no matter how
+    big the rasters or how many sub-basins there are. If binEdges or nLabels
+    is not given, they are found by an extra pass over the rasters
+
+    Parameters
+    ----------
+    dem = 2-D elevation raster; a numpy array, memory-mapped array, or the
+    path to a .npy file, which is memory-mapped (length)
+    labels = 2-D raster of the same shape as dem with the sub-basin number of
+    each cell, starting at 0; negative numbers are cells outside every
+    sub-basin. Can be a numpy array, memory-mapped array, or .npy path
+    binEdges = 1-D numpy array of the edges of the elevation bins, from lowest
+    to highest (length); if not given, nBins bins of equal height that span
+    all of the elevations are used
+    nBins = number of elevation bins if binEdges is not given
+    nLabels = number of sub-basins; the largest label + 1 if not given
+    nodata = elevation value that marks missing cells; NaNs are always treated
+    as missing
+    tileRows = number of raster rows read into memory at a time
+
+    Returns
+    -------
+    list of the following 2 items:
+    binEdges = 1-D numpy array of the edges of the elevation bins (length)
+    counts = 2-D numpy array of shape (nLabels, bins) with the number of cells
+    of each sub-basin in each elevation bin
+    """
+    if isinstance(dem, str):
+        dem = np.load(dem, mmap_mode="r")
+    if isinstance(labels, str):
+        labels = np.load(labels, mmap_mode="r")
+
+    def validCells(z, label):
+        valid = (label >= 0) & np.isfinite(z)
+        if nodata is not None:
+            valid &= z != nodata
+        return valid
+
+    if binEdges is None or nLabels is None:
+        lowest, highest, largestLabel = np.inf, -np.inf, -1
+        for z, label in zip(_rasterTiles(dem, tileRows),
+                            _rasterTiles(labels, tileRows)):
+            valid = validCells(z, label)
+            if np.any(valid):
+                lowest = min(lowest, z[valid].min())
+                highest = max(highest, z[valid].max())
+                largestLabel = max(largestLabel, label[valid].max())
+        if binEdges is None:
+            binEdges = np.linspace(lowest, highest, nBins + 1)
+        if nLabels is None:
+            nLabels = int(largestLabel) + 1
+    binEdges = np.asarray(binEdges, dtype=float)
+    nBins = binEdges.size - 1
+
+    counts = np.zeros(nLabels*nBins, dtype=np.int64)
+    for z, label in zip(_rasterTiles(dem, tileRows),
+                        _rasterTiles(labels, tileRows)):
+        valid = validCells(z, label)
+        valid &= (z >= binEdges[0]) & (z <= binEdges[-1])
+        z = z[valid]
+        # the top edge belongs to the highest bin
+        bins = np.searchsorted(binEdges, z, side="right") - 1
+        np.minimum(bins, nBins - 1, out=bins)
+        counts += np.bincount(label[valid].astype(np.int64)*nBins + bins,
+                              minlength=nLabels*nBins)
+    return [binEdges, counts.reshape(nLabels, nBins)]
+
+
+def hypsometricCurves(dem, labels, binEdges=None, nBins=100, cellArea=1.0,
+                      nLabels=None, nodata=None, tileRows=1024):
+    """Calculates the hypsometric curve and hypsometric integral of every
+    sub-basin in a labeled elevation raster, using elevationHistogram()
+
+    Parameters
+    ----------
+    dem = 2-D elevation raster; a numpy array, memory-mapped array, or the
+    path to a .npy file, which is memory-mapped (length)
+    labels = 2-D raster of the same shape as dem with the sub-basin number of
+    each cell, starting at 0; negative numbers are cells outside every
+    sub-basin. Can be a numpy array, memory-mapped array, or .npy path
+    binEdges = 1-D numpy array of the edges of the elevation bins, from lowest
+    to highest (length); if not given, nBins bins of equal height are used
+    nBins = number of elevation bins if binEdges is not given
+    cellArea = area of each raster cell (area)
+    nLabels = number of sub-basins; the largest label + 1 if not given
+    nodata = elevation value that marks missing cells
+    tileRows = number of raster rows read into memory at a time
+
+    Returns
+    -------
+    list of the following 3 items:
+    lowerAltitude = 1-D numpy array of the lower altitude of each elevation
+    bin (length)
+    cumulArea = 2-D numpy array of shape (nLabels, bins) with the area of
+    each sub-basin above the lower altitude of each bin (area)
+    integral = 1-D numpy array of the hypsometric integral of each sub-basin
+    """
+    binEdges, counts = elevationHistogram(dem, labels, binEdges, nBins,
+                                          nLabels, nodata, tileRows)
+    # summing from the highest bin down to the lowest
+    cumulArea = cellArea*np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    integral = hypsometricIntegral(binEdges, counts)
+    return [binEdges[:-1], cumulArea, integral]
@@ -0,0 +1,1193 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to perform calculations of the infiltration
+of water into soil using the Horton equations (empirical) and the
+Green-Ampt model (somewhat theoretical but simplified). The Green-Ampt
+parameters that "can be obtained by soil texture" can be looked up for whole
+texture rasters with soils.py. This module can be imported by other scripts,
+which would then use the methods within this module
+"""
+
+
+import os
+
+import numpy as np
+
+# %%
+# Calculating infiltration capacity using the Horton equations
+
+
+def infilCapaHorton(f0, fc, k, t):
+    """Calculates infiltration capacity (max infiltration rate) using the
+    Horton equation for infiltration capacity
+
+    Parameters
+    ----------
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    t = time (hours, minutes, seconds)
+    k = decay constant specific to the soil (estimated), (hr^-1)
+
+    Returns
+    -------
+    ft = infiltration capacity at time t (length/time)
+
+    """
+    ft = fc + (f0 - fc)*np.exp(-k*t)
+    return ft
+
+
+def totalInfilHorton1time(f0, fc, k, t):
+    """Assuming that the actual infiltration rate is the infiltration capacity,
+    this calculates the maximum amount of water that can infiltrate after a
+    given amount of time using an integrated version of the Horton equation
+
+    Parameters
+    ----------
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    t = time (hours, minutes, seconds)
+    k = decay constant specific to the soil (estimated), (hr^-1)
+
+    Returns
+    -------
+    Ft = total amount of infiltration after time t (length)
+    """
+    numerator = (f0 - fc)*(1 - np.exp(-k*t))
+    Ft = (fc*t) + (numerator/k)
+    return Ft
+
+
+def totalInfilHorton2time(f0, fc, k, t1, t2):
+    """Assuming that the actual infiltration rate is the infiltration capacity,
+    this calculates the maximum amount of water that can infiltrate between
+    2 time periods by taking the definite integral of the Horton equation
+    between times t1 & t2.
+
+    Parameters
+    ----------
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    t1 = initial time (hours, minutes, seconds)
+    t2 = final time (hours, minutes, seconds)
+    k = decay constant specific to the soil (estimated), (hr^-1)
+
+    Returns
+    -------
+    Ft = total amount of infiltration between times t1 & t2 (length)
+    """
+    fraction = (f0 - fc)/(-k)
+    Ft = (fc*t2) - (fc*t1) + (fraction*(np.exp(-k*t2) - np.exp(-k*t1)))
+    return Ft
+
+
+def kOrt(f0, fc, f, knownValue, unknownVar):
+    """Intended to be used for calculations involving the Horton equation. This
+    calculates the value of the decay rate constant (k) if knownValue is time
+    (t) and if knownValue is the decay rate constant (k), then it calculates
+    the time (t)
+
+    Parameters
+    ----------
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    f0 = infiltration capacity at a specific time t (length/time)
+    knownValue = either k or t; if it's k, then units are time^-1 and this
+    function returns time t, and if it's t, then the units are units of time
+    and this function returns the decay rate constant
+    unknownVar = a character (k or t) that signifies the variable that the user
+    wants this function to return
+
+    Returns
+    -------
+    list of the following 2 items:
+    variable = string that describes the variable that this function calculates
+    unknownValue = the value of the variable that this function calculates; if
+    knownValue is k, then this variable is t with units of time, and if
+    knownValue is t, then this variable is k with units of time^-1
+    """
+    unknownValue = np.log((f - fc)/(f0 - fc))/(-knownValue)
+    if "k" in unknownVar.lower():
+        variable = "decay rate constant"
+    elif "t" in unknownVar.lower():
+        variable = "time"
+    return [variable, unknownValue]
+
+
+def _hortonTime(F, f0, fc, k):
+    """Calculates the time it would take for an amount F to infiltrate if the
+    actual infiltration rate had been the infiltration capacity since t = 0.
+    This inverts totalInfilHorton1time() explicitly: with A = (f0 - fc)/k and
+    a = (F - A)/fc, the time is a + W(k*A/fc*exp(-k*a))/k, where W is the
+    Lambert W function, which is evaluated in log space with the Wright omega
+    function so that it doesn't overflow
+
+    Parameters
+    ----------
+    F = numpy array of total amounts infiltrated (length)
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    k = decay constant specific to the soil (estimated), (hr^-1)
+
+    Returns
+    -------
+    t = numpy array of times (hours, minutes, seconds)
+    """
+    from scipy.special import wrightomega
+
+    F, f0, fc, k = [np.asarray(value, dtype=float) for value in (F, f0, fc, k)]
+    A = (f0 - fc)/k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = (F - A)/fc
+        t = a + wrightomega(np.log(k*A/fc) - (k*a)).real/k
+        # with fc = 0, capacity runs out once A has infiltrated
+        tNoFc = -np.log1p(-F/A)/k
+        t = np.where(fc > 0, t, np.where(F < A, tNoFc, np.inf))
+        # and with f0 = fc, the capacity never changes
+        t = np.where(A > 0, t, F/fc)
+    return t
+
+
+def simulateHorton(rainfallRates, timestep, f0, fc, k, Finit=0, out=None):
+    """Steps the Horton equation through a rainfall record using the time
+    compression approximation. The Horton equations assume that water
+    infiltrates at capacity from t = 0, but when it rains slower than the
+    capacity, the capacity drops more slowly. The time compression
+    approximation makes the capacity depend on the total amount infiltrated
+    instead of the time: the capacity when F has infiltrated is the capacity
+    at the time it would have taken F to infiltrate at capacity. Each
+    timestep, the amount infiltrated is the smaller of the rainfall and the
+    most that could infiltrate at capacity (totalInfilHorton2time()), and the
+    rest of the rainfall is excess. This replaces finding the "critical
+    point" when the infiltration rate equals the rainfall rate by hand, and it
+    works for rainfall rates that change over time
+
+    The loop only runs over time; every timestep is computed for all soil
+    parameter sets at once. Long records can be run in chunks by passing the
+    last row of cumulF from one chunk as Finit to the next, and records whose
+    results don't fit in memory (e.g. years of hourly rainfall over a large
+    grid) can write them into memory-mapped arrays with out
+
+    Parameters
+    ----------
+    rainfallRates = numpy array of rainfall rates whose first axis is time;
+    any other axes are grid cells or soils. A 1-D series is applied to every
+    grid cell or soil (length/time). Can be memory-mapped or the path of a
+    .npy file, which is memory-mapped
+    timestep = length of each timestep (units of time)
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    k = decay constant specific to the soil (estimated), (time^-1)
+    Finit = total amount infiltrated before the first timestep (length)
+    out = tuple of 3 C-contiguous numpy arrays of shape (timesteps,) + the
+    shape of the cells that infiltration, cumulF, and excess are written
+    into, or the paths of 3 .npy files to create for them. New float64
+    arrays are made if this is not given
+
+    f0, fc, k, and Finit can be floats or numpy arrays that broadcast against
+    a single timestep of rainfallRates
+
+    Returns
+    -------
+    tuple of the following 3 numpy arrays (the arrays of out, if given), each
+    with time as the first axis:
+    infiltration = amount infiltrated during each timestep (length)
+    cumulF = total amount infiltrated by the end of each timestep (length)
+    excess = rainfall excess (runoff) during each timestep (length)
+    """
+    rainfallRates, params, cellShape = _broadcastSeries(
+        rainfallRates, (f0, fc, k, Finit))
+    f0, fc, k, Finit = params
+    nSteps = rainfallRates.shape[0]
+    out, (infiltration, cumulF, excess) = _seriesOutputs(
+        out, (nSteps,) + cellShape)
+    F = Finit.copy()
+    compressedTime = _hortonTime(F, f0, fc, k)
+
+    for step in range(nSteps):
+        rainDepth = np.broadcast_to(rainfallRates[step],
+                                    cellShape).ravel()*timestep
+        capacityDepth = totalInfilHorton2time(f0, fc, k, compressedTime,
+                                              compressedTime + timestep)
+        atCapacity = rainDepth >= capacityDepth
+        np.minimum(rainDepth, capacityDepth, out=infiltration[step])
+        np.subtract(rainDepth, infiltration[step], out=excess[step])
+        F = F + infiltration[step]
+        cumulF[step] = F
+
+        # the compressed time moves a full timestep when infiltration was at
+        # capacity, and otherwise has to be found again from F
+        belowCapacity = ~atCapacity & (rainDepth > 0)
+        compressedTime[atCapacity] += timestep
+        if np.any(belowCapacity):
+            compressedTime[belowCapacity] = _hortonTime(
+                F[belowCapacity], f0[belowCapacity], fc[belowCapacity],
+                k[belowCapacity])
+
+    for value in out:
+        if isinstance(value, np.memmap):
+            value.flush()
+    return tuple(out)
+
+
+def _hortonProfile(logk, t, f, test, nTests):
+    """Fits fc and f0 by linear least squares for given decay constants. For
+    a fixed k, the Horton equation f = fc + (f0 - fc)*exp(-k*t) is a straight
+    line in exp(-k*t), so the best fc and f0 - fc of every test come from the
+    2 x 2 normal equations, whose sums are taken over each test at once with
+    bincount
+
+    Parameters
+    ----------
+    logk = 1-D numpy array of the natural log of the decay constant of each
+    test (time^-1)
+    t = 1-D numpy array of the times of every measurement of every test
+    f = 1-D numpy array of the infiltration rates of every measurement
+    test = 1-D numpy array of the test number of every measurement
+    nTests = number of tests
+
+    Returns
+    -------
+    list of the following 3 numpy arrays, with 1 value per test:
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    A = f0 - fc (length/time)
+    sumSquares = sum of the squared residuals of each test
+    """
+    decay = np.exp(-np.exp(logk)[test]*t)
+    n = np.bincount(test, minlength=nTests)
+    sumDecay = np.bincount(test, decay, nTests)
+    sumDecay2 = np.bincount(test, decay*decay, nTests)
+    sumF = np.bincount(test, f, nTests)
+    sumFDecay = np.bincount(test, f*decay, nTests)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        determinant = n*sumDecay2 - sumDecay**2
+        fc = (sumDecay2*sumF - sumDecay*sumFDecay)/determinant
+        A = (n*sumFDecay - sumDecay*sumF)/determinant
+        residuals = f - fc[test] - A[test]*decay
+        # bincount returns integers when a group has no measurements at all
+        sumSquares = np.bincount(test, residuals**2, nTests).astype(float)
+    # tests that can't be fit with this k are never picked as the best fit
+    sumSquares[~np.isfinite(sumSquares)] = np.inf
+    return [fc, A, sumSquares]
+
+
+def _fitHortonTests(args):
+    """Fits the Horton equation to a group of infiltrometer tests. Kept at
+    the top level of the module so that it can be sent to worker processes
+
+    Parameters
+    ----------
+    args = tuple of (t, f, test, nTests, kBounds, nGrid, nIter, f0Ratio),
+    where t, f, and test are the flattened measurements of the group as in
+    _hortonProfile(), and the rest are the arguments of fitHorton()
+
+    Returns
+    -------
+    list of the f0, fc, k, and RMSE of each test in the group, and boolean
+    arrays of the tests with fewer than 3 distinct times, the tests whose
+    rates don't decay (f0 - fc is negligible), and the tests whose fits were
+    rejected for k or f0
+    """
+    t, f, test, nTests, kBounds, nGrid, nIter, f0Ratio = args
+
+    # a coarse grid of k values brackets the best k of every test...
+    grid = np.linspace(np.log(kBounds[0]), np.log(kBounds[1]), nGrid)
+    sumSquares = np.array([_hortonProfile(np.full(nTests, logk), t, f, test,
+                                          nTests)[2] for logk in grid])
+    best = np.argmin(sumSquares, axis=0)
+    lower = grid[np.maximum(best - 1, 0)]
+    upper = grid[np.minimum(best + 1, nGrid - 1)]
+
+    # ...and then a golden-section search narrows every bracket at once
+    ratio = (np.sqrt(5) - 1)/2
+    x1 = upper - ratio*(upper - lower)
+    x2 = lower + ratio*(upper - lower)
+    ss1 = _hortonProfile(x1, t, f, test, nTests)[2]
+    ss2 = _hortonProfile(x2, t, f, test, nTests)[2]
+    for _ in range(nIter):
+        # the minimum is left of x2 where x1 is better, and right of x1
+        # otherwise, and the point that is kept becomes one of the new points
+        leftIsBetter = ss1 < ss2
+        upper = np.where(leftIsBetter, x2, upper)
+        lower = np.where(leftIsBetter, lower, x1)
+        newX = np.where(leftIsBetter, upper - ratio*(upper - lower),
+                        lower + ratio*(upper - lower))
+        newSS = _hortonProfile(newX, t, f, test, nTests)[2]
+        x1, x2 = (np.where(leftIsBetter, newX, x2),
+                  np.where(leftIsBetter, x1, newX))
+        ss1, ss2 = (np.where(leftIsBetter, newSS, ss2),
+                    np.where(leftIsBetter, ss1, newSS))
+
+    logk = (lower + upper)/2
+    fc, A, sumSquares = _hortonProfile(logk, t, f, test, nTests)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rmse = np.sqrt(sumSquares/np.bincount(test, minlength=nTests))
+    k = np.exp(logk)
+    f0 = fc + A
+
+    # 3 parameters can't be fit to fewer than 3 distinct times: with 2, a
+    # curve through both points is found for almost any k
+    pairs = np.unique(np.column_stack((test, t)), axis=0)
+    tooFew = np.bincount(pairs[:, 0].astype(np.int64), minlength=nTests) < 3
+
+    # without any decay, k could be anything
+    largest = np.full(nTests, -np.inf)
+    np.maximum.at(largest, test, np.abs(f))
+    with np.errstate(invalid="ignore"):
+        flat = ~tooFew & ~(np.abs(A) > 1e-6*largest)
+
+    # a k that ends up on a bound of the search means the decay isn't seen
+    # in the measurements (e.g. it was over before the first one), and then
+    # f0 is extrapolated far past anything that was measured
+    tolerance = 1e-6*(np.log(kBounds[1]) - np.log(kBounds[0]))
+    onBound = ((logk <= np.log(kBounds[0]) + tolerance)
+               | (logk >= np.log(kBounds[1]) - tolerance))
+    with np.errstate(invalid="ignore"):
+        tooLarge = np.abs(f0) > f0Ratio*largest
+    rejected = ~tooFew & ~flat & (onBound | tooLarge)
+    unfit = tooFew | flat | rejected
+    for values in (f0, fc, k, rmse):
+        values[unfit] = np.nan
+    return [f0, fc, k, rmse, tooFew, flat, rejected]
+
+
+def fitHorton(times, rates, kBounds=(1e-3, 1e3), nGrid=48, nIter=60,
+              workers=1, f0Ratio=10):
+    """Estimates f0, fc, and k of the Horton equation for many infiltrometer
+    tests at once. The tests can have different numbers of measurements.
+    The fit uses variable projection: for any k, the best f0 and fc are a
+    linear least squares problem with a closed-form answer, so only k has to
+    be searched for, which is done for every test at once with a coarse grid
+    followed by a golden-section search on log(k). Every step works on all
+    of the tests' measurements at once, and the tests can also be split
+    across worker processes
+
+    Parameters
+    ----------
+    times = list of 1-D numpy arrays with the times of each test's
+    measurements (hours, minutes, seconds)
+    rates = list of 1-D numpy arrays with the infiltration rates measured at
+    those times (length/time)
+    kBounds = tuple of the smallest and largest decay constants searched
+    (time^-1)
+    nGrid = number of k values in the coarse grid
+    nIter = number of golden-section iterations
+    workers = number of processes that the tests are split across; 1 fits
+    every test in this process
+    f0Ratio = largest f0 accepted, as a multiple of the largest rate measured
+    in the test
+
+    Returns
+    -------
+    tuple of the following 4 numpy arrays, with 1 value per test:
+    f0 = initial infiltration capacity (length/time)
+    fc = infiltration capacity after soil becomes saturated (length/time)
+    k = decay constant specific to the soil (time^-1)
+    rmse = root mean square error of the fitted infiltration rates (length/time)
+    Every value is NaN for tests with fewer than 3 distinct times, for tests
+    whose rates don't decay (f0 - fc is negligible next to the rates), and
+    for tests whose k lands on one of kBounds or whose f0 is more than
+    f0Ratio times their largest measured rate. A RuntimeWarning reports how
+    many tests were left unfit for each of these reasons
+    """
+    import warnings
+    from concurrent.futures import ProcessPoolExecutor
+
+    nTests = len(times)
+    if nTests == 0:
+        raise ValueError("at least 1 infiltrometer test has to be given")
+    if len(rates) != nTests:
+        raise ValueError("times and rates must have 1 array per test")
+    for number in range(nTests):
+        if np.size(times[number]) != np.size(rates[number]):
+            raise ValueError(f"test {number} has {np.size(times[number])} "
+                             f"times but {np.size(rates[number])} rates")
+    if not 0 < kBounds[0] < kBounds[1]:
+        raise ValueError("kBounds must be 2 increasing positive numbers")
+
+    groups = np.array_split(np.arange(nTests), min(max(workers, 1), nTests))
+    tasks = []
+    for group in groups:
+        counts = [len(times[number]) for number in group]
+        t = np.concatenate([np.asarray(times[number], dtype=float)
+                            for number in group] or [np.empty(0)])
+        f = np.concatenate([np.asarray(rates[number], dtype=float)
+                            for number in group] or [np.empty(0)])
+        test = np.repeat(np.arange(group.size), counts)
+        tasks.append((t, f, test, group.size, kBounds, nGrid, nIter,
+                      f0Ratio))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fits = list(pool.map(_fitHortonTests, tasks))
+    else:
+        fits = [_fitHortonTests(task) for task in tasks]
+
+    f0, fc, k, rmse, tooFew, flat, rejected = [
+        np.concatenate([fit[number] for fit in fits]) for number in range(7)]
+    reasons = [(tooFew, "fewer than 3 distinct times"),
+               (flat, "rates that don't decay"),
+               (rejected, "k on the bounds of the search or f0 over f0Ratio "
+                          "times the largest measured rate")]
+    reasons = [f"{np.count_nonzero(unfit)} with {reason}"
+               for unfit, reason in reasons if np.any(unfit)]
+    if reasons:
+        nUnfit = np.count_nonzero(tooFew | flat | rejected)
+        warnings.warn(f"{nUnfit} of {nTests} Horton fits were set to NaN: "
+                      f"{', '.join(reasons)}", RuntimeWarning, stacklevel=2)
+    return f0, fc, k, rmse
+# %%
+# Calculates infiltration rates using the Green-Ampt model
+
+
+def Fpond(presHead, Ks, thetaSat, thetaInit, rainfallRate):
+    """Calculates the total amount of water that had infiltrated before
+    ponding occurred
+
+    Parameters
+    ----------
+    presHead = pressure head, can be obtained by soil texture (length)
+    Ks = saturated hydraulic conductivity, can be obtained by soil texture,
+    (length/time)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    rainfallRate = well, pretty self-explanatory (length/time)
+
+    Returns
+    -------
+    Fp = total amount of water infiltrated by the time ponding started (length)
+    """
+    numerator = np.absolute(presHead)*Ks*(thetaSat - thetaInit)
+    denominator = rainfallRate - Ks
+
+    Fp = numerator/denominator
+    return Fp
+
+
+def timep(Fp, rainfallRate):
+    """Calculates the amount of time it takes before ponding occurs
+
+    Parameters
+    ----------
+    Fp = total amount of water infiltrated by the time ponding started (length)
+    rainfallRate = well, pretty self-explanatory (length/time)
+
+    Returns
+    -------
+    timep = amount of time before ponding takes place (hour, minutes, seconds)
+    """
+    timep = Fp/rainfallRate
+    return timep
+
+
+def infilRateGA(Ks, presHead, thetaSat, thetaInit, F, tp):
+    """Calculates the infiltration rate in the Green-Ampt model. The
+    infiltration rate is calculated AFTER ponding occurs. The infiltration rate
+    when t <= tp is the rainfall rate.
+
+    Parameters
+    -----------
+    rainfallRate = well, pretty self-explanatory (length/time)
+    presHead = pressure head, can be obtained by soil texture (length)
+    Ks = saturated hydraulic conductivity, can be obtained by soil texture,
+    (length/time)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    F = total amount infiltrated at time t (length)
+    tp = amount of time before ponding takes place (hour, minutes, seconds)
+
+    Returns
+    -------
+    f = infiltration rate after a given amount F had infiltrated (length/time)
+    """
+    numerator = Ks*np.absolute(presHead)*(thetaSat - thetaInit)
+    fraction = numerator/F
+    f = Ks + fraction
+
+    return f
+
+
+def time(tp, Ks, F, Fp, presHead, thetaSat, thetaInit):
+    """Calculates the amount of time it takes for a given amount F to have
+    infiltrated if the amount that had infiltrated is GREATER than the amount
+    that infiltrated before ponding takes place
+
+    Parameters
+    ----------
+    tp = amount of time before ponding takes place (hour, minutes, seconds)
+    presHead = pressure head, can be obtained by soil texture (length)
+    Ks = saturated hydraulic conductivity, can be obtained by soil texture,
+    (length/time)
+    F = total amount infiltrated at the specified time (length)
+    Fp = total amount of water infiltrated by the time ponding started (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+
+    Returns
+    -------
+    time = amount of time it takes for the amount F to have infiltrated
+    (hours, minutes, seconds)"""
+
+    numeratorLN = Fp + np.absolute(presHead)*(thetaSat - thetaInit)
+    denomLN = F + np.absolute(presHead)*(thetaSat - thetaInit)
+    naturalLog = np.log(numeratorLN/denomLN)
+
+    product1 = np.absolute(presHead)*(thetaSat - thetaInit)*naturalLog
+    brackets = F - Fp + product1
+
+    product2 = (1/Ks)*brackets
+    time = tp + product2
+    return time
+
+
+def stormEnd(tp, Ks, F, Fp, presHead, thetaSat, thetaInit, endingTime):
+    """This function is intended to be used to find the total amount of
+    infiltration by the end of a storm. The function is intended to be called
+    once by another function (function x) in the script that uses this function
+    and function x will then undergo the root finding algorithms of scipy.
+    Function x will take only 1 argument: the mathematical root of the
+    function, which is the total amount infiltrated by the end of the storm.
+    Function stormEnd(), which is this function, will have the same form
+    as function time(), but it will subtract the ending time while time()
+    does not. The purpose of this subtraction is to ensure the total amount
+    infiltrated by the end of the storm truly occurs by the end of the stormf
+    and to also ensures that the returned value, when properly optimized, is 0
+
+    Parameters
+    ----------
+    tp = amount of time before ponding takes place (hour, minutes, seconds)
+    presHead = pressure head, can be obtained by soil texture (length)
+    Ks = saturated hydraulic conductivity, can be obtained by soil texture,
+    (length/time)
+    F = total amount infiltrated at the specified time (length)
+    Fp = total amount of water infiltrated by the time ponding started (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    endingTime = the time when the storm ends; storm duration (units of time)
+
+    Returns
+    -------
+    time = amount of 'time' it takes for the amount F to have infiltrated,
+    should be 0 if properly optimized (hours, minutes, seconds)"""
+
+    numeratorLN = Fp + np.absolute(presHead)*(thetaSat - thetaInit)
+    denomLN = F + np.absolute(presHead)*(thetaSat - thetaInit)
+    naturalLog = np.log(numeratorLN/denomLN)
+
+    product1 = np.absolute(presHead)*(thetaSat - thetaInit)*naturalLog
+    brackets = F - Fp + product1
+
+    product2 = (1/Ks)*brackets
+    time = tp + product2 - endingTime
+    return time
+
+
+def graphData(finalF, rainfallRate, Ksat, presHead, thetaSat, thetaInit,
+              tol=None, maxPoints=1000):
+    """Returns a numpy 2-D array that will be used to make a plot of
+    infiltration rates over time according to the Green-Ampt model
+
+    Parameters
+    ----------
+    finalF = total amount infiltrated by the time the storm ended (length)
+    rainfallRate = self-explanatory; the rainfall rate of a storm (length/time)
+    Ksat = saturated hydraulic conductivity of a specific soil
+    presHead = pressure head at wetting front, same as the variable used in
+    other Green-Ampt model functions (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    tol = largest difference allowed between the infiltration rate and the
+    straight lines between the returned points (length/time). If None, 50
+    points before ponding and 50 points after ponding are returned; otherwise
+    the curve is sampled adaptively (see _adaptiveCurve())
+    maxPoints = largest number of points returned when tol is given
+
+    Returns
+    -------
+    A 2-D numpy array in which the first row is time and the second row
+    contains infiltration rates at those times
+    """
+    if tol is not None:
+        return _adaptiveCurve(finalF, rainfallRate, Ksat, presHead, thetaSat,
+                              thetaInit, tol, maxPoints)
+    Fp = Fpond(presHead, Ksat, thetaSat, thetaInit, rainfallRate)
+    pondingTime = timep(Fp, rainfallRate)
+    # making arrays of values before ponding
+    timeArrayBeforePond = np.linspace(0, pondingTime)
+    infilRateArrayBeforePond = np.full(50, rainfallRate)
+
+    # making arrays of values after ponding
+    initFp = Fp + (1e-8)
+    infilAmountAfterPond = np.linspace(initFp, finalF)
+    timeArrayAfterPond = time(pondingTime, Ksat, infilAmountAfterPond, Fp,
+                              presHead, thetaSat, thetaInit)
+    infilRateArrayAfterPond = infilRateGA(Ksat, presHead, thetaSat, thetaInit,
+                                          infilAmountAfterPond, pondingTime)
+
+    # combining arrays of values
+    timeArray = np.concatenate((timeArrayBeforePond, timeArrayAfterPond))
+    infilRateArray = np.concatenate((infilRateArrayBeforePond,
+                                     infilRateArrayAfterPond))
+    results = np.stack((timeArray, infilRateArray), axis=0)
+    return results
+
+
+def _adaptiveCurve(finalF, rainfallRate, Ksat, presHead, thetaSat, thetaInit,
+                   tol, maxPoints):
+    """Samples the Green-Ampt infiltration rate curve with as few points as
+    it takes for straight lines between them to stay within tol of the curve.
+    The rate is constant before ponding, so that part only needs its 2 ends,
+    and the ponding point itself (tp, rainfallRate) is included exactly.
+    After ponding, the curve is followed in terms of the amount infiltrated,
+    where both time and rate are explicit: every interval whose midpoint is
+    further than tol from the straight line between its ends is split at the
+    midpoint, until none are or maxPoints is reached, in which case the
+    intervals with the largest errors are split first. Points therefore
+    bunch up right after ponding, where the rate drops quickly
+
+    Parameters
+    ----------
+    finalF = total amount infiltrated by the time the storm ended (length)
+    rainfallRate = the rainfall rate of the storm (length/time)
+    Ksat = saturated hydraulic conductivity (length/time)
+    presHead = pressure head at the wetting front (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    tol = largest difference allowed between the curve and the straight
+    lines between the returned points (length/time)
+    maxPoints = largest number of points returned
+
+    Returns
+    -------
+    A 2-D numpy array in which the first row is time and the second row
+    contains infiltration rates at those times
+    """
+    if rainfallRate <= Ksat or finalF <= Fpond(presHead, Ksat, thetaSat,
+                                                thetaInit, rainfallRate):
+        # the storm ended before ponding, so the rate was the rainfall rate
+        return np.array([[0.0, finalF/rainfallRate],
+                         [rainfallRate, rainfallRate]])
+    Fp = Fpond(presHead, Ksat, thetaSat, thetaInit, rainfallRate)
+    pondingTime = timep(Fp, rainfallRate)
+
+    F = np.array([Fp, finalF], dtype=float)
+    t = time(pondingTime, Ksat, F, Fp, presHead, thetaSat, thetaInit)
+    f = infilRateGA(Ksat, presHead, thetaSat, thetaInit, F, pondingTime)
+    t[0] = pondingTime
+    f[0] = rainfallRate
+    # 1 point before ponding, at time 0
+    budget = max(maxPoints, 3) - 1
+    while F.size < budget:
+        midF = 0.5*(F[:-1] + F[1:])
+        midT = time(pondingTime, Ksat, midF, Fp, presHead, thetaSat,
+                    thetaInit)
+        midRate = infilRateGA(Ksat, presHead, thetaSat, thetaInit, midF,
+                              pondingTime)
+        lineRate = f[:-1] + (f[1:] - f[:-1])*(midT - t[:-1])/(t[1:] - t[:-1])
+        error = np.abs(midRate - lineRate)
+        split = np.flatnonzero(error > tol)
+        if split.size == 0:
+            break
+        if split.size > budget - F.size:
+            worst = np.argsort(error[split])[split.size - (budget - F.size):]
+            split = np.sort(split[worst])
+        F = np.insert(F, split + 1, midF[split])
+        t = np.insert(t, split + 1, midT[split])
+        f = np.insert(f, split + 1, midRate[split])
+
+    timeArray = np.concatenate(([0.0], t))
+    infilRateArray = np.concatenate(([rainfallRate], f))
+    results = np.stack((timeArray, infilRateArray), axis=0)
+    return results
+
+
+def _pondedF(F0, suction, KsDt):
+    """Solves the ponded Green-Ampt equation explicitly for the total amount
+    infiltrated after an amount KsDt = Ks*(t - t0) of ponded time has passed,
+    given that F0 had infiltrated at time t0. The implicit relation
+    F - F0 - suction*ln((F + suction)/(F0 + suction)) = KsDt is rewritten as
+    y - ln(y) = c with y = (F + suction)/suction, whose root on y >= 1 is
+    y = -W(-exp(-c)) on the lower (k = -1) branch of the Lambert W function.
+    Close to the branch point (c near 1, i.e. early in a storm that ponds
+    right away) W loses most of its digits, so there F is found with the
+    same Newton iteration that builds the lookup table of greenAmptFast()
+
+    Parameters
+    ----------
+    F0 = total amount infiltrated at the start of the ponded period (length)
+    suction = |presHead|*(thetaSat - thetaInit), the suction term (length)
+    KsDt = Ks multiplied by the ponded time that has passed (length)
+
+    Returns
+    -------
+    F = total amount infiltrated at the end of the ponded period (length)
+    """
+    from scipy.special import lambertw
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # c - 1 = u0 - ln(1 + u0) + KsDt/suction with u0 = F0/suction, with
+        # the series of u0 - ln(1 + u0) for small u0, where it cancels
+        u0 = np.asarray(F0/suction, dtype=float)
+        series = u0**2*(1/2 - u0*(1/3 - u0*(1/4 - u0*(
+            1/5 - u0*(1/6 - u0/7)))))
+        excess = np.where(u0 < 1e-3, series, u0 - np.log1p(u0)) \
+            + KsDt/suction
+        excess, u0 = np.broadcast_arrays(excess, u0)
+        c = 1 + excess
+        y = np.array(-lambertw(-np.exp(-c), k=-1).real, dtype=float)
+
+        # exp(-c) underflows for very long ponded periods, but there the
+        # fixed point iteration y = c + ln(y) converges within a few steps
+        large = c > 700
+        if np.any(large):
+            yLarge = c[large]
+            for _ in range(6):
+                yLarge = c[large] + np.log(yLarge)
+            y[large] = yLarge
+        F = suction*(y - 1)
+
+        # near the branch point, y - 1 solves (y - 1) - ln(y) = c - 1, which
+        # is the dimensionless equation of the lookup table with t* = c - 1
+        near = (excess < 0.1) & (excess > 0)
+        if np.any(near):
+            F = np.array(F, dtype=float)
+            nearSuction = np.broadcast_to(suction, F.shape)[near]
+            F[near] = nearSuction*_exactDimensionlessF(excess[near])
+        F = np.where(excess == 0, F0, F)
+
+    # when thetaSat equals thetaInit there is no suction and F grows at Ks
+    F = np.where(suction > 0, F, F0 + KsDt)
+    return F
+
+
+def stormEndBatch(Ks, presHead, thetaSat, thetaInit, rainfallRate, duration):
+    """Calculates the total amount infiltrated by the end of a storm, the
+    ponding time, and the infiltration rate at the end of the storm for many
+    soil/storm combinations at once. This replaces wrapping stormEnd() in a
+    function and calling scipy's root finding algorithms once per storm: the
+    ponded Green-Ampt equation is solved explicitly with the Lambert W
+    function, so no initial guess is needed. All parameters are broadcast
+    against each other, so they can be floats or numpy arrays of any
+    compatible shape
+
+    Parameters
+    ----------
+    Ks = saturated hydraulic conductivity, can be obtained by soil texture,
+    (length/time)
+    presHead = pressure head, can be obtained by soil texture (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    rainfallRate = well, pretty self-explanatory (length/time)
+    duration = the time when the storm ends; storm duration (units of time)
+
+    Returns
+    -------
+    tuple of the following 3 numpy arrays, each with the broadcast shape of
+    the parameters:
+    finalF = total amount infiltrated by the end of the storm (length)
+    pondingTime = amount of time before ponding takes place; np.inf where
+    ponding never happens before the storm ends, either because the rainfall
+    rate does not exceed Ks or because the storm is too short (units of time)
+    finalRate = infiltration rate at the end of the storm, which is the
+    rainfall rate where ponding never happened (length/time)
+    All 3 are NaN where any soil parameter is NaN
+    """
+    Ks, presHead, thetaSat, thetaInit, rainfallRate, duration = \
+        np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in
+                              (Ks, presHead, thetaSat, thetaInit,
+                               rainfallRate, duration)])
+
+    # ponding can only happen if rainfall is faster than Ks, and then only if
+    # the storm lasts longer than the ponding time
+    pondingTime = np.full(Ks.shape, np.inf)
+    ponds = rainfallRate > Ks
+    Fp = Fpond(presHead[ponds], Ks[ponds], thetaSat[ponds], thetaInit[ponds],
+               rainfallRate[ponds])
+    pondingTime[ponds] = timep(Fp, rainfallRate[ponds])
+    ponded = pondingTime < duration
+    Fp = Fp[ponded[ponds]]
+    pondingTime[~ponded] = np.inf
+
+    # before ponding, everything that falls infiltrates
+    finalF = np.asarray(rainfallRate*duration)
+    finalRate = rainfallRate.copy()
+
+    suction = np.absolute(presHead[ponded])*(thetaSat[ponded]
+                                             - thetaInit[ponded])
+    KsDt = Ks[ponded]*(duration[ponded] - pondingTime[ponded])
+    finalF[ponded] = _pondedF(Fp, suction, KsDt)
+    finalRate[ponded] = infilRateGA(Ks[ponded], presHead[ponded],
+                                    thetaSat[ponded], thetaInit[ponded],
+                                    finalF[ponded], pondingTime[ponded])
+
+    # cells with missing parameters (e.g. no soil texture) stay missing
+    missing = np.isnan(Ks + presHead + thetaSat + thetaInit)
+    if np.any(missing):
+        finalF[missing] = np.nan
+        pondingTime[missing] = np.nan
+        finalRate[missing] = np.nan
+    return finalF, pondingTime, finalRate
+
+
+def _broadcastSeries(rainfallRates, params):
+    """Lines up a rainfall-rate series with the soil parameters of the
+    simulation functions, so that every cell has its own parameters and every
+    timestep of rainfall broadcasts against the cells. The rainfall is not
+    copied, so a memory-mapped record stays on disk
+
+    Parameters
+    ----------
+    rainfallRates = numpy array of rainfall rates whose first axis is time;
+    any other axes are grid cells or soils (length/time), or the path of a
+    .npy file, which is memory-mapped
+    params = list of floats or numpy arrays that broadcast against a single
+    timestep of rainfallRates
+
+    Returns
+    -------
+    list of the following 3 items:
+    rainfallRates = numpy array whose rows broadcast to the shape cellShape
+    params = list of 1-D numpy arrays with 1 value per cell
+    cellShape = shape of the cell axes, used to reshape the results
+    """
+    if isinstance(rainfallRates, str):
+        rainfallRates = np.load(rainfallRates, mmap_mode="r")
+    rainfallRates = np.asarray(rainfallRates, dtype=float)
+    params = [np.asarray(value, dtype=float) for value in params]
+    cellShape = np.broadcast_shapes(rainfallRates.shape[1:],
+                                    *[value.shape for value in params])
+    nSteps = rainfallRates.shape[0]
+    # a single rainfall series is applied to every cell
+    padding = (1,)*(len(cellShape) - rainfallRates.ndim + 1)
+    rainfallRates = rainfallRates.reshape((nSteps,) + padding
+                                          + rainfallRates.shape[1:])
+    params = [np.broadcast_to(value, cellShape).ravel() for value in params]
+    return [rainfallRates, params, cellShape]
+
+
+def _seriesOutputs(out, shape):
+    """Makes or checks the 3 arrays that the simulation functions write their
+    results into
+
+    Parameters
+    ----------
+    out = None, or a tuple of 3 C-contiguous numpy arrays or paths of .npy
+    files to create for them (e.g. memory-mapped arrays for records that
+    don't fit in memory)
+    shape = shape of each result, (timesteps,) + the shape of the cells
+
+    Returns
+    -------
+    list of the following 2 items:
+    out = list of the 3 result arrays
+    flat = list of views of them with the shape (timesteps, cells)
+    """
+    if out is None:
+        out = [np.empty(shape) for _ in range(3)]
+    else:
+        out = list(out)
+        if len(out) != 3:
+            raise ValueError("out must hold 3 arrays: infiltration, cumulF, "
+                             "and excess")
+        for i, value in enumerate(out):
+            if isinstance(value, str):
+                out[i] = np.lib.format.open_memmap(
+                    value, mode="w+", dtype=np.float64, shape=shape)
+            elif value.shape != shape:
+                raise ValueError(f"the arrays in out must have the shape "
+                                 f"{shape}")
+            # reshaping a non-contiguous array would copy it, and the results
+            # would be written into the copy instead
+            elif not value.flags.c_contiguous:
+                raise ValueError("the arrays in out must be C-contiguous")
+    flat = [value.reshape(shape[0], -1) for value in out]
+    return [out, flat]
+
+
+def simulateGreenAmpt(rainfallRates, timestep, Ks, presHead, thetaSat,
+                      thetaInit, Finit=0, out=None):
+    """Steps the Green-Ampt model through a storm whose intensity changes over
+    time. At the start of each timestep, the infiltration capacity is compared
+    to the rainfall rate; if the capacity is exceeded, the surface is ponded
+    and the ponded Green-Ampt equation is solved over the timestep, and if not,
+    all of the rainfall infiltrates unless ponding begins partway through the
+    timestep. This means ponding can stop when the rainfall rate drops and
+    start again when it picks back up. The soil is not allowed to drain
+    between rainfall pulses, so F only ever increases
+
+    The loop only runs over time; every timestep is computed for all grid cells
+    or soils at once. Long records can be run in chunks by passing the last row
+    of cumulF from one chunk as Finit to the next, and records whose results
+    don't fit in memory (e.g. years of hourly rainfall over a large grid) can
+    write them into memory-mapped arrays with out
+
+    Parameters
+    ----------
+    rainfallRates = numpy array of rainfall rates whose first axis is time;
+    any other axes are grid cells or soils. A 1-D series is applied to every
+    grid cell or soil (length/time). Can be memory-mapped or the path of a
+    .npy file, which is memory-mapped
+    timestep = length of each timestep (units of time)
+    Ks = saturated hydraulic conductivity, can be obtained by soil texture,
+    (length/time)
+    presHead = pressure head, can be obtained by soil texture (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    Finit = total amount infiltrated before the first timestep (length)
+    out = tuple of 3 C-contiguous numpy arrays of shape (timesteps,) + the
+    shape of the cells that infiltration, cumulF, and excess are written
+    into, or the paths of 3 .npy files to create for them. New float64
+    arrays are made if this is not given
+
+    Ks, presHead, thetaSat, thetaInit, and Finit can be floats or numpy arrays
+    that broadcast against a single timestep of rainfallRates
+
+    Returns
+    -------
+    tuple of the following 3 numpy arrays (the arrays of out, if given), each
+    with time as the first axis:
+    infiltration = amount infiltrated during each timestep (length)
+    cumulF = total amount infiltrated by the end of each timestep (length)
+    excess = rainfall excess (runoff) during each timestep (length)
+    """
+    rainfallRates, params, cellShape = _broadcastSeries(
+        rainfallRates, (Ks, presHead, thetaSat, thetaInit, Finit))
+    Ks, presHead, thetaSat, thetaInit, Finit = params
+    nSteps = rainfallRates.shape[0]
+    out, (infiltration, cumulF, excess) = _seriesOutputs(
+        out, (nSteps,) + cellShape)
+    F = Finit.copy()
+    suction = np.absolute(presHead)*(thetaSat - thetaInit)
+
+    for step in range(nSteps):
+        rate = np.broadcast_to(rainfallRates[step], cellShape).ravel()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # ponded from the start of the timestep
+            capacity = Ks*(1 + suction/F)
+            ponded = (rate > 0) & (capacity <= rate)
+
+            # or ponding starts partway through the timestep
+            FnoPond = F + rate*timestep
+            capacityEnd = Ks*(1 + suction/FnoPond)
+            pondsLater = ~ponded & (rate > Ks) & (capacityEnd <= rate)
+
+        # ponding that starts partway through the timestep begins once Fp has
+        # infiltrated, which takes (Fp - F)/rate of the timestep
+        Fstart = F
+        pondedTime = np.full(F.shape, timestep, dtype=float)
+        if np.any(pondsLater):
+            Fp = Fpond(presHead[pondsLater], Ks[pondsLater],
+                       thetaSat[pondsLater], thetaInit[pondsLater],
+                       rate[pondsLater])
+            Fp = np.maximum(Fp, F[pondsLater])
+            Fstart = F.copy()
+            Fstart[pondsLater] = Fp
+            pondedTime[pondsLater] -= timep(Fp - F[pondsLater],
+                                            rate[pondsLater])
+            ponded |= pondsLater
+
+        Fnext = FnoPond
+        if np.any(ponded):
+            Fnext[ponded] = _pondedF(Fstart[ponded], suction[ponded],
+                                     Ks[ponded]*pondedTime[ponded])
+
+        cumulF[step] = Fnext
+        np.subtract(Fnext, F, out=infiltration[step])
+        np.subtract(rate*timestep, infiltration[step], out=excess[step])
+        # clears rounding error left over from the subtraction
+        np.maximum(excess[step], 0, out=excess[step])
+        F = Fnext
+
+    for value in out:
+        if isinstance(value, np.memmap):
+            value.flush()
+    return tuple(out)
+
+# %%
+# Fast Green-Ampt infiltration from a dimensionless lookup table
+"""With F* = F/suction and t* = Ks*t/suction, where suction =
+|presHead|*(thetaSat - thetaInit), every ponded Green-Ampt curve collapses into
+the single curve t* = F* - ln(1 + F*). That curve is tabulated once as
+ln(F*) against ln(t*), which is almost a straight line at both ends, and
+evaluated with cubic Hermite interpolation using the exact slopes. This is
+accurate to about 1e-9 (relative) and avoids solving the implicit equation."""
+
+# range and spacing of ln(t*) in the lookup table; outside of the range the
+# small and large t* approximations are exact to double precision
+_tableStart = -23.0
+_tableEnd = 23.0
+_tableStep = 0.05
+_tablePath = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          ".greenAmptTable.npz")
+_table = None
+
+
+def _exactDimensionlessF(tStar):
+    """Solves t* = F* - ln(1 + F*) for F* with Newton's method, which is too
+    slow for routine use but is used to build the lookup table
+
+    Parameters
+    ----------
+    tStar = numpy array of dimensionless times, Ks*t/suction
+
+    Returns
+    -------
+    FStar = numpy array of dimensionless amounts infiltrated, F/suction
+    """
+    tStar = np.asarray(tStar, dtype=float)
+    small = np.sqrt(2*tStar)
+    FStar = np.where(tStar < 1, small + small**2/3 + small**3/36,
+                     tStar + np.log1p(tStar))
+    for _ in range(40):
+        # F* - ln(1 + F*) loses precision for small F*, so its series is used
+        series = FStar**2*(1/2 - FStar*(1/3 - FStar*(1/4 - FStar*(
+            1/5 - FStar*(1/6 - FStar/7)))))
+        residual = np.where(FStar < 1e-3, series,
+                            FStar - np.log1p(FStar)) - tStar
+        FStar = FStar - residual*(1 + FStar)/FStar
+    return FStar
+
+
+def _greenAmptTable():
+    """Loads the dimensionless lookup table, building and saving it next to
+    this module the first time. The saved table is rebuilt if its grid
+    doesn't match this module's, and isn't saved if the folder is read-only
+
+    Returns
+    -------
+    table = 2-D numpy array whose rows are ln(F*) and d ln(F*)/d ln(t*) at
+    each grid point of ln(t*)
+    """
+    global _table
+    if _table is not None:
+        return _table
+
+    grid = np.array([_tableStart, _tableEnd, _tableStep])
+    try:
+        with np.load(_tablePath) as saved:
+            if np.array_equal(saved["grid"], grid):
+                _table = saved["table"]
+                return _table
+    except (OSError, KeyError, ValueError):
+        pass
+
+    nPoints = int(round((_tableEnd - _tableStart)/_tableStep)) + 1
+    tStar = np.exp(_tableStart + _tableStep*np.arange(nPoints))
+    FStar = _exactDimensionlessF(tStar)
+    # dF*/dt* = (1 + F*)/F*, so d ln(F*)/d ln(t*) = t*(1 + F*)/F*^2
+    _table = np.array([np.log(FStar), tStar*(1 + FStar)/FStar**2])
+    try:
+        np.savez(_tablePath, grid=grid, table=_table)
+    except OSError:
+        pass
+    return _table
+
+
+def dimensionlessF(tStar):
+    """Calculates the dimensionless amount infiltrated F* = F/suction after a
+    dimensionless ponded time t* = Ks*t/suction, the solution of
+    t* = F* - ln(1 + F*), from the lookup table
+
+    Parameters
+    ----------
+    tStar = dimensionless time; float or numpy array
+
+    Returns
+    -------
+    FStar = numpy array of dimensionless amounts infiltrated
+    """
+    table = _greenAmptTable()
+    tStar = np.asarray(tStar, dtype=float)
+    with np.errstate(divide="ignore"):
+        u = np.log(tStar)
+
+    position = np.clip((u - _tableStart)/_tableStep, 0,
+                       table.shape[1] - 1.000001)
+    index = position.astype(np.intp)
+    x = position - index
+    x2 = x*x
+    x3 = x2*x
+    lnF = ((2*x3 - 3*x2 + 1)*table[0, index]
+           + (x3 - 2*x2 + x)*_tableStep*table[1, index]
+           + (3*x2 - 2*x3)*table[0, index + 1]
+           + (x3 - x2)*_tableStep*table[1, index + 1])
+    FStar = np.exp(lnF)
+
+    # outside of the table: F* = s + s^2/3 + s^3/36 with s = sqrt(2t*) for
+    # short times, and the fixed point of F* = t* + ln(1 + F*) for long times
+    short = u < _tableStart
+    if np.any(short):
+        s = np.sqrt(2*tStar[short])
+        FStar[short] = s + s*s/3 + s**3/36
+    long = u > _tableEnd
+    if np.any(long):
+        FLong = tStar[long] + np.log1p(tStar[long])
+        FStar[long] = tStar[long] + np.log1p(FLong)
+    return FStar
+
+
+def greenAmptFast(t, Ks, presHead, thetaSat, thetaInit, rainfallRate=None):
+    """Calculates the total amount infiltrated and the infiltration rate at
+    time t from the dimensionless lookup table, without solving the implicit
+    Green-Ampt equation. Without a rainfall rate, the soil is ponded from the
+    start and the infiltration rate is the infiltration capacity. With a
+    rainfall rate, all rain infiltrates until ponding, after which the ponded
+    curve is shifted in time so that it starts at Fp. All parameters are
+    broadcast against each other
+
+    Parameters
+    ----------
+    t = time since the start of the storm (units of time)
+    Ks = saturated hydraulic conductivity (length/time)
+    presHead = pressure head (length)
+    thetaSat = saturated water content
+    thetaInit = initial water content
+    rainfallRate = constant rainfall rate (length/time), or None for a soil
+    that is ponded from the start
+
+    Returns
+    -------
+    tuple of the following 2 numpy arrays:
+    F = total amount infiltrated at time t (length)
+    f = infiltration rate at time t (length/time)
+    """
+    t, Ks, presHead, thetaSat, thetaInit = np.broadcast_arrays(
+        *[np.asarray(value, dtype=float)
+          for value in (t, Ks, presHead, thetaSat, thetaInit)])
+    suction = np.abs(presHead)*(thetaSat - thetaInit)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if rainfallRate is None:
+            FStar = dimensionlessF(Ks*t/suction)
+            F = suction*FStar
+            f = Ks*(1 + 1/FStar)
+            noSuctionRate = Ks
+        else:
+            rainfallRate = np.broadcast_to(np.asarray(rainfallRate,
+                                                      dtype=float), t.shape)
+            # ponding happens when Fp = Ks*suction/(r - Ks) has infiltrated;
+            # the ponded curve reaches Fp at the dimensionless time
+            # Fp* - ln(1 + Fp*), which is where it picks up at tp
+            FpStar = Ks/(rainfallRate - Ks)
+            tp = FpStar*suction/rainfallRate
+            ponded = (rainfallRate > Ks) & (t > tp)
+            tStar = Ks*(t - tp)/suction + FpStar - np.log1p(FpStar)
+            FStar = dimensionlessF(np.where(ponded, tStar, 1))
+            F = np.where(ponded, suction*FStar, rainfallRate*t)
+            f = np.where(ponded, Ks*(1 + 1/FStar), rainfallRate)
+            noSuctionRate = np.minimum(rainfallRate, Ks)
+
+        # with no suction, water infiltrates at Ks, or at the rainfall rate if
+        # that is slower
+        F = np.where(suction > 0, F, noSuctionRate*t)
+        f = np.where(suction > 0, f, noSuctionRate)
+    return F, f
+
+
+# %%
+# Opt-in instrumentation of this module's functions; see instrumentation.py
+if os.environ.get("HYDROLOGY_PROFILE", "").strip().lower() not in (
+        "", "0", "false", "no", "off"):
+    from . import instrumentation
+    instrumentation.instrumentModule(__name__)
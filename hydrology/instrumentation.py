@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to find out where the time goes when the
+infiltration and streamflow modules are run over large sweeps. The public
+functions of a module are wrapped so that every call records its wall time
+and the size of the largest array it was given; the results can be printed as
+a per-function report or saved as a Chrome trace (open it in chrome://tracing
+or https://ui.perfetto.dev) to see the calls on a timeline.
+
+Nothing is wrapped unless instrumentation is switched on, so it costs nothing
+when it is off. It can be switched on in 2 ways:
+
+1. The HYDROLOGY_PROFILE environment variable. infiltration.py and
+streamflow.py instrument themselves when they are imported if it is set to
+anything other than "", "0", "false", "no", or "off", and the results are
+written when Python exits. Set it to "report" (or "1") to print the report,
+or to the path of a .json file to save a Chrome trace:
+    HYDROLOGY_PROFILE=report python Homework3.py
+
+2. The profiled() context manager, which only instruments while it is open:
+    with instrumentation.profiled(infil, sf) as profile:
+        ...
+    print(profile.report())
+
+Profiles can be nested, and every call is recorded in each profile that is
+active. Wall times include the time spent in other instrumented functions
+that a function calls. Calls made in worker processes (the workers=... options) are
+not recorded.
+"""
+
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# %%
+# Recording calls
+
+
+class Profile:
+    """Call counts, wall times, and array sizes of instrumented functions
+
+    Attributes
+    ----------
+    stats = dict keyed by "module.function" of dicts with the number of calls
+    ("calls"), the total wall time ("seconds"), the total number of array
+    elements processed ("elements"), and the largest array ("largest")
+    events = list of Chrome trace events, 1 for each call until maxEvents is
+    reached
+    maxEvents = largest number of trace events kept, so that long sweeps
+    don't run out of memory
+    """
+
+    def __init__(self, maxEvents=1000000):
+        self.stats = {}
+        self.events = []
+        self.maxEvents = maxEvents
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def record(self, name, started, finished, elements):
+        """Records a single call of an instrumented function
+
+        Parameters
+        ----------
+        name = "module.function" name of the function
+        started, finished = time.perf_counter() at the start and end of the
+        call (seconds)
+        elements = size of the largest array given to the function
+        """
+        with self._lock:
+            entry = self.stats.get(name)
+            if entry is None:
+                entry = self.stats[name] = {"calls": 0, "seconds": 0.0,
+                                            "elements": 0, "largest": 0}
+            entry["calls"] += 1
+            entry["seconds"] += finished - started
+            entry["elements"] += elements
+            entry["largest"] = max(entry["largest"], elements)
+            if len(self.events) < self.maxEvents:
+                self.events.append(
+                    {"name": name, "ph": "X", "pid": os.getpid(),
+                     "tid": threading.get_ident(),
+                     "ts": (started - self._start)*1e6,
+                     "dur": (finished - started)*1e6,
+                     "args": {"elements": elements}})
+
+    def report(self):
+        """Formats the recorded calls as a table, slowest function first
+
+        Returns
+        -------
+        text = the table as a string
+        """
+        lines = [f"{'function':45s} {'calls':>9s} {'total s':>10s} "
+                 f"{'mean ms':>10s} {'elements':>12s} {'largest':>10s}"]
+        ordered = sorted(self.stats.items(),
+                         key=lambda item: item[1]["seconds"], reverse=True)
+        for name, entry in ordered:
+            lines.append(f"{name:45s} {entry['calls']:9d} "
+                         f"{entry['seconds']:10.4f} "
+                         f"{1000*entry['seconds']/entry['calls']:10.4f} "
+                         f"{entry['elements']:12d} {entry['largest']:10d}")
+        return "\n".join(lines)
+
+    def writeTrace(self, path):
+        """Saves the recorded calls as a Chrome trace (JSON)
+
+        Parameters
+        ----------
+        path = path of the .json file
+        """
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.events,
+                       "displayTimeUnit": "ms"}, file)
+
+
+def _largestArray(args, kwargs):
+    """Returns the size of the largest numpy array among a call's arguments,
+    or 1 if there are no arrays"""
+    largest = 1
+    for value in args:
+        if isinstance(value, np.ndarray) and value.size > largest:
+            largest = value.size
+    for value in kwargs.values():
+        if isinstance(value, np.ndarray) and value.size > largest:
+            largest = value.size
+    return largest
+
+
+def _wrap(function, name, profile):
+    """Wraps a function so that each of its calls is recorded in a profile.
+    More profiles can be added to the wrapper's __profiles__ list, and every
+    call is recorded in each of them"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        elements = _largestArray(args, kwargs)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            for active in tuple(wrapper.__profiles__):
+                active.record(name, started, finished, elements)
+    wrapper.__instrumented__ = function
+    wrapper.__profiles__ = [profile]
+    return wrapper
+# %%
+# Switching instrumentation on and off
+
+
+def _publicFunctions(module):
+    """Returns the names of the public functions defined in a module,
+    including ones that are already instrumented"""
+    return [name for name, value in vars(module).items()
+            if not name.startswith("_") and inspect.isfunction(value)
+            and value.__module__ == module.__name__]
+
+
+def instrumentModule(module, profile=None):
+    """Replaces the public functions of a module with instrumented versions.
+    Functions of the module that call each other look each other up in the
+    module, so those calls are recorded too. Functions that are already
+    instrumented (e.g. by an outer profiled() or HYDROLOGY_PROFILE) are not
+    wrapped again; their calls are recorded in this profile as well
+
+    Parameters
+    ----------
+    module = the module, or its name
+    profile = the Profile the calls are recorded in; the profile that is
+    written at exit (see HYDROLOGY_PROFILE) if not given
+
+    Returns
+    -------
+    originals = dict of the original functions, keyed by name, which
+    uninstrumentModule() puts back
+    """
+    if isinstance(module, str):
+        module = sys.modules[module]
+    if profile is None:
+        profile = _exitProfile()
+    prefix = module.__name__.rsplit(".", 1)[-1]
+
+    originals = {}
+    for name in _publicFunctions(module):
+        function = originals[name] = getattr(module, name)
+        if hasattr(function, "__instrumented__"):
+            function.__profiles__.append(profile)
+        else:
+            setattr(module, name, _wrap(function, f"{prefix}.{name}",
+                                        profile))
+    return originals
+
+
+def uninstrumentModule(module, originals, profile=None):
+    """Stops recording the calls of a module's functions in a profile, and
+    puts back the original functions once no profile is recording them
+
+    Parameters
+    ----------
+    module = the module
+    originals = dict returned by instrumentModule()
+    profile = the Profile that was given to instrumentModule(); if not given,
+    the original functions are put back no matter which profiles are still
+    recording them
+    """
+    for name, function in originals.items():
+        current = getattr(module, name)
+        profiles = getattr(current, "__profiles__", None)
+        if profile is None or profiles is None:
+            setattr(module, name, function)
+            continue
+        # the profiles are compared by identity, not by their records
+        profiles[:] = [active for active in profiles if active is not profile]
+        if not profiles:
+            setattr(module, name, current.__instrumented__)
+
+
+@contextlib.contextmanager
+def profiled(*modules, trace=None):
+    """Instruments the public functions of modules while the context is open
+
+    Parameters
+    ----------
+    modules = the modules to instrument
+    trace = path of a .json file that a Chrome trace is saved to when the
+    context closes
+
+    Yields
+    ------
+    profile = the Profile the calls are recorded in
+    """
+    profile = Profile()
+    instrumented = [(module, instrumentModule(module, profile))
+                    for module in modules]
+    try:
+        yield profile
+    finally:
+        for module, originals in instrumented:
+            uninstrumentModule(module, originals, profile)
+        if trace is not None:
+            profile.writeTrace(trace)
+
+
+_profileAtExit = None
+
+
+def _exitProfile():
+    """Returns the profile used by modules instrumented through
+    HYDROLOGY_PROFILE, which is reported when Python exits"""
+    global _profileAtExit
+    if _profileAtExit is None:
+        _profileAtExit = Profile()
+        atexit.register(_writeAtExit)
+    return _profileAtExit
+
+
+def _writeAtExit():
+    """Prints the report or saves the Chrome trace, depending on
+    HYDROLOGY_PROFILE"""
+    setting = os.environ.get("HYDROLOGY_PROFILE", "report")
+    if setting.lower().endswith(".json"):
+        _profileAtExit.writeTrace(setting)
+        print(f"Chrome trace written to {setting}", file=sys.stderr)
+    else:
+        print(_profileAtExit.report(), file=sys.stderr)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to hold the helpers for running work in pools
+of worker processes that are shared by the pipeline, plotting, and
+uncertainty modules. It only imports the standard library when its functions
+are called, so importing it stays fast
+"""
+
+# %%
+# Running tasks in a pool with a bounded number in flight
+
+
+def boundedMap(pool, function, tasks, window):
+    """Runs function on every task in a pool of workers and yields the
+    results in the order of the tasks, like pool.map(), but with at most
+    window tasks submitted at a time. pool.map() submits every task at once
+    and keeps every finished result until it is consumed, so its memory grows
+    with the number of tasks when the consumer is slower than the workers.
+    Closing the generator (or letting it be garbage collected) cancels the
+    tasks that haven't started, so a caller that stops early only waits for
+    the few tasks that are running when it shuts the pool down
+
+    Parameters
+    ----------
+    pool : concurrent.futures executor
+    function : callable
+        Function run on each task; it has to be picklable for a process pool
+    tasks : iterable
+        Arguments of the function, 1 per call
+    window : int
+        Largest number of tasks that are submitted but not yet consumed
+
+    Yields
+    ------
+    result
+        The function's result for each task, in order
+
+    """
+    from collections import deque
+
+    pending = deque()
+    try:
+        for task in tasks:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(pool.submit(function, task))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to run the rainfall-runoff chain of homework 4
+(Curve Number runoff, then rainfall excess, then convolution with a unit
+hydrograph, then streamflow) for many subbasins at once, and to write every
+subbasin's results to a single Parquet file.
+
+The subbasins are listed in a manifest table with the columns
+    basin = name of the subbasin
+    area = area of the subbasin (acres)
+    CN = curve number of the subbasin
+    unitHydrograph = name of the subbasin's unit hydrograph
+    hyetograph = name of the storm that falls on the subbasin
+    baseflow = baseflow (flow units of the unit hydrographs); optional
+The unit hydrographs and hyetographs are wide tables with 1 named column per
+series, which the manifest refers to. Hyetographs are rainfall depths
+(inches) of each interval, and unit hydrographs are the streamflow for 1 inch
+of runoff. Tables can be CSV, Parquet, or Excel files.
+
+The unit hydrograph and hyetograph tables are loaded once and put in shared
+memory, and chunks of subbasins are run in a pool of worker processes, which
+read the tables without copying them. Run it from the command line with e.g.
+    python -m hydrology.pipeline manifest.csv unitHydrographs.csv
+        hyetographs.csv results.parquet --interval 2 --workers 8
+This module can also be imported by other scripts, which would then use
+runPipeline()
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from . import streamflow as sf
+from .parallel import boundedMap
+
+# %%
+# Reading the inputs
+
+
+def _readTable(path):
+    """Reads a CSV, Parquet, or Excel (first sheet) file into a dataframe
+
+    Parameters
+    ----------
+    path : str
+        Path of the file
+
+    Returns
+    -------
+    table : pandas dataframe
+
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return pd.read_parquet(path)
+    if extension in (".xlsx", ".xls"):
+        from . import workbooks
+
+        sheets = workbooks.readWorkbook(path, arrowBacked=False)
+        return next(iter(sheets.values()))
+    return pd.read_csv(path)
+
+
+def _catalogArray(table):
+    """Turns a wide table of series into a 2-D array with 1 row per series.
+    Shorter series are padded with zeros, which add nothing to the rainfall
+    or to the unit hydrograph
+
+    Parameters
+    ----------
+    table : pandas dataframe
+        1 column per series; missing values at the end of shorter series
+
+    Returns
+    -------
+    names : dict
+        Row of each series in the array, keyed by the series' name
+    series : numpy array
+        2-D array of shape (series, longest series)
+    lengths : numpy array
+        Length of each series without its padding
+
+    """
+    series = table.to_numpy(dtype=float).T
+    present = ~np.isnan(series)
+    lengths = np.where(present.any(axis=1),
+                       series.shape[1] - np.argmax(present[:, ::-1], axis=1),
+                       0)
+    series = np.ascontiguousarray(np.nan_to_num(series))
+    names = {str(name): row for row, name in enumerate(table.columns)}
+    return names, series, lengths
+# %%
+# Sharing the unit hydrographs and hyetographs with the worker processes
+
+
+def _shareArray(array):
+    """Copies an array into a new block of shared memory
+
+    Parameters
+    ----------
+    array : numpy array
+
+    Returns
+    -------
+    memory : SharedMemory
+        The block of shared memory, which the caller has to unlink when done
+    descriptor : tuple
+        Name, shape, and dtype of the shared array, which _attachArray()
+        takes
+
+    """
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(create=True,
+                                        size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)
+    shared[...] = array
+    return memory, (memory.name, array.shape, array.dtype.str)
+
+
+def _attachArray(descriptor):
+    """Attaches to an array in shared memory as a read-only numpy array
+
+    Returns
+    -------
+    memory : SharedMemory
+        The block of shared memory, which has to be kept open while the array
+        is used
+    array : numpy array
+
+    """
+    from multiprocessing import shared_memory
+
+    name, shape, dtype = descriptor
+    memory = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf)
+    array.flags.writeable = False
+    return memory, array
+
+
+# arrays that a worker process reads, set by _initWorker()
+_workerArrays = {}
+
+
+def _initWorker(descriptors):
+    """Attaches a worker process to the shared unit hydrographs and
+    hyetographs"""
+    for key, descriptor in descriptors.items():
+        _workerArrays[key] = _attachArray(descriptor)
+# %%
+# Running the subbasins
+
+
+def basinRunoff(hyetographs, CN, unitHydros, baseflow=0, pulseSpacing=1):
+    """Runs the rainfall-runoff chain for a batch of subbasins: the Curve
+    Number method turns cumulative rainfall into cumulative runoff, whose
+    increments are the rainfall excess of each interval, which is convolved
+    with the unit hydrographs
+
+    Parameters
+    ----------
+    hyetographs : numpy array
+        Rainfall depth of each interval (inches), shape (basins, intervals)
+    CN : numpy array
+        Curve number of each subbasin
+    unitHydros : numpy array
+        Streamflow for 1 inch of runoff, shape (basins, ordinates)
+    baseflow : float or numpy array
+        Baseflow of each subbasin
+    pulseSpacing : int
+        Number of unit hydrograph ordinates per hyetograph interval
+
+    Returns
+    -------
+    excessRain : numpy array
+        Rainfall excess of each interval (inches), shape (basins, intervals)
+    Q : numpy array
+        Streamflow at the time of each unit hydrograph ordinate, shape
+        (basins, (intervals - 1)*pulseSpacing + ordinates)
+
+    """
+    CN = np.asarray(CN, dtype=float)[:, np.newaxis]
+    cumulRunoff = sf.QfromP_CN(np.cumsum(hyetographs, axis=1), CN)
+    excessRain = np.diff(cumulRunoff, axis=1, prepend=0)
+    Q = sf.stormHydrograph(unitHydros, excessRain,
+                           np.asarray(baseflow, dtype=float)[:, np.newaxis],
+                           pulseSpacing)
+    return excessRain, Q
+
+
+def _runChunk(task):
+    """Runs a chunk of subbasins in a worker process and lays the results out
+    as the columns of the output table. This is a top-level function so that
+    it can be sent to worker processes
+
+    Parameters
+    ----------
+    task : tuple
+        Manifest rows of the chunk, and the CN, baseflow, unit hydrograph row,
+        and hyetograph row of each subbasin in it, and the number of unit
+        hydrograph ordinates per hyetograph interval
+
+    Returns
+    -------
+    columns : dict
+        Numpy arrays of the output columns ("row", "step", "rainfall",
+        "excess", "streamflow"), 1 entry per subbasin and time step
+
+    """
+    rows, CN, baseflow, uhRows, hyetoRows, pulseSpacing = task
+    unitHydros = _workerArrays["unitHydrographs"][1]
+    uhLengths = _workerArrays["unitHydrographLengths"][1]
+    hyetographs = _workerArrays["hyetographs"][1]
+    hyetoLengths = _workerArrays["hyetographLengths"][1]
+
+    # trimming the padding that no subbasin in the chunk needs
+    nOrdinates = int(uhLengths[uhRows].max())
+    nIntervals = int(hyetoLengths[hyetoRows].max())
+    rain = hyetographs[hyetoRows, :nIntervals]
+    excessRain, Q = basinRunoff(rain, CN, unitHydros[uhRows, :nOrdinates],
+                                baseflow, pulseSpacing)
+
+    # each subbasin keeps the time steps that its own series reach
+    nSteps = (hyetoLengths[hyetoRows] - 1)*pulseSpacing + uhLengths[uhRows]
+    keep = np.arange(Q.shape[1]) < nSteps[:, np.newaxis]
+    rainOnClock = np.full(Q.shape, np.nan)
+    excessOnClock = np.full(Q.shape, np.nan)
+    ownIntervals = (np.arange(nIntervals)
+                    < hyetoLengths[hyetoRows][:, np.newaxis])
+    rainOnClock[:, ::pulseSpacing][:, :nIntervals] = np.where(ownIntervals,
+                                                              rain, np.nan)
+    excessOnClock[:, ::pulseSpacing][:, :nIntervals] = np.where(
+        ownIntervals, excessRain, np.nan)
+    columns = {"row": np.repeat(rows, nSteps),
+               "step": np.nonzero(keep)[1],
+               "rainfall": rainOnClock[keep],
+               "excess": excessOnClock[keep],
+               "streamflow": Q[keep]}
+    return columns
+
+
+def runPipeline(manifest, unitHydrographs, hyetographs, output, interval=1,
+                uhStep=1, workers=1, chunkSize=256):
+    """Runs the rainfall-runoff chain for every subbasin in a manifest and
+    writes the results to a single Parquet file, with 1 row per subbasin and
+    unit hydrograph time step and the columns basin, time (hours), rainfall
+    and excess (inches, only at the start of each hyetograph interval), and
+    streamflow. The results are written chunk by chunk as the workers finish
+    them, and at most 2 chunks per worker are in flight at a time, so the
+    whole output is never held in memory
+
+    Parameters
+    ----------
+    manifest : str or pandas dataframe
+        Manifest of the subbasins, or the path of its file
+    unitHydrographs : str or pandas dataframe
+        Table of unit hydrographs, or the path of its file
+    hyetographs : str or pandas dataframe
+        Table of hyetographs, or the path of its file
+    output : str
+        Path of the Parquet file that is written
+    interval : float
+        Length of the hyetograph intervals (hours)
+    uhStep : float
+        Time between unit hydrograph ordinates (hours); interval has to be a
+        multiple of it
+    workers : int
+        Number of worker processes
+    chunkSize : int
+        Number of subbasins sent to a worker at a time
+
+    Returns
+    -------
+    summary : pandas dataframe
+        Total rainfall (inches), runoff depth (inches), runoff volume
+        (acre-ft), peak streamflow, and time of the peak (hours) of each
+        subbasin, indexed by basin
+
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(manifest, str):
+        manifest = _readTable(manifest)
+    if isinstance(unitHydrographs, str):
+        unitHydrographs = _readTable(unitHydrographs)
+    if isinstance(hyetographs, str):
+        hyetographs = _readTable(hyetographs)
+    pulseSpacing = int(round(interval/uhStep))
+    if not np.isclose(pulseSpacing*uhStep, interval) or pulseSpacing < 1:
+        raise ValueError("interval has to be a multiple of uhStep")
+
+    uhNames, uhArray, uhLengths = _catalogArray(unitHydrographs)
+    hyetoNames, hyetoArray, hyetoLengths = _catalogArray(hyetographs)
+    try:
+        uhRows = manifest["unitHydrograph"].astype(str).map(uhNames)
+        hyetoRows = manifest["hyetograph"].astype(str).map(hyetoNames)
+    except KeyError as error:
+        raise ValueError(f"the manifest has no {error} column") from None
+    for column, rows in (("unitHydrograph", uhRows),
+                         ("hyetograph", hyetoRows)):
+        if rows.isna().any():
+            missing = manifest.loc[rows.isna(), column].unique()[:5]
+            raise ValueError(f"unknown {column} names: {list(missing)}")
+    uhRows = uhRows.to_numpy(dtype=np.intp)
+    hyetoRows = hyetoRows.to_numpy(dtype=np.intp)
+    for column, names, lengths, rows in (
+            ("unitHydrograph", uhNames, uhLengths, uhRows),
+            ("hyetograph", hyetoNames, hyetoLengths, hyetoRows)):
+        empty = set(rows[lengths[rows] == 0].tolist())
+        if empty:
+            emptyNames = [name for name, row in names.items()
+                          if row in empty][:5]
+            raise ValueError(f"the {column} series {emptyNames} have no "
+                             "values")
+    CN = manifest["CN"].to_numpy(dtype=float)
+    baseflow = (manifest["baseflow"].to_numpy(dtype=float)
+                if "baseflow" in manifest else np.zeros(len(manifest)))
+    basins = manifest["basin"].astype(str).to_numpy()
+
+    nBasins = len(manifest)
+    tasks = []
+    for start in range(0, nBasins, chunkSize):
+        rows = np.arange(start, min(start + chunkSize, nBasins))
+        tasks.append((rows, CN[rows], baseflow[rows], uhRows[rows],
+                      hyetoRows[rows], pulseSpacing))
+
+    shared = {"unitHydrographs": uhArray,
+              "unitHydrographLengths": uhLengths,
+              "hyetographs": hyetoArray,
+              "hyetographLengths": hyetoLengths}
+    blocks = []
+    pool = None
+    peak = np.zeros(nBasins)
+    peakTime = np.zeros(nBasins)
+    excessTotal = np.zeros(nBasins)
+    schema = pa.schema([("basin", pa.string()), ("time", pa.float64()),
+                        ("rainfall", pa.float64()), ("excess", pa.float64()),
+                        ("streamflow", pa.float64())])
+    try:
+        if workers == 1:
+            # the tables are used directly instead of through shared memory
+            for key, array in shared.items():
+                _workerArrays[key] = (None, array)
+            results = map(_runChunk, tasks)
+        else:
+            descriptors = {}
+            for key, array in shared.items():
+                memory, descriptors[key] = _shareArray(array)
+                blocks.append(memory)
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_initWorker,
+                                       initargs=(descriptors,))
+            results = boundedMap(pool, _runChunk, tasks, 2*workers)
+
+        with pq.ParquetWriter(output, schema) as writer:
+            for columns in results:
+                row = columns["row"]
+                writer.write_table(pa.table(
+                    {"basin": basins[row],
+                     "time": columns["step"]*uhStep,
+                     "rainfall": columns["rainfall"],
+                     "excess": columns["excess"],
+                     "streamflow": columns["streamflow"]}, schema=schema))
+
+                # per-basin summaries, with the rows grouped by basin
+                starts = np.flatnonzero(np.diff(row, prepend=-1))
+                chunkRows = row[starts]
+                peakAt = starts + np.array(
+                    [np.argmax(segment) for segment in
+                     np.split(columns["streamflow"], starts[1:])])
+                peak[chunkRows] = columns["streamflow"][peakAt]
+                peakTime[chunkRows] = columns["step"][peakAt]*uhStep
+                excessTotal[chunkRows] = np.add.reduceat(
+                    np.nan_to_num(columns["excess"]), starts)
+    finally:
+        if pool is not None:
+            # closing the generator cancels the chunks that haven't started,
+            # and shutdown() waits for the few that are running
+            results.close()
+            pool.shutdown()
+        _workerArrays.clear()
+        for memory in blocks:
+            memory.close()
+            memory.unlink()
+
+    area = manifest["area"].to_numpy(dtype=float)
+    rainTotal = hyetoArray.sum(axis=1)[hyetoRows]
+    summary = pd.DataFrame({"totalRainfall": rainTotal,
+                            "runoffDepth": excessTotal,
+                            "runoffVolume": excessTotal/12*area,
+                            "peakStreamflow": peak,
+                            "peakTime": peakTime},
+                           index=pd.Index(basins, name="basin"))
+    return summary
+# %%
+# Command line entry point
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Runs Curve Number runoff and unit hydrograph "
+                    "convolution for every subbasin in a manifest and writes "
+                    "the streamflow of all of them to 1 Parquet file")
+    parser.add_argument("manifest", help="table of subbasins (basin, area, "
+                        "CN, unitHydrograph, hyetograph, and optionally "
+                        "baseflow)")
+    parser.add_argument("unitHydrographs", help="table of unit hydrographs, "
+                        "1 column per unit hydrograph")
+    parser.add_argument("hyetographs", help="table of hyetographs (inches "
+                        "per interval), 1 column per storm")
+    parser.add_argument("output", help="Parquet file that is written")
+    parser.add_argument("--interval", type=float, default=1,
+                        help="hyetograph interval in hours (default: 1)")
+    parser.add_argument("--uh-step", type=float, default=1,
+                        help="time between unit hydrograph ordinates in "
+                             "hours (default: 1)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: all "
+                             "CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="subbasins per task (default: 256)")
+    parser.add_argument("--summary", default=None,
+                        help="also write the per-basin summary to this CSV "
+                             "file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary = runPipeline(args.manifest, args.unitHydrographs,
+                          args.hyetographs, args.output, args.interval,
+                          args.uh_step, args.workers, args.chunk_size)
+    if args.summary is not None:
+        summary.to_csv(args.summary)
+    print(f"{len(summary)} subbasins written to {args.output} in "
+          f"{time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to draw the plots of the homework scripts (the
+Green-Ampt infiltration rate, unit hydrographs, modeled streamflow, and
+hypsometric curves) for thousands of sites at once. Each site's curve is drawn
+in 1 panel of a page of panels, and the pages are saved either to a single
+multi-page PDF or as a set of tiled PNG images, e.g. page0001.png.
+
+The pages are rendered with matplotlib's Agg backend in a pool of worker
+processes. Every worker builds the figure of a page once and reuses it for
+all of its pages, only replacing the data, titles, and axis limits of the
+curves, and long series are decimated before they are drawn, keeping the
+smallest and largest value of every bucket of points so peaks aren't lost.
+PDF pages are the Agg renderings embedded as images at the requested dpi, so
+they have no vector lines or selectable text; raise dpi for sharper pages.
+For example,
+    curves = np.stack([infil.graphData(*soil) for soil in soils])
+    plots.renderBatch(curves, "Green-Ampt.pdf", kind="greenAmpt")
+This module can be imported by other scripts, which would then use the
+methods within this module
+"""
+
+import os
+
+import numpy as np
+
+# axis labels and markers of the kinds of plots in the homework scripts
+plotKinds = {"greenAmpt": {"xlabel": "Time (hours)",
+                           "ylabel": "Infiltration rate (cm/hr)",
+                           "marker": ""},
+             "unitHydrograph": {"xlabel": "Time (hrs)",
+                                "ylabel": "Unit hydrograph (m3/s per cm)",
+                                "marker": "o"},
+             "streamflow": {"xlabel": "Time (hrs)",
+                            "ylabel": "Streamflow (m3/s)",
+                            "marker": "o"},
+             "hypsometric": {"xlabel": r"Area of watershed above a given "
+                                       r"altitude $(km^{2})$",
+                             "ylabel": "Altitude (m)",
+                             "marker": "o"}}
+# markers are only drawn on curves with at most this many points
+markerLimit = 200
+# figures of the pages that a process has drawn, keyed by their layout, so
+# that every page with the same layout reuses the same figure
+_templates = {}
+# %%
+# Preparing the curves
+
+
+def decimate(x, y, maxPoints=2000):
+    """Reduces a series to at most maxPoints points for drawing. The series is
+    split into maxPoints/2 buckets of consecutive points and the points with
+    the smallest and largest y of every bucket are kept, in their original
+    order, so the decimated line has the same peaks and troughs as the whole
+    series
+
+    Parameters
+    ----------
+    x = numpy 1-D array of x values, e.g. times
+    y = numpy 1-D array of y values at those x values
+    maxPoints = largest number of points that are kept
+
+    Returns
+    -------
+    x = numpy 1-D array of the x values that are kept
+    y = numpy 1-D array of the y values that are kept
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = y.size
+    if n <= maxPoints:
+        return x, y
+    buckets = max(maxPoints//2, 1)
+    bucketSize = -(-n//buckets)
+    padded = np.empty(buckets*bucketSize)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    padded = padded.reshape(buckets, bucketSize)
+    start = np.arange(buckets)*bucketSize
+    smallest = start + padded.argmin(axis=1)
+    largest = start + padded.argmax(axis=1)
+    keep = np.stack((np.minimum(smallest, largest),
+                     np.maximum(smallest, largest)), axis=1).ravel()
+    keep = np.unique(np.minimum(keep, n - 1))
+    return x[keep], y[keep]
+
+
+def seriesFromTable(table, timeColumn=None):
+    """Splits a wide table of hydrographs (1 column per site, like the unit
+    hydrograph and hyetograph tables of pipeline.py) into the curves that
+    renderBatch() takes
+
+    Parameters
+    ----------
+    table = pandas dataframe with 1 column per site
+    timeColumn = name of the column of times; if None, the index is used
+
+    Returns
+    -------
+    curves = list of numpy 2-D arrays, 1 per site, in which the first row is
+    time and the second row contains the site's values
+    titles = list of the column names of the sites
+    """
+    if timeColumn is None:
+        times = table.index.to_numpy(dtype=float)
+        columns = list(table.columns)
+    else:
+        times = table[timeColumn].to_numpy(dtype=float)
+        columns = [column for column in table.columns
+                   if column != timeColumn]
+    curves = []
+    for column in columns:
+        values = table[column].to_numpy(dtype=float)
+        # sites with shorter records are padded with NaN at the end
+        finite = np.flatnonzero(np.isfinite(values))
+        end = finite[-1] + 1 if finite.size else 0
+        curves.append(np.stack((times[:end], values[:end])))
+    titles = [str(column) for column in columns]
+    return curves, titles
+# %%
+# Drawing pages
+
+
+def _template(kind, rows, cols, pageSize, dpi):
+    """Returns the figure of a page layout, building it the first time the
+    layout is used in this process
+
+    Parameters
+    ----------
+    kind = kind of plot, a key of plotKinds
+    rows = number of rows of panels on a page
+    cols = number of columns of panels on a page
+    pageSize = (width, height) of a page (inches)
+    dpi = resolution of a page (dots per inch)
+
+    Returns
+    -------
+    template = dict of the kind of plot, the figure, its Agg canvas, and the
+    axes and line of every panel
+    """
+    key = (kind, rows, cols, tuple(pageSize), dpi)
+    if key in _templates:
+        return _templates[key]
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+
+    style = plotKinds[kind]
+    figure = Figure(figsize=pageSize, dpi=dpi, layout="constrained")
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.subplots(rows, cols, squeeze=False).ravel()
+    lines = []
+    for subplot in axes:
+        subplot.set_xlabel(style["xlabel"], fontsize="small")
+        subplot.set_ylabel(style["ylabel"], fontsize="small")
+        subplot.tick_params(labelsize="x-small")
+        # fewer ticks are quicker to draw and easier to read on small panels
+        subplot.xaxis.set_major_locator(MaxNLocator(5))
+        subplot.yaxis.set_major_locator(MaxNLocator(5))
+        line, = subplot.plot([], [], marker=style["marker"], markersize=3)
+        lines.append(line)
+        # placeholders, so that the layout leaves room for titles and wide
+        # tick labels
+        subplot.set_title("Site", fontsize="small")
+        subplot.set_ylim(0, 1000.5)
+    # the layout is worked out once, when the figure is built, and kept for
+    # every page after that
+    canvas.draw()
+    figure.set_layout_engine("none")
+    for subplot in axes:
+        subplot.set_autoscaley_on(True)
+    template = {"kind": kind, "figure": figure, "canvas": canvas,
+                "axes": axes, "lines": lines}
+    _templates[key] = template
+    return template
+
+
+def _drawPage(template, curves, titles):
+    """Puts the curves of 1 page into a page's figure and renders it
+
+    Parameters
+    ----------
+    template = page figure from _template()
+    curves = list of numpy 2-D arrays of time and values, 1 per panel
+    titles = list of the titles of the panels
+
+    Returns
+    -------
+    pixels = numpy 3-D array of the page's RGBA pixels, which is only valid
+    until the next page is drawn
+    """
+    marker = plotKinds[template["kind"]]["marker"]
+    for index, (subplot, line) in enumerate(zip(template["axes"],
+                                                template["lines"])):
+        if index >= len(curves):
+            subplot.set_visible(False)
+            continue
+        subplot.set_visible(True)
+        line.set_data(curves[index][0], curves[index][1])
+        line.set_marker(marker if curves[index].shape[1] <= markerLimit
+                        else "")
+        subplot.set_title(titles[index], fontsize="small")
+        subplot.relim()
+        subplot.autoscale_view()
+    template["canvas"].draw()
+    return np.asarray(template["canvas"].buffer_rgba())
+
+
+def _renderPages(task):
+    """Renders a batch of pages in a worker process. Tiled images are saved
+    by the worker; pages of a PDF are sent back to be written in order
+
+    Parameters
+    ----------
+    task = tuple of the layout (kind, rows, cols, pageSize, dpi), a list of
+    pages as (curves, titles) tuples, and a list of the paths to save the
+    pages to, or None to send their pixels back
+
+    Returns
+    -------
+    pages = list of numpy 3-D arrays of the pages' RGB pixels, or a list of
+    the paths of the saved images
+    """
+    from matplotlib import image
+
+    layout, pages, paths = task
+    template = _template(*layout)
+    rendered = []
+    for number, (curves, titles) in enumerate(pages):
+        pixels = _drawPage(template, curves, titles)
+        if paths is None:
+            rendered.append(pixels[:, :, :3].copy())
+        else:
+            image.imsave(paths[number], pixels, format="png")
+            rendered.append(paths[number])
+    return rendered
+# %%
+# Rendering batches of sites
+
+
+def renderBatch(curves, output, kind="greenAmpt", titles=None, rows=3,
+                cols=3, pageSize=(11, 8.5), dpi=100, maxPoints=2000,
+                workers=1, pagesPerTask=4):
+    """Renders a plot for every site of a batch, several sites per page, and
+    saves the pages as a multi-page PDF or as a set of tiled PNG images. The
+    pages of a PDF are raster images rendered at dpi. At most 2 tasks per
+    worker are in flight at a time, so only a few pages are held in memory
+    however many sites there are
+
+    Parameters
+    ----------
+    curves = numpy 3-D array of shape (sites, 2, points), like the stacked
+    arrays of infiltration.graphData(), or a list of numpy 2-D arrays in which
+    the first row is x (e.g. time) and the second row is y (sites can have
+    different lengths), or a wide pandas dataframe of hydrographs whose index
+    is time (see seriesFromTable())
+    output = path of a .pdf file for a single multi-page PDF, or otherwise of
+    a folder that the pages are saved into as page0001.png, page0002.png, etc.
+    kind = kind of plot, which sets the axis labels: "greenAmpt",
+    "unitHydrograph", "streamflow", or "hypsometric"
+    titles = list of the titles of the sites' panels; sites are numbered if
+    None
+    rows = number of rows of panels on a page
+    cols = number of columns of panels on a page
+    pageSize = (width, height) of a page (inches)
+    dpi = resolution of a page (dots per inch)
+    maxPoints = largest number of points drawn for a site; longer series are
+    decimated
+    workers = number of worker processes
+    pagesPerTask = number of pages sent to a worker at a time
+
+    Returns
+    -------
+    paths = list of the paths of the saved files
+    """
+    if kind not in plotKinds:
+        raise ValueError(f"kind must be one of {', '.join(plotKinds)}")
+    if hasattr(curves, "columns"):
+        curves, tableTitles = seriesFromTable(curves)
+        if titles is None:
+            titles = tableTitles
+    if titles is None:
+        titles = [f"Site {number + 1}" for number in range(len(curves))]
+    if len(titles) != len(curves):
+        raise ValueError("titles must have 1 title per site")
+
+    perPage = rows*cols
+    pages = []
+    for start in range(0, len(curves), perPage):
+        pageCurves = [np.stack(decimate(curve[0], curve[1], maxPoints))
+                      for curve in curves[start:start + perPage]]
+        pages.append((pageCurves, list(titles[start:start + perPage])))
+
+    asPDF = output.lower().endswith(".pdf")
+    if asPDF:
+        paths = [None]*len(pages)
+    else:
+        os.makedirs(output, exist_ok=True)
+        paths = [os.path.join(output, f"page{number + 1:04d}.png")
+                 for number in range(len(pages))]
+    layout = (kind, rows, cols, tuple(pageSize), dpi)
+    tasks = []
+    for start in range(0, len(pages), pagesPerTask):
+        taskPaths = None if asPDF else paths[start:start + pagesPerTask]
+        tasks.append((layout, pages[start:start + pagesPerTask], taskPaths))
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        from .parallel import boundedMap
+
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = boundedMap(pool, _renderPages, tasks, 2*workers)
+    else:
+        pool = None
+        results = map(_renderPages, tasks)
+    try:
+        if not asPDF:
+            return [path for rendered in results for path in rendered]
+        _writePDF(output, results, pageSize, dpi)
+        return [output]
+    finally:
+        if pool is not None:
+            # closing the generator cancels the pages that haven't started,
+            # and shutdown() waits for the few that are running
+            results.close()
+            pool.shutdown()
+
+
+def _writePDF(output, results, pageSize, dpi):
+    """Writes rendered pages to a multi-page PDF as they arrive, each page as
+    an image of its pixels
+
+    Parameters
+    ----------
+    output = path of the PDF
+    results = iterable of lists of numpy 3-D arrays of the pages' RGB pixels
+    pageSize = (width, height) of a page (inches)
+    dpi = resolution of the pages (dots per inch)
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=pageSize, dpi=dpi)
+    picture = None
+    with PdfPages(output) as pdf:
+        for rendered in results:
+            for pixels in rendered:
+                if picture is None:
+                    picture = figure.figimage(pixels)
+                else:
+                    picture.set_data(pixels)
+                pdf.savefig(figure, dpi=dpi)
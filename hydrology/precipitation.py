@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to calculate the Equivalent Uniform Depth (EUD)
+of precipitation over a watershed, which is the average depth of
+precipitation over the whole watershed, from rain gauge readings. This module
+can be imported by other scripts, which would then use the methods within
+this module
+"""
+
+import numpy as np
+
+# %%
+# Thiessen polygons
+
+
+def thiessenPolygonEUD(area, precip) -> float:
+    """
+    Calculates Equivalent Uniform Depth of precipitation using
+    Thiessen Polygons
+
+    Parameters
+    ------------
+    area = list of area of individual Thiessen Polygons (km2)
+    precip = list of rain gauge readings from each Thiessen Polygon (mm)
+
+    Returns
+    ---------
+    EUD = EUD of entire watershed
+    """
+
+    area = np.array(area)
+    totalArea = np.sum(area)
+    precip = np.array(precip)
+
+    EUDsingles = precip*area/totalArea
+    EUD = np.sum(EUDsingles)
+    return EUD
+
+
+def _cellCenters(mask, cellSize, origin):
+    """Calculates the coordinates of the centers of the cells of a grid that
+    are inside a watershed
+
+    Parameters
+    ----------
+    mask = 2-D boolean numpy array that is True for cells inside the watershed
+    cellSize = width of each cell, or a tuple of (width along columns, width
+    along rows); a negative width along rows is a grid whose first row is
+    its northernmost row (length)
+    origin = tuple of the (x, y) coordinates of the center of the first cell
+    (row 0, column 0) of the grid (length)
+
+    Returns
+    -------
+    cellXY = 2-D numpy array of shape (cells in the watershed, 2) with the
+    (x, y) coordinates of each cell center (length)
+    """
+    dx, dy = np.broadcast_to(np.asarray(cellSize, dtype=float), (2,))
+    rows, cols = np.nonzero(mask)
+    cellXY = np.column_stack((origin[0] + cols*dx, origin[1] + rows*dy))
+    return cellXY
+
+
+class ThiessenNetwork:
+    """Thiessen polygon weights of a network of rain gauges over a gridded
+    watershed. Instead of measuring polygon areas by hand, each grid cell
+    inside the watershed is assigned to its nearest gauge with a KD-tree,
+    and a gauge's weight is the fraction of the watershed's cells that are
+    assigned to it. Weights are cached for each set of working gauges, and
+    the few nearest gauges of every cell are saved when the network is made
+    so that when gauges drop out, only the cells whose nearest gauge
+    stopped working need to be assigned again
+
+    Parameters
+    ----------
+    gaugeXY = 2-D numpy array of shape (gauges, 2) with the (x, y)
+    coordinates of each rain gauge (length)
+    mask = 2-D boolean numpy array that is True for grid cells inside the
+    watershed
+    cellSize = width of each cell, or a tuple of (width along columns, width
+    along rows) (length)
+    origin = tuple of the (x, y) coordinates of the center of the first cell
+    (row 0, column 0) of the grid (length)
+    nNearest = number of nearest gauges saved for each cell
+    """
+
+    def __init__(self, gaugeXY, mask, cellSize=1.0, origin=(0.0, 0.0),
+                 nNearest=4):
+        from scipy.spatial import cKDTree
+
+        self.gaugeXY = np.asarray(gaugeXY, dtype=float)
+        self.nGauges = self.gaugeXY.shape[0]
+        self.cellXY = _cellCenters(mask, cellSize, origin)
+        self.cellArea = abs(np.prod(np.broadcast_to(cellSize, (2,))))
+        self.area = self.cellXY.shape[0]*self.cellArea
+
+        nNearest = min(nNearest, self.nGauges)
+        nearest = cKDTree(self.gaugeXY).query(self.cellXY, k=nNearest)[1]
+        self._nearest = nearest.reshape(self.cellXY.shape[0], nNearest)
+        self._cache = {}
+
+    def weights(self, active=None):
+        """Calculates the Thiessen weight of each gauge, which is the fraction
+        of the watershed's area that is closer to it than to any other working
+        gauge
+
+        Parameters
+        ----------
+        active = boolean numpy array that is True for working gauges, or
+        indices of the working gauges; every gauge works if not given
+
+        Returns
+        -------
+        weights = 1-D numpy array of the weight of each gauge, which is 0 for
+        gauges that aren't working; the weights add up to 1. The array is
+        cached and shared by later calls, so it is read-only; copy it before
+        changing it
+        """
+        isActive = np.ones(self.nGauges, dtype=bool)
+        if active is not None:
+            active = np.asarray(active)
+            if active.dtype != bool:
+                isActive[:] = False
+                isActive[active] = True
+            else:
+                isActive = active.copy()
+        key = isActive.tobytes()
+        if key in self._cache:
+            return self._cache[key]
+
+        activeIndex = np.flatnonzero(isActive)
+        if activeIndex.size == 0:
+            raise ValueError("at least 1 gauge must be working")
+
+        # each cell goes to the first working gauge among its nearest gauges
+        nearestActive = isActive[self._nearest]
+        assigned = self._nearest[np.arange(self._nearest.shape[0]),
+                                 np.argmax(nearestActive, axis=1)]
+        lost = ~nearestActive.any(axis=1)
+        if np.any(lost):
+            from scipy.spatial import cKDTree
+
+            tree = cKDTree(self.gaugeXY[activeIndex])
+            assigned[lost] = activeIndex[tree.query(self.cellXY[lost])[1]]
+
+        weights = np.bincount(assigned, minlength=self.nGauges)
+        weights = weights/assigned.size
+        weights.flags.writeable = False
+        self._cache[key] = weights
+        return weights
+
+    def areas(self, active=None):
+        """Calculates the area of each gauge's Thiessen polygon inside the
+        watershed, which can be given to thiessenPolygonEUD()
+
+        Parameters
+        ----------
+        active = boolean numpy array or indices of the working gauges; every
+        gauge works if not given
+
+        Returns
+        -------
+        areas = 1-D numpy array of the area of each Thiessen polygon (area)
+        """
+        return self.weights(active)*self.area
+
+    def seriesEUD(self, precip):
+        """Calculates the EUD at every time in a series of gauge readings.
+        Missing readings (NaN) are handled by using the weights of the gauges
+        that did have readings at that time, so each distinct set of missing
+        gauges only needs its weights calculated once, and all the times that
+        share a set are done with a single matrix-vector product
+
+        Parameters
+        ----------
+        precip = 2-D numpy array of shape (times, gauges) of rain gauge
+        readings (length)
+
+        Returns
+        -------
+        EUD = 1-D numpy array of the EUD at each time, NaN at times when no
+        gauge had a reading (length)
+        """
+        precip = np.asarray(precip, dtype=float)
+        missing = np.isnan(precip)
+        if not missing.any():
+            return precip @ self.weights()
+
+        EUD = np.full(precip.shape[0], np.nan)
+        patterns, patternIndex = np.unique(missing, axis=0,
+                                           return_inverse=True)
+        patternIndex = patternIndex.ravel()
+        filled = np.where(missing, 0, precip)
+        for number, pattern in enumerate(patterns):
+            if pattern.all():
+                continue
+            times = patternIndex == number
+            EUD[times] = filled[times] @ self.weights(~pattern)
+        return EUD
+# %%
+# Isohyetal method and interpolating gauge readings onto a grid
+
+
+def isohyetalSinglesEUD(isohyetes, area, totalArea) -> float:
+    """
+    Calculates Equivalent Uniform Depth of precipitation of a single region
+    between isohyetes. It does so by taking the mean of the isohyetes
+    and multiplying that by the area between the 2 isohyetes in the watershed
+    or the area bounded by that isohyete and the watershed
+
+
+    Parameters
+    -----------
+    isohyetes = numpy array of 1 or 2 isohyetes (mm)
+    area = area between isohyetes (km2)
+    totalArea = total area of the watershed (km2)
+    """
+    isohyeteMean = np.mean(isohyetes)
+    EUDsingle = area*isohyeteMean/totalArea
+
+    return EUDsingle
+
+
+def _linearVariogram(distance):
+    """Linear variogram with a slope of 1, which is the default variogram for
+    ordinary kriging. Only the shape of the variogram matters for the kriging
+    weights, so the slope is left at 1
+
+    Parameters
+    ----------
+    distance = numpy array of distances between points (length)
+
+    Returns
+    -------
+    semivariance = numpy array of semivariances
+    """
+    return distance
+
+
+def interpolationWeights(gaugeXY, mask, cellSize=1.0, origin=(0.0, 0.0),
+                         method="idw", nNeighbors=8, power=2.0,
+                         variogram=None, chunkSize=65536):
+    """Calculates the weights that interpolate rain gauge readings onto the
+    grid cells of a watershed. The weights only depend on where the gauges
+    are, so they are calculated once per gauge network and reused for every
+    time in a series of readings. Each cell only uses its nNeighbors nearest
+    gauges, which are found with a KD-tree, so the weights are a sparse
+    matrix
+
+    Parameters
+    ----------
+    gaugeXY = 2-D numpy array of shape (gauges, 2) with the (x, y)
+    coordinates of each rain gauge (length)
+    mask = 2-D boolean numpy array that is True for grid cells inside the
+    watershed
+    cellSize = width of each cell, or a tuple of (width along columns, width
+    along rows) (length)
+    origin = tuple of the (x, y) coordinates of the center of the first cell
+    (row 0, column 0) of the grid (length)
+    method = "idw" for inverse distance weighting or "kriging" for ordinary
+    kriging
+    nNeighbors = number of nearest gauges used for each cell
+    power = power of the distance in inverse distance weighting
+    variogram = function that takes a numpy array of distances and returns
+    semivariances, used for kriging; a linear variogram if not given
+    chunkSize = number of cells whose kriging systems are solved at a time
+
+    Returns
+    -------
+    weights = scipy sparse matrix of shape (cells in the watershed, gauges);
+    multiplying it by a vector of gauge readings gives the precipitation of
+    each cell, in the order of np.nonzero(mask)
+    """
+    from scipy import sparse
+    from scipy.spatial import cKDTree
+
+    gaugeXY = np.asarray(gaugeXY, dtype=float)
+    cellXY = _cellCenters(mask, cellSize, origin)
+    nCells = cellXY.shape[0]
+    k = min(nNeighbors, gaugeXY.shape[0])
+    distance, neighbors = cKDTree(gaugeXY).query(cellXY, k=k)
+    distance = distance.reshape(nCells, k)
+    neighbors = neighbors.reshape(nCells, k)
+
+    if method == "idw":
+        with np.errstate(divide="ignore"):
+            cellWeights = 1/distance**power
+        # cells that sit right on a gauge take that gauge's reading
+        onGauge = distance[:, 0] == 0
+        cellWeights[onGauge] = 0
+        cellWeights[onGauge, 0] = 1
+        cellWeights /= cellWeights.sum(axis=1, keepdims=True)
+    elif method == "kriging":
+        if variogram is None:
+            variogram = _linearVariogram
+        cellWeights = np.empty((nCells, k))
+        for start in range(0, nCells, chunkSize):
+            stop = min(start + chunkSize, nCells)
+            nearXY = gaugeXY[neighbors[start:stop]]
+            # kriging systems of every cell in the chunk, with the Lagrange
+            # multiplier in the last row and column
+            system = np.ones((stop - start, k + 1, k + 1))
+            system[:, :k, :k] = variogram(np.linalg.norm(
+                nearXY[:, :, None, :] - nearXY[:, None, :, :], axis=-1))
+            system[:, k, k] = 0
+            rhs = np.ones((stop - start, k + 1, 1))
+            rhs[:, :k, 0] = variogram(distance[start:stop])
+            cellWeights[start:stop] = np.linalg.solve(system, rhs)[:, :k, 0]
+    else:
+        raise ValueError("method must be 'idw' or 'kriging'")
+
+    rows = np.repeat(np.arange(nCells), k)
+    weights = sparse.csr_matrix((cellWeights.ravel(),
+                                 (rows, neighbors.ravel())),
+                                shape=(nCells, gaugeXY.shape[0]))
+    return weights
+
+
+def griddedPrecip(precip, weights):
+    """Interpolates a series of rain gauge readings onto the grid cells of a
+    watershed
+
+    Parameters
+    ----------
+    precip = numpy array of shape (times, gauges) or (gauges,) of rain gauge
+    readings (length)
+    weights = sparse matrix from interpolationWeights()
+
+    Returns
+    -------
+    grid = numpy array of shape (times, cells) or (cells,) of the
+    precipitation of each grid cell (length)
+    """
+    precip = np.asarray(precip, dtype=float)
+    grid = np.asarray((weights @ precip.T).T)
+    return grid
+
+
+def isohyetalEUD(grid, isohyetes, cellArea=1.0):
+    """Calculates the areas between isohyetes and the EUD of a watershed from
+    gridded precipitation, for every time at once. Each cell is put into an
+    isohyetal band with np.digitize, and the areas of the bands are counted
+    with a single bincount. As in isohyetalSinglesEUD(), the precipitation of
+    a band is the mean of the isohyetes around it, or the single isohyete that
+    bounds it for the lowest and highest bands
+
+    Parameters
+    ----------
+    grid = numpy array of shape (times, cells) or (cells,) of the
+    precipitation of each grid cell, e.g. from griddedPrecip() (length)
+    isohyetes = 1-D numpy array of isohyetes, from lowest to highest (length)
+    cellArea = area of each grid cell (area)
+
+    Returns
+    -------
+    list of the following 2 items:
+    bandAreas = numpy array of shape (times, isohyetes + 1) or
+    (isohyetes + 1,) with the area of each isohyetal band, from the band below
+    the lowest isohyete to the band above the highest one (area)
+    EUD = EUD of the watershed at each time (length)
+    """
+    grid = np.asarray(grid, dtype=float)
+    isohyetes = np.asarray(isohyetes, dtype=float)
+    grid2d = grid.reshape(-1, grid.shape[-1])
+    nTimes = grid2d.shape[0]
+    nBands = isohyetes.size + 1
+
+    bands = np.digitize(grid2d, isohyetes)
+    bands += nBands*np.arange(nTimes)[:, None]
+    bandAreas = np.bincount(bands.ravel(), minlength=nTimes*nBands)
+    bandAreas = cellArea*bandAreas.reshape(nTimes, nBands)
+
+    bandPrecip = np.concatenate((isohyetes[:1],
+                                 (isohyetes[:-1] + isohyetes[1:])/2,
+                                 isohyetes[-1:]))
+    EUD = bandAreas @ bandPrecip/(cellArea*grid2d.shape[1])
+
+    bandAreas = bandAreas.reshape(grid.shape[:-1] + (nBands,))
+    EUD = EUD.reshape(grid.shape[:-1])
+    return [bandAreas, EUD]
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to look up the Green-Ampt parameters of soils
+from their texture classes, using the table of Rawls, Brakensiek, and Miller
+(1983) that appears in Chow, Maidment, and Mays' Applied Hydrology (Table
+4.3.1). The table is kept as a single numpy array, so a whole raster of
+integer texture codes is turned into rasters of parameters with 1 fancy
+indexing gather, which can then go straight into the Green-Ampt functions in
+infiltration.py. This module can be imported by other scripts, which would
+then use the methods within this module
+"""
+
+import numpy as np
+
+# texture classes, in the order of their integer codes
+textureNames = ("sand", "loamy sand", "sandy loam", "loam", "silt loam",
+                "sandy clay loam", "clay loam", "silty clay loam",
+                "sandy clay", "silty clay", "clay")
+
+# columns of the table
+parameterNames = ("porosity", "effectivePorosity", "residual", "suction",
+                  "Ks")
+
+# porosity, effective porosity, wetting front suction head (cm), and
+# saturated hydraulic conductivity (cm/hr) of each texture class
+_rawlsBrakensiek = np.array([[0.437, 0.417, 4.95, 11.78],
+                             [0.437, 0.401, 6.13, 2.99],
+                             [0.453, 0.412, 11.01, 1.09],
+                             [0.463, 0.434, 8.89, 0.34],
+                             [0.501, 0.486, 16.68, 0.65],
+                             [0.398, 0.330, 21.85, 0.15],
+                             [0.464, 0.309, 20.88, 0.10],
+                             [0.471, 0.432, 27.30, 0.10],
+                             [0.430, 0.321, 23.90, 0.06],
+                             [0.479, 0.423, 29.22, 0.05],
+                             [0.475, 0.385, 31.63, 0.03]])
+
+# 1 row per parameter and 1 column per texture class, plus a last column of
+# NaNs that invalid codes are pointed to. The residual water content is the
+# porosity minus the effective porosity
+textureTable = np.vstack([_rawlsBrakensiek[:, 0], _rawlsBrakensiek[:, 1],
+                          _rawlsBrakensiek[:, 0] - _rawlsBrakensiek[:, 1],
+                          _rawlsBrakensiek[:, 2], _rawlsBrakensiek[:, 3]])
+textureTable = np.hstack([textureTable,
+                          np.full((len(parameterNames), 1), np.nan)])
+# %%
+
+
+def textureCode(name):
+    """Finds the integer code of a texture class
+
+    Parameters
+    ----------
+    name = name of the texture class, e.g. "silt loam" (not case-sensitive)
+
+    Returns
+    -------
+    code = integer code of the texture class
+    """
+    try:
+        return textureNames.index(name.strip().lower())
+    except ValueError:
+        raise ValueError(f"unknown soil texture {name!r}; the textures are "
+                         f"{', '.join(textureNames)}") from None
+
+
+def textureParameters(textures, nodata=None):
+    """Looks up the parameters of every cell of a texture raster
+
+    Parameters
+    ----------
+    textures = integer texture code(s); an int or a numpy array of any shape,
+    e.g. a texture class raster. Codes that aren't in the table (including
+    negative codes) give NaN parameters
+    nodata = texture code that marks missing cells, which give NaN parameters
+
+    Returns
+    -------
+    parameters = dict of numpy arrays with the shape of textures:
+    "porosity", "effectivePorosity", "residual" (residual water content),
+    "suction" (wetting front suction head, cm), and "Ks" (saturated hydraulic
+    conductivity, cm/hr)
+    """
+    textures = np.asarray(textures)
+    nTextures = len(textureNames)
+    valid = (textures >= 0) & (textures < nTextures)
+    if nodata is not None:
+        valid &= textures != nodata
+    columns = np.where(valid, textures, nTextures).astype(np.intp)
+
+    gathered = textureTable[:, columns]
+    parameters = dict(zip(parameterNames, gathered))
+    return parameters
+
+
+def greenAmptParameters(textures, effectiveSaturation=0.0, nodata=None):
+    """Looks up the Green-Ampt parameters of every cell of a texture raster,
+    in the order that the functions in infiltration.py take them, e.g.
+    infil.stormEndBatch(*greenAmptParameters(textures, 0.3), rate, duration)
+
+    Parameters
+    ----------
+    textures = integer texture code(s); an int or a numpy array of any shape
+    effectiveSaturation = initial effective saturation, (theta - residual)/
+    effective porosity, from 0 (dry) to 1 (saturated); a float or a numpy
+    array that broadcasts against textures
+    nodata = texture code that marks missing cells
+
+    Returns
+    -------
+    tuple of the following 4 numpy arrays with the shape of textures, which
+    are NaN for invalid or missing cells:
+    Ks = saturated hydraulic conductivity (cm/hr)
+    presHead = wetting front suction head (cm)
+    thetaSat = saturated water content, the porosity
+    thetaInit = initial water content
+    """
+    parameters = textureParameters(textures, nodata)
+    thetaInit = (parameters["residual"]
+                 + effectiveSaturation*parameters["effectivePorosity"])
+    return (parameters["Ks"], parameters["suction"], parameters["porosity"],
+            thetaInit)
@@ -0,0 +1,1001 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Dec  2 00:35:50 2020
+
+@author: Brian Chung
+The purpose of this module is to calculate/model streamflow
+"""
+
+import os
+
+import numpy as np
+
+# %%
+"""The Soil Conservation Service Curve Number method. This method calculates
+direct runoff aka rainfall excess aka effective rainfall (P*) aka event flow
+volume (Q*). This method seems to have come from the Soil Conservation Service,
+which is formerly a wing under the USDA and is now called the Natural Resources
+Conservation Service"""
+
+
+def initialAbstraction(S):
+    """Calculates the initial abstraction (Ia)
+
+    Parameters
+    ----------
+    S : float or numpy array
+        Potential max retention, which is the total amount of water that a soil
+        can hold (inches)
+
+    Returns
+    -------
+    Ia = initial abstraction; the initial infiltrated amount (inches)
+
+    """
+    Ia = 0.2*S
+    return Ia
+
+
+def potentialMaxRetention(CN):
+    """Calculates the potential max retention, which is the total amount of
+    water that a soil can hold (inches)
+
+    Parameters
+    ----------
+    CN : float, int, or numpy array
+        The curve number, which is a number that represents soil properties.
+        Curve numbers are also used to described paved surfaces as well.
+
+    Returns
+    -------
+    S : float or numpy array
+        Potential max retention, which is the total amount of water that a soil
+        can hold (inches)
+
+    """
+    S = (1000/CN) - 10
+    return S
+
+
+def QfromIa_S_P(Ia, S, P):
+    """Calculates runoff using the initial abstraction (Ia), the potential max
+    retention (S), and the precipitation (P)
+
+    Parameters
+    ----------
+    Ia : float or numpy array
+        initial abstraction; the initial infiltrated amount (inches)
+    S : float or numpy array
+        Potential max retention, which is the total amount of water that a soil
+        can hold (inches)
+    P : float or numpy array
+        rainfall amount (inches)
+
+    Returns
+    -------
+    Q : float or numpy array
+        direct runoff amount (inches)
+
+    """
+    # no runoff happens until the initial abstraction has been satisfied
+    excessP = np.maximum(P - Ia, 0)
+    numerator = excessP**2
+    denominator = excessP + S
+    Q = numerator/denominator
+    return Q
+
+
+def QfromS_P(S, P):
+    """Calculates runoff using the potential max retention (S), and
+    precipitation (P)
+
+    Parameters
+    ----------
+    S : float or numpy array
+        Potential max retention, which is the total amount of water that a soil
+        can hold (inches)
+    P : float or numpy array
+        rainfall amount (inches)
+
+    Returns
+    -------
+    Q : float or numpy array
+        direct runoff amount (inches)
+
+    """
+    # no runoff happens until the initial abstraction (0.2*S) has been
+    # satisfied
+    excessP = np.maximum(P - (0.2*S), 0)
+    numerator = excessP**2
+    denominator = excessP + S
+    Q = numerator/denominator
+    return Q
+
+
+def QfromP_CN(P, CN):
+    """Calculates runoff using precipitation (P) and the curve number (CN).
+
+    Parameters
+    ----------
+    P : float or numpy array
+        rainfall amount (inches)
+    CN : float, int, or numpy array
+        The curve number, which is a number that represents soil properties.
+        Curve numbers are also used to described paved surfaces as well.
+
+    Returns
+    -------
+    Q : float or numpy array
+        direct runoff amount (inches)
+
+    """
+    # no runoff happens until the initial abstraction (200/CN - 2) has been
+    # satisfied
+    excessP = np.maximum(P - (200/CN) + 2, 0)
+    numerator = excessP**2
+    denominator = excessP + (1000/CN) - 10
+    Q = numerator/denominator
+    return Q
+
+
+def _QfromP_CNtile(P, S, Ia, out, scratch):
+    """Calculates runoff for 1 tile of a precipitation raster without
+    allocating any arrays. Every step is a numpy ufunc writing into out or
+    scratch, which have the same shape as P
+
+    Parameters
+    ----------
+    P : numpy array
+        rainfall amount (inches)
+    S : numpy array
+        Potential max retention of the same cells (inches)
+    Ia : numpy array
+        initial abstraction of the same cells (inches)
+    out : numpy array
+        Array that the direct runoff amount (inches) is written into
+    scratch : numpy array
+        Array of the same shape that holds intermediate values
+
+    Returns
+    -------
+    out : numpy array
+        direct runoff amount (inches)
+
+    """
+    np.subtract(P, Ia, out=out)
+    np.maximum(out, 0, out=out)
+    np.add(out, S, out=scratch)
+    # the denominator is only 0 where the numerator is 0 too (CN = 100 and
+    # no rain), and those cells have no runoff
+    np.maximum(scratch, np.finfo(scratch.dtype).tiny, out=scratch)
+    np.square(out, out=out)
+    np.divide(out, scratch, out=out)
+    return out
+
+
+def QfromP_CNgrid(P, CN, out=None, tileSize=2**20, workers=1):
+    """Calculates runoff using precipitation (P) and the curve number (CN) for
+    rasters that are too big to hold in memory, such as a continental CN grid
+    with a stack of daily precipitation grids. The rasters are worked through
+    in tiles of cells, so only a handful of tile-sized buffers are held in
+    memory per worker no matter how big the rasters are. P, CN, and out can
+    be memory-mapped arrays (np.memmap or np.load(..., mmap_mode="r")) or paths
+    to .npy files, which are memory-mapped
+
+    Parameters
+    ----------
+    P : numpy array or str
+        rainfall amount (inches). The last axes have the shape of CN and any
+        axes before them (e.g. days) are worked through one at a time
+    CN : numpy array or str
+        The curve number raster, with values greater than 0 and up to 100
+    out : numpy array or str, optional
+        C-contiguous array of the same shape as P that the runoff is written
+        into, or the path of a .npy file to create for it. A new float64
+        array is made if this is not given
+    tileSize : int
+        Number of cells in each tile
+    workers : int
+        Number of threads that tiles are spread across. numpy releases the
+        GIL inside its ufuncs, so tiles are calculated on separate cores
+
+    Returns
+    -------
+    out : numpy array
+        direct runoff amount (inches), with the shape of P
+
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if isinstance(P, str):
+        P = np.load(P, mmap_mode="r")
+    if isinstance(CN, str):
+        CN = np.load(CN, mmap_mode="r")
+    if isinstance(out, str):
+        out = np.lib.format.open_memmap(out, mode="w+", dtype=np.float64,
+                                        shape=P.shape)
+    elif out is None:
+        out = np.empty(P.shape)
+
+    nCells = CN.size
+    if P.shape[P.ndim - CN.ndim:] != CN.shape:
+        raise ValueError("the last axes of P must have the shape of CN")
+    if out.shape != P.shape:
+        raise ValueError("out must have the shape of P")
+    # reshaping a non-contiguous out would copy it, and the runoff would be
+    # written into the copy instead
+    if not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+    P2d = P.reshape(-1, nCells)
+    out2d = out.reshape(-1, nCells)
+    CN1d = CN.reshape(nCells)
+
+    def runTile(start):
+        stop = min(start + tileSize, nCells)
+        # S and Ia only depend on CN, so they are reused for every time
+        S = np.empty(stop - start, dtype=out.dtype)
+        Ia = np.empty_like(S)
+        buffer = np.empty_like(S)
+        scratch = np.empty_like(S)
+        np.divide(1000, CN1d[start:stop], out=S)
+        np.subtract(S, 10, out=S)
+        np.multiply(S, 0.2, out=Ia)
+        for row in range(P2d.shape[0]):
+            _QfromP_CNtile(P2d[row, start:stop], S, Ia, buffer, scratch)
+            out2d[row, start:stop] = buffer
+
+    starts = range(0, nCells, tileSize)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(runTile, starts))
+    else:
+        for start in starts:
+            runTile(start)
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+def scenarioRunoff(area, CN, scenario, P, baseline=None):
+    """Calculates the total runoff volume of every land use scenario in a
+    parcel table, as well as the percent change in runoff from a baseline
+    scenario (e.g. before development). Each row of the table is a parcel
+    (or part of one) with an area, a curve number, and the scenario it
+    belongs to. Runoff depths are only calculated once per distinct curve
+    number and precipitation depth, so parcels whose land use is the same
+    across scenarios share the same calculation, and the areas are summed by
+    scenario and curve number in a single grouped pass
+
+    Parameters
+    ----------
+    area : numpy array
+        Area of each parcel (e.g. acres)
+    CN : numpy array
+        The curve number of each parcel
+    scenario : numpy array
+        Integer id of the scenario each parcel belongs to
+    P : float or numpy array
+        rainfall amount(s) to calculate runoff for (inches)
+    baseline : int, optional
+        Id of the scenario that percent changes are measured from. The
+        scenario with the lowest id is used if this is not given
+
+    Returns
+    -------
+    scenarioIds : numpy array
+        The sorted scenario ids
+    volume : numpy array
+        Runoff volume of shape (scenarios, rainfall amounts), in the area unit
+        times feet (e.g. acre-ft)
+    percentChange : numpy array
+        Percent change in runoff volume from the baseline scenario, of the
+        same shape as volume; NaN for rainfall amounts that give no runoff
+        in the baseline scenario
+
+    """
+    area = np.asarray(area, dtype=float)
+    P = np.atleast_1d(np.asarray(P, dtype=float))
+    uniqueCN, cnIndex = np.unique(CN, return_inverse=True)
+    scenarioIds, scenarioIndex = np.unique(scenario, return_inverse=True)
+    nCN = uniqueCN.size
+    nScenarios = scenarioIds.size
+
+    # total area of each curve number within each scenario
+    groups = scenarioIndex.ravel()*nCN + cnIndex.ravel()
+    areaByCN = np.bincount(groups, weights=area.ravel(),
+                           minlength=nScenarios*nCN).reshape(nScenarios, nCN)
+
+    # runoff depths are converted from inches to feet
+    Q = QfromP_CN(P[None, :], uniqueCN[:, None])
+    volume = areaByCN @ (Q/12)
+
+    if baseline is None:
+        baselineIndex = 0
+    else:
+        baselineIndex = np.flatnonzero(scenarioIds == baseline)
+        if baselineIndex.size == 0:
+            raise ValueError("baseline is not one of the scenario ids")
+        baselineIndex = baselineIndex[0]
+    baselineVolume = volume[baselineIndex]
+    # there is no percent change from a baseline without runoff
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentChange = np.where(baselineVolume > 0,
+                                 100*(volume - baselineVolume)/baselineVolume,
+                                 np.nan)
+    return scenarioIds, volume, percentChange
+
+# %%
+"""Unit hydrographs. A unit hydrograph is the streamflow produced by 1 unit
+of effective rainfall (runoff) falling over a basin in a single interval. The
+streamflow from a whole storm is found by adding up copies of the unit
+hydrograph that are scaled by the effective rainfall of each interval and
+lagged by the start of that interval, which is a discrete convolution"""
+
+
+def stormHydrograph(unitHydro, excessRain, baseflow=0, pulseSpacing=1,
+                    method="auto"):
+    """Calculates the streamflow of a storm by convolving a unit hydrograph
+    with a hyetograph of effective rainfall (rainfall excess) and then adding
+    baseflow. Every axis except the last one is a batch axis, so many
+    hyetographs and many basins can be run at once by giving the arrays
+    shapes that broadcast against each other, e.g. unit hydrographs of shape
+    (basins, 1, ordinates) and hyetographs of shape (storms, intervals) give
+    hydrographs of shape (basins, storms, time)
+
+    Parameters
+    ----------
+    unitHydro : numpy array
+        Unit hydrograph ordinates along the last axis (streamflow per unit of
+        effective rainfall, e.g. m3/sec for 1 cm of runoff)
+    excessRain : numpy array
+        Effective rainfall of each interval along the last axis, in the same
+        unit of depth as the unit hydrograph (e.g. cm)
+    baseflow : float or numpy array
+        Baseflow that is added to the event flow. A numpy array must broadcast
+        against the returned hydrograph, e.g. a series along the last axis
+    pulseSpacing : int
+        Number of unit hydrograph ordinates per hyetograph interval, e.g. 2
+        for a unit hydrograph with 1 hour ordinates and a hyetograph with
+        2 hour intervals
+    method : str
+        "direct" adds up lagged copies of the unit hydrograph, "fft" uses the
+        fast Fourier transform, which keeps long records O(n log n), and
+        "auto" picks "fft" when both the unit hydrograph and the hyetograph
+        are long
+
+    Returns
+    -------
+    Q : numpy array
+        Streamflow at the time of each unit hydrograph ordinate, starting at
+        the start of the storm. The last axis has a length of
+        (intervals - 1)*pulseSpacing + ordinates
+
+    """
+    unitHydro = np.asarray(unitHydro, dtype=float)
+    excessRain = np.asarray(excessRain, dtype=float)
+
+    # placing each pulse of effective rainfall on the unit hydrograph's clock
+    if pulseSpacing > 1:
+        pulses = np.zeros(excessRain.shape[:-1]
+                          + ((excessRain.shape[-1] - 1)*pulseSpacing + 1,))
+        pulses[..., ::pulseSpacing] = excessRain
+        excessRain = pulses
+
+    nOrdinates = unitHydro.shape[-1]
+    nPulses = excessRain.shape[-1]
+    nTimes = nOrdinates + nPulses - 1
+    batchShape = np.broadcast_shapes(unitHydro.shape[:-1],
+                                     excessRain.shape[:-1])
+    if method == "auto":
+        method = "fft" if min(nOrdinates, nPulses) > 64 else "direct"
+
+    if method == "fft":
+        from scipy import fft
+
+        nFFT = fft.next_fast_len(nTimes, real=True)
+        spectrum = (fft.rfft(unitHydro, nFFT, axis=-1)
+                    * fft.rfft(excessRain, nFFT, axis=-1))
+        eventFlow = fft.irfft(spectrum, nFFT, axis=-1)[..., :nTimes]
+    elif method == "direct":
+        # looping over whichever of the 2 series is shorter
+        if nOrdinates > nPulses:
+            unitHydro, excessRain = excessRain, unitHydro
+        eventFlow = np.zeros(batchShape + (nTimes,))
+        nLong = excessRain.shape[-1]
+        for lag in range(unitHydro.shape[-1]):
+            eventFlow[..., lag:lag + nLong] += (unitHydro[..., lag:lag + 1]
+                                                * excessRain)
+    else:
+        raise ValueError("method must be 'auto', 'direct', or 'fft'")
+
+    Q = eventFlow + baseflow
+    return Q
+
+
+def _pulseMatrix(excessRain, nRows, nOrdinates, pulseSpacing):
+    """Builds the sparse Toeplitz matrix that convolves a unit hydrograph with
+    a hyetograph of effective rainfall, so that
+    _pulseMatrix(...) @ unitHydro == stormHydrograph(unitHydro, excessRain)
+    for the first nRows ordinates of the storm hydrograph
+
+    Parameters
+    ----------
+    excessRain : numpy array
+        Effective rainfall of each interval (depth)
+    nRows : int
+        Number of streamflow ordinates that the matrix produces
+    nOrdinates : int
+        Number of unit hydrograph ordinates
+    pulseSpacing : int
+        Number of unit hydrograph ordinates per hyetograph interval
+
+    Returns
+    -------
+    A : scipy.sparse.csr_matrix
+        Matrix of shape (nRows, nOrdinates)
+
+    """
+    from scipy import sparse
+
+    excessRain = np.asarray(excessRain, dtype=float)
+    pulses = np.flatnonzero(excessRain)
+    rows = pulses[:, None]*pulseSpacing + np.arange(nOrdinates)
+    cols = np.broadcast_to(np.arange(nOrdinates), rows.shape)
+    values = np.broadcast_to(excessRain[pulses, None], rows.shape)
+    inside = rows < nRows
+    A = sparse.csr_matrix((values[inside], (rows[inside], cols[inside])),
+                          shape=(nRows, nOrdinates))
+    return A
+
+
+def _fitUnitHydrograph(args):
+    """Derives the unit hydrograph of a single basin. Kept at the top level of
+    the module so that it can be sent to worker processes
+
+    Parameters
+    ----------
+    args : tuple
+        (basin, events, nOrdinates, smoothing, pulseSpacing, nonNegative),
+        where basin is the basin's number, used in error messages, and the
+        rest are the same as the arguments of deriveUnitHydrographs() but for
+        1 basin
+
+    Returns
+    -------
+    tuple of the unit hydrograph and its RMSE, Nash-Sutcliffe efficiency,
+    and number of events
+
+    """
+    from scipy import linalg, sparse
+    from scipy.optimize import nnls
+
+    basin, events, nOrdinates, smoothing, pulseSpacing, nonNegative = args
+    runoff = [np.asarray(event[1], dtype=float) for event in events]
+    A = sparse.vstack([_pulseMatrix(event[0], flow.size, nOrdinates,
+                                    pulseSpacing)
+                       for event, flow in zip(events, runoff)]).tocsr()
+    q = np.concatenate(runoff)
+    if smoothing == 0 and A.shape[0] < nOrdinates:
+        raise ValueError(f"basin {basin} has {A.shape[0]} runoff values, "
+                         f"fewer than the {nOrdinates} unit hydrograph "
+                         "ordinates; use fewer ordinates or smoothing > 0")
+
+    # the second differences of the unit hydrograph are penalized so that
+    # noisy events don't give it a jagged shape. The penalty is scaled by the
+    # average diagonal of A.T @ A, so that smoothing doesn't depend on the
+    # rainfall depths of the events
+    AtA = (A.T @ A).toarray()
+    scale = np.trace(AtA)/nOrdinates
+    secondDiff = sparse.diags([1.0, -2.0, 1.0], [0, 1, 2],
+                              shape=(max(nOrdinates - 2, 0), nOrdinates))
+    normalMatrix = AtA + smoothing*scale*(secondDiff.T @ secondDiff).toarray()
+    rhs = A.T @ q
+
+    try:
+        if nonNegative:
+            # min |Au - q|^2 + penalty*|Du|^2 is the same as min |Ru - z|^2
+            # where R is the Cholesky factor of the normal matrix
+            R = linalg.cholesky(normalMatrix)
+            z = linalg.solve_triangular(R, rhs, trans="T")
+            unitHydro = nnls(R, z)[0]
+        else:
+            unitHydro = linalg.solve(normalMatrix, rhs, assume_a="pos")
+    except linalg.LinAlgError:
+        raise ValueError(f"the unit hydrograph of basin {basin} can't be "
+                         "determined from its events (the least squares "
+                         "problem is singular); use fewer ordinates or "
+                         "smoothing > 0") from None
+
+    residuals = A @ unitHydro - q
+    rmse = np.sqrt(np.mean(residuals**2))
+    nse = 1 - np.sum(residuals**2)/np.sum((q - q.mean())**2)
+    return unitHydro, rmse, nse, len(events)
+
+
+def deriveUnitHydrographs(basinEvents, nOrdinates, smoothing=0.0,
+                          pulseSpacing=1, nonNegative=True, workers=1):
+    """Derives a unit hydrograph for each basin from all of its recorded
+    events at once. Each event is a hyetograph of effective rainfall and the
+    direct runoff (streamflow minus baseflow) it produced. The unit hydrograph
+    is found by deconvolution: the events' sparse Toeplitz convolution
+    matrices are stacked and solved as a single regularized least squares
+    problem, so that the unit hydrograph reproduces every event as closely as
+    possible. This works for a single event too, such as the one in homework 4,
+    where it gives the event flow divided by the runoff depth
+
+    Parameters
+    ----------
+    basinEvents : list
+        One list per basin of (excessRain, directRunoff) pairs of 1-D numpy
+        arrays. excessRain is the effective rainfall of each interval (depth,
+        e.g. cm) and directRunoff is the direct runoff at each unit hydrograph
+        ordinate, starting at the start of the storm (e.g. m3/sec)
+    nOrdinates : int
+        Number of unit hydrograph ordinates
+    smoothing : float
+        Weight of the penalty on the unit hydrograph's second differences,
+        relative to the average diagonal of the events' normal matrix
+        (A.T @ A), so it is dimensionless and means the same for small and
+        large rainfall depths; 0 gives the plain least squares solution
+    pulseSpacing : int
+        Number of unit hydrograph ordinates per hyetograph interval
+    nonNegative : bool
+        Whether the unit hydrograph is kept from going below 0
+    workers : int
+        Number of processes that basins are spread across; 1 runs every basin
+        in this process
+
+    Returns
+    -------
+    unitHydros : numpy array
+        Unit hydrographs of shape (basins, nOrdinates), e.g. m3/sec for 1 cm
+        of runoff
+    diagnostics : dict
+        numpy arrays of each basin's root mean square error ("rmse"),
+        Nash-Sutcliffe efficiency ("nse"), and number of events ("events")
+
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    tasks = [(basin, events, nOrdinates, smoothing, pulseSpacing,
+              nonNegative)
+             for basin, events in enumerate(basinEvents)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks)//(4*workers))
+            fits = list(pool.map(_fitUnitHydrograph, tasks,
+                                 chunksize=chunksize))
+    else:
+        fits = [_fitUnitHydrograph(task) for task in tasks]
+
+    unitHydros = np.array([fit[0] for fit in fits]).reshape(-1, nOrdinates)
+    diagnostics = {"rmse": np.array([fit[1] for fit in fits]),
+                   "nse": np.array([fit[2] for fit in fits]),
+                   "events": np.array([fit[3] for fit in fits])}
+    return unitHydros, diagnostics
+
+# %%
+"""Baseflow separation. Streamflow is split into baseflow, which comes from
+groundwater and changes slowly, and quickflow (event flow), which is the
+direct runoff from storms. Instead of subtracting a constant baseflow, the
+recursive digital filters treat baseflow as the low-frequency part of the
+record. Both filters are linear until they reach the limits on baseflow
+(0 and the streamflow), so they run as IIR filters with scipy.signal.lfilter
+between the time steps where a limit is reached, and their filter state can
+be carried from one chunk of a record to the next"""
+
+
+def _filterState(b, a, Q, zi):
+    """Returns the initial state of a first-order filter: the state passed in,
+    or, at the start of a record, the steady state for a constant flow equal
+    to the first flow"""
+    from scipy import signal
+
+    if zi is not None:
+        return np.asarray(zi, dtype=float)
+    return signal.lfilter_zi(b, a)*Q[..., :1]
+
+
+def _boundedFilter(b, a, Q, zi, lower, upper, window=64):
+    """Runs a first-order filter, y[t] = b[0]*Q[t] + b[1]*Q[t-1] - a[1]*y[t-1],
+    along the last axis of Q with y kept between lower and upper at every
+    step, so the steps after a limit is reached start from the limited value.
+    Between the limits the filter is linear, so it runs with lfilter over
+    windows that double in length until a step goes past a limit. Once y is
+    on a limit, the next step only depends on Q and the limit, so the steps
+    that stay on the limit are found for the whole record at once
+
+    Parameters
+    ----------
+    b, a : numpy arrays
+        Filter coefficients, with a[0] = 1 and at most 2 of each
+    Q : numpy array
+        Input, with time along the last axis
+    zi : numpy array
+        Filter state before the first step, of shape Q.shape[:-1] + (1,)
+    lower, upper : float or numpy array
+        Limits of y, which broadcast against Q
+    window : int
+        Length of the first lfilter window after each limit
+
+    Returns
+    -------
+    y : numpy array
+        Filter output, the same shape as Q
+    zf : numpy array
+        Filter state after the last step, of shape Q.shape[:-1] + (1,)
+
+    """
+    from scipy import signal
+
+    b0, b1 = (list(b) + [0.0])[:2]
+    a1 = a[1]
+    lower = np.broadcast_to(lower, Q.shape)
+    upper = np.broadcast_to(upper, Q.shape)
+    zi = np.broadcast_to(zi, Q.shape[:-1] + (1,))
+    y = np.empty_like(Q)
+    zf = np.empty(Q.shape[:-1] + (1,))
+    nSteps = Q.shape[-1]
+
+    for index in np.ndindex(Q.shape[:-1]):
+        flow, low, high, out = Q[index], lower[index], upper[index], y[index]
+        # the step after one on a limit, if the limit is reached again
+        onLimit = {}
+        for limit, crosses in ((low, np.less), (high, np.greater)):
+            following = b0*flow[1:] + b1*flow[:-1] - a1*limit[:-1]
+            # indices of the steps that would leave the limit
+            onLimit[id(limit)] = 1 + np.flatnonzero(
+                ~crosses(following, limit[1:]))
+
+        state = np.array(zi[index], dtype=float)
+        start, size = 0, window
+        while start < nSteps:
+            stop = min(start + size, nSteps)
+            part, partState = signal.lfilter(b, a, flow[start:stop],
+                                             zi=state)
+            crossed = np.flatnonzero((part < low[start:stop])
+                                     | (part > high[start:stop]))
+            if crossed.size == 0:
+                out[start:stop] = part
+                state, start, size = partState, stop, 2*size
+                continue
+
+            step = start + crossed[0]
+            out[start:step] = part[:crossed[0]]
+            limit = low if part[crossed[0]] < low[step] else high
+            leaves = onLimit[id(limit)]
+            following = np.searchsorted(leaves, step + 1)
+            end = leaves[following] if following < leaves.size else nSteps
+            out[step:end] = limit[step:end]
+            state = np.array([b1*flow[end - 1] - a1*out[end - 1]])
+            start, size = end, window
+        zf[index] = state
+    return y, zf
+
+
+def lyneHollickBaseflow(Q, alpha=0.925, zi=None):
+    """Separates baseflow with the Lyne-Hollick recursive digital filter,
+    which filters quickflow out of the streamflow:
+    q[t] = alpha*q[t-1] + (1 + alpha)/2*(Q[t] - Q[t-1]),
+    and baseflow is Q - q. The quickflow is kept between 0 and the
+    streamflow at every step, so the recursion carries on from the limited
+    value, and baseflow stays between 0 and the streamflow
+
+    Parameters
+    ----------
+    Q : numpy array
+        Streamflow, with time along the last axis; the other axes are gauges.
+        Gaps have to be filled first, since a NaN spreads to every later value
+    alpha : float
+        Filter parameter; 0.925 is the usual value for daily flows, and values
+        closer to 1 suit shorter time steps
+    zi : numpy array, optional
+        Filter state returned by the previous chunk of the record, of shape
+        Q.shape[:-1] + (1,). At the start of a record the quickflow starts at 0
+
+    Returns
+    -------
+    baseflow : numpy array
+        Baseflow, the same shape as Q
+    zf : numpy array
+        Filter state at the end of the chunk, which is passed as zi for the
+        next chunk
+
+    """
+    Q = np.asarray(Q, dtype=float)
+    b = np.array([1 + alpha, -(1 + alpha)])/2
+    a = np.array([1, -alpha])
+    quickflow, zf = _boundedFilter(b, a, Q, _filterState(b, a, Q, zi), 0.0, Q)
+    return Q - quickflow, zf
+
+
+def eckhardtBaseflow(Q, alpha=0.98, BFImax=0.8, zi=None):
+    """Separates baseflow with the Eckhardt recursive digital filter:
+    b[t] = ((1 - BFImax)*alpha*b[t-1] + (1 - alpha)*BFImax*Q[t])
+           / (1 - alpha*BFImax),
+    which is kept from going above the streamflow at every step, so the
+    recursion carries on from the limited value
+
+    Parameters
+    ----------
+    Q : numpy array
+        Streamflow, with time along the last axis; the other axes are gauges.
+        Gaps have to be filled first, since a NaN spreads to every later value
+    alpha : float
+        Recession constant of baseflow over 1 time step
+    BFImax : float
+        Largest long-term baseflow index (baseflow/streamflow) the filter
+        can give; about 0.8 for perennial streams on porous aquifers, 0.5 for
+        ephemeral streams, and 0.25 for perennial streams on hard rock
+    zi : numpy array, optional
+        Filter state returned by the previous chunk of the record, of shape
+        Q.shape[:-1] + (1,). At the start of a record the baseflow starts at
+        BFImax times the first streamflow
+
+    Returns
+    -------
+    baseflow : numpy array
+        Baseflow, the same shape as Q
+    zf : numpy array
+        Filter state at the end of the chunk, which is passed as zi for the
+        next chunk
+
+    """
+    Q = np.asarray(Q, dtype=float)
+    b = np.array([(1 - alpha)*BFImax/(1 - alpha*BFImax)])
+    a = np.array([1, -(1 - BFImax)*alpha/(1 - alpha*BFImax)])
+    return _boundedFilter(b, a, Q, _filterState(b, a, Q, zi), -np.inf, Q)
+
+
+def localMinimumBaseflow(Q, window):
+    """Separates baseflow with the local minimum method of HYSEP (Sloto and
+    Crouse, 1996): a flow is a local minimum if it is the lowest flow in the
+    window centered on it, and baseflow is interpolated linearly between the
+    local minima and kept from going above the streamflow. This method needs
+    the flows after each time step, so it works on whole records rather than
+    chunks
+
+    Parameters
+    ----------
+    Q : numpy array
+        Streamflow, with time along the last axis; the other axes are gauges
+    window : int
+        Width of the window in time steps, which is made odd. HYSEP uses the
+        odd number of days closest to 2*A**0.2, with A the drainage area in
+        square miles
+
+    Returns
+    -------
+    baseflow : numpy array
+        Baseflow, the same shape as Q; NaN where Q is NaN
+
+    """
+    from scipy.ndimage import minimum_filter1d
+
+    Q = np.asarray(Q, dtype=float)
+    window = int(window) | 1
+    # NaNs are left out of the minimums by treating them as infinite flows
+    finiteQ = np.where(np.isnan(Q), np.inf, Q)
+    windowMin = minimum_filter1d(finiteQ, window, axis=-1, mode="nearest")
+    isMinimum = (finiteQ == windowMin) & np.isfinite(finiteQ)
+
+    flows = Q.reshape(-1, Q.shape[-1])
+    minima = isMinimum.reshape(flows.shape)
+    steps = np.arange(Q.shape[-1])
+    baseflow = np.full(flows.shape, np.nan)
+    for gauge in range(flows.shape[0]):
+        if np.any(minima[gauge]):
+            baseflow[gauge] = np.interp(steps, steps[minima[gauge]],
+                                        flows[gauge, minima[gauge]])
+    baseflow = np.fmin(baseflow.reshape(Q.shape), Q)
+    baseflow[np.isnan(Q)] = np.nan
+    return baseflow
+
+# %%
+"""Channel routing. The Muskingum method moves a hydrograph down a reach by
+treating the reach as storage that is a weighted mix of inflow and outflow,
+S = K*(X*I + (1 - X)*O), which gives the recursion
+O[t] = C0*I[t] + C1*I[t-1] + C2*O[t-1]. A river network is routed from the
+headwaters down: reaches are grouped into levels, where every reach in a
+level only has upstream reaches in earlier levels, so all of the reaches in
+a level are routed together"""
+
+
+def muskingumCoefficients(K, X, dt):
+    """Calculates the routing coefficients of the Muskingum method. The
+    coefficients are all positive when 2*K*X <= dt <= 2*K*(1 - X)
+
+    Parameters
+    ----------
+    K : float or numpy array
+        Travel time through the reach (units of time)
+    X : float or numpy array
+        Weighting factor, from 0 (reservoir-like storage) to 0.5 (pure
+        translation)
+    dt : float
+        Time step (same units as K)
+
+    Returns
+    -------
+    C0, C1, C2 : numpy arrays
+        Weights of the current inflow, the previous inflow, and the previous
+        outflow, which add up to 1
+
+    """
+    K = np.asarray(K, dtype=float)
+    X = np.asarray(X, dtype=float)
+    denominator = 2*K*(1 - X) + dt
+    C0 = (dt - 2*K*X)/denominator
+    C1 = (dt + 2*K*X)/denominator
+    C2 = (2*K*(1 - X) - dt)/denominator
+    return C0, C1, C2
+
+
+def muskingumCungeParameters(length, slope, celerity, topWidth,
+                             referenceFlow):
+    """Calculates Muskingum K and X from the channel's properties with the
+    Muskingum-Cunge method, which picks X so that the routing spreads the
+    flood wave as much as the diffusion of a real channel would
+
+    Parameters
+    ----------
+    length : float or numpy array
+        Length of the reach (m)
+    slope : float or numpy array
+        Slope of the channel bed
+    celerity : float or numpy array
+        Speed of the flood wave (m/sec), about 5/3 of the water's velocity in
+        a wide channel
+    topWidth : float or numpy array
+        Width of the water surface (m)
+    referenceFlow : float or numpy array
+        Flow that the parameters are calculated for (m3/sec), often the
+        average of the baseflow and the peak inflow
+
+    Returns
+    -------
+    K : numpy array
+        Travel time through the reach (sec)
+    X : numpy array
+        Weighting factor, which is at most 0.5
+
+    """
+    length = np.asarray(length, dtype=float)
+    celerity = np.asarray(celerity, dtype=float)
+    K = length/celerity
+    X = 0.5*(1 - referenceFlow/(topWidth*slope*celerity*length))
+    return K, X
+
+
+def _networkLevels(downstream):
+    """Finds the routing level of each reach: headwater reaches are in level
+    0, and every other reach is 1 level below its furthest upstream reach
+
+    Parameters
+    ----------
+    downstream : numpy array
+        Index of the reach that each reach flows into, or -1 for outlets, with
+        every reach listed before the reach it flows into
+
+    Returns
+    -------
+    levels : numpy array
+        Level of each reach
+
+    """
+    levels = np.zeros(downstream.size, dtype=np.intp)
+    for reach, below in enumerate(downstream.tolist()):
+        if below >= 0:
+            if below <= reach:
+                raise ValueError("reaches have to be listed in topological "
+                                 f"order, but reach {reach} flows into "
+                                 f"reach {below}")
+            levels[below] = max(levels[below], levels[reach] + 1)
+    return levels
+
+
+def routeNetwork(downstream, lateralInflow, K, X, dt, initialOutflow=None,
+                 method="auto"):
+    """Routes flow through a network of reaches with the Muskingum method.
+    Each reach's inflow is its own lateral inflow (e.g. the hydrograph of its
+    subbasin) plus the outflows of the reaches that flow into it. The
+    reaches of a level are either routed together by stepping through time
+    once for all of them, or reach by reach with scipy.signal.lfilter
+
+    Parameters
+    ----------
+    downstream : numpy array
+        Index of the reach that each reach flows into, or -1 for outlets.
+        Reaches have to be in topological order, with every reach listed
+        before the reach it flows into
+    lateralInflow : numpy array
+        Lateral inflow of each reach, of shape (reaches, time steps)
+    K : float or numpy array
+        Muskingum travel time of each reach (units of time)
+    X : float or numpy array
+        Muskingum weighting factor of each reach
+    dt : float
+        Time step (same units as K)
+    initialOutflow : numpy array, optional
+        Outflow of each reach at the first time step; each reach starts with
+        its outflow equal to its inflow if not given
+    method : str
+        "vectorized" steps through time once per level, "lfilter" routes
+        each reach with scipy.signal.lfilter, and "auto" picks "vectorized"
+        for levels with at least 64 reaches in records of at most 2048 time
+        steps, where it is faster, and "lfilter" otherwise
+
+    Returns
+    -------
+    outflow : numpy array
+        Outflow of each reach, of shape (reaches, time steps)
+
+    """
+    from scipy import signal
+
+    if method not in ("auto", "vectorized", "lfilter"):
+        raise ValueError("method must be 'auto', 'vectorized', or 'lfilter'")
+    downstream = np.asarray(downstream, dtype=np.intp)
+    # 1 array holds each reach's inflow until the reach is routed, and its
+    # outflow afterwards
+    flows = np.array(lateralInflow, dtype=float)
+    nReaches = flows.shape[0]
+    C0, C1, C2 = (np.broadcast_to(C, (nReaches,)) for C in
+                  muskingumCoefficients(K, X, dt))
+
+    levels = _networkLevels(downstream)
+    order = np.argsort(levels, kind="stable")
+    levelStarts = np.searchsorted(levels[order], np.arange(levels.max() + 2))
+    for level in range(levels.max() + 1):
+        reaches = order[levelStarts[level]:levelStarts[level + 1]]
+        startOutflow = (flows[reaches, 0] if initialOutflow is None
+                        else np.asarray(initialOutflow, dtype=float)[reaches])
+
+        if method == "auto":
+            vectorized = reaches.size >= 64 and flows.shape[1] <= 2048
+        else:
+            vectorized = method == "vectorized"
+
+        if not vectorized:
+            for reach, outflow0 in zip(reaches.tolist(),
+                                       startOutflow.tolist()):
+                b = [C0[reach], C1[reach]]
+                a = [1, -C2[reach]]
+                zi = [outflow0 - C0[reach]*flows[reach, 0]]
+                flows[reach] = signal.lfilter(b, a, flows[reach], zi=zi)[0]
+        else:
+            # stepping through time with all of the level's reaches at once.
+            # Time is worked through in blocks that are transposed so that
+            # each step reads 1 contiguous row, without copying whole records
+            C0level, C1level = C0[reaches], C1[reaches]
+            recession = C2[reaches]
+            previousIn = flows[reaches, 0]
+            previousOut = startOutflow.copy()
+            scratch = np.empty(reaches.size)
+            flows[reaches, 0] = startOutflow
+            for start in range(1, flows.shape[1], 256):
+                block = flows[reaches, start:start + 256].T.copy()
+                for row in block:
+                    np.multiply(C1level, previousIn, out=scratch)
+                    previousIn[:] = row
+                    row *= C0level
+                    row += scratch
+                    np.multiply(recession, previousOut, out=scratch)
+                    row += scratch
+                    previousOut = row
+                flows[reaches, start:start + 256] = block.T
+
+        # adding the outflows to the inflows of the reaches downstream
+        for reach, below in zip(reaches.tolist(),
+                                downstream[reaches].tolist()):
+            if below >= 0:
+                flows[below] += flows[reach]
+    return flows
+
+# %%
+# Opt-in instrumentation of this module's functions; see instrumentation.py
+if os.environ.get("HYDROLOGY_PROFILE", "").strip().lower() not in (
+        "", "0", "false", "no", "off"):
+    from . import instrumentation
+    instrumentation.instrumentModule(__name__)
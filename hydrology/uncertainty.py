@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to propagate the uncertainty of the Green-Ampt
+parameters (Ks, pressure head, and the saturated and initial water contents,
+which are all estimated from soil texture) into the ponding time, the amount
+infiltrated, and the runoff of a storm using Monte Carlo simulation.
+
+Realizations are drawn and solved in chunks with stormEndBatch() from
+infiltration.py, and every chunk is reduced to histograms right away, so the
+full matrix of sampled parameters is never held in memory. Chunks can be
+spread across a process pool. Each chunk gets its own random number generator
+spawned from a single seed, so the results only depend on the seed and the
+chunk size, not on the number of workers. This module can be imported by
+other scripts, which would then use the methods within this module
+"""
+
+import numpy as np
+
+from . import infiltration as infil
+
+# order of the parameters in correlation matrices
+parameterNames = ("Ks", "presHead", "thetaSat", "thetaInit")
+# %%
+# Sampling the Green-Ampt parameters
+
+
+def _fromStandardNormal(z, distribution):
+    """Transforms standard normal numbers into numbers from a distribution.
+    This is how correlated parameters are sampled (a Gaussian copula): the
+    correlation is applied to standard normal numbers, which are then
+    transformed into each parameter's own distribution
+
+    Parameters
+    ----------
+    z = numpy array of standard normal numbers
+    distribution = a float for a parameter that is known exactly, or a tuple
+    of the name of the distribution and its 2 parameters:
+        ("normal", mean, standard deviation)
+        ("lognormal", mean of the natural log, standard deviation of the
+        natural log)
+        ("uniform", lowest value, highest value)
+
+    Returns
+    -------
+    values = numpy array of numbers from the distribution
+    """
+    from scipy.special import ndtr
+
+    if np.isscalar(distribution):
+        return np.full(z.shape, float(distribution))
+    kind, a, b = distribution
+    if kind == "normal":
+        return a + b*z
+    if kind == "lognormal":
+        return np.exp(a + b*z)
+    if kind == "uniform":
+        return a + (b - a)*ndtr(z)
+    raise ValueError(f"unknown distribution {kind!r}")
+
+
+def sampleParameters(distributions, n, rng, correlation=None):
+    """Draws realizations of the Green-Ampt parameters
+
+    Parameters
+    ----------
+    distributions = dict of the distribution of each parameter in
+    parameterNames (see _fromStandardNormal() for the format)
+    n = number of realizations
+    rng = numpy random Generator
+    correlation = 4 x 4 correlation matrix of the parameters, in the order of
+    parameterNames, applied to their standard normal scores; the parameters
+    are independent if not given
+
+    Returns
+    -------
+    samples = dict of numpy arrays of n realizations of each parameter
+    """
+    z = rng.standard_normal((len(parameterNames), n))
+    if correlation is not None:
+        z = np.linalg.cholesky(np.asarray(correlation, dtype=float)) @ z
+    samples = {name: _fromStandardNormal(z[number], distributions[name])
+               for number, name in enumerate(parameterNames)}
+    return samples
+# %%
+# Running the Monte Carlo simulation
+
+
+def _monteCarloChunk(args):
+    """Draws and solves 1 chunk of realizations and reduces them to histograms.
+    This is a top-level function so that it can be sent to worker processes
+
+    Parameters
+    ----------
+    args = tuple of the chunk's numpy SeedSequence, the number of
+    realizations, and the distributions, correlation, rainfall rate, storm
+    duration, and number of histogram bins given to monteCarloRuns()
+
+    Returns
+    -------
+    tuple of the following 3 items:
+    counts = dict of numpy arrays of the histogram counts of "finalF",
+    "runoff", and "pondingTime" (only storms that ponded)
+    sums = dict of the sums of the same quantities, for the means
+    tallies = dict of the number of valid realizations ("valid"), realizations
+    with impossible parameters ("rejected"), and storms that ponded ("ponded")
+    """
+    (seedSequence, n, distributions, correlation, rainfallRate, duration,
+     nBins) = args
+    rng = np.random.default_rng(seedSequence)
+    samples = sampleParameters(distributions, n, rng, correlation)
+
+    # realizations that aren't physically possible are thrown out
+    valid = ((samples["Ks"] > 0) & (samples["presHead"] > 0)
+             & (samples["thetaInit"] >= 0)
+             & (samples["thetaInit"] < samples["thetaSat"])
+             & (samples["thetaSat"] <= 1))
+    finalF, pondingTime, _ = infil.stormEndBatch(
+        samples["Ks"][valid], samples["presHead"][valid],
+        samples["thetaSat"][valid], samples["thetaInit"][valid],
+        rainfallRate, duration)
+    del samples
+
+    totalRain = rainfallRate*duration
+    runoff = totalRain - finalF
+    pondingTime = pondingTime[np.isfinite(pondingTime)]
+    values = {"finalF": finalF, "runoff": runoff, "pondingTime": pondingTime}
+    upper = {"finalF": totalRain, "runoff": totalRain,
+             "pondingTime": duration}
+    counts = {name: np.histogram(values[name], nBins, (0, upper[name]))[0]
+              for name in values}
+    sums = {name: float(values[name].sum()) for name in values}
+    tallies = {"valid": int(finalF.size), "rejected": int(n - finalF.size),
+               "ponded": int(pondingTime.size)}
+    return counts, sums, tallies
+
+
+def _histogramQuantiles(counts, upper, quantiles):
+    """Calculates quantiles from a histogram over [0, upper], interpolating
+    linearly within bins, so they are accurate to within 1 bin width
+
+    Parameters
+    ----------
+    counts = numpy array of histogram counts
+    upper = upper edge of the histogram
+    quantiles = numpy array of the quantiles to calculate, from 0 to 1
+
+    Returns
+    -------
+    values = numpy array of the quantiles; NaN if the histogram is empty
+    """
+    total = counts.sum()
+    if total == 0:
+        return np.full(len(quantiles), np.nan)
+    width = upper/counts.size
+    cumulative = np.cumsum(counts)
+    # the bin holding each quantile is the first one whose cumulative count
+    # reaches it; the tiny floor moves the 0 quantile to the first bin that
+    # isn't empty
+    targets = np.maximum(np.asarray(quantiles)*total, 1e-9)
+    bins = np.minimum(np.searchsorted(cumulative, targets), counts.size - 1)
+    below = cumulative[bins] - counts[bins]
+    values = (bins + (targets - below)/counts[bins])*width
+    return values
+
+
+def _summarize(counts, sums, tallies, rainfallRate, duration, quantiles):
+    """Turns the running histograms and sums into the summary that
+    monteCarloRuns() yields"""
+    totalRain = rainfallRate*duration
+    upper = {"finalF": totalRain, "runoff": totalRain,
+             "pondingTime": duration}
+    summary = {"quantiles": np.asarray(quantiles, dtype=float)}
+    summary.update(tallies)
+    for name in counts:
+        number = tallies["ponded"] if name == "pondingTime" \
+            else tallies["valid"]
+        summary[name] = {
+            "mean": sums[name]/number if number else np.nan,
+            "quantiles": _histogramQuantiles(counts[name], upper[name],
+                                             summary["quantiles"])}
+    summary["pondingProbability"] = (tallies["ponded"]/tallies["valid"]
+                                     if tallies["valid"] else np.nan)
+    return summary
+
+
+def monteCarloRuns(distributions, rainfallRate, duration, nRealizations,
+                   correlation=None, chunkSize=100000, seed=None, workers=1,
+                   quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), nBins=4096):
+    """Runs a Monte Carlo simulation of a storm on a soil with uncertain
+    Green-Ampt parameters, yielding an updated summary after every chunk of
+    realizations so that long runs can be watched or stopped early. Quantiles
+    come from histograms with nBins bins between 0 and the total rainfall (or
+    the storm duration for ponding times), so they are accurate to within
+    1/nBins of that range
+
+    Parameters
+    ----------
+    distributions = dict of the distribution of each of "Ks" (length/time),
+    "presHead" (length), "thetaSat", and "thetaInit": a float for a parameter
+    that is known exactly, or ("normal", mean, standard deviation),
+    ("lognormal", mean of ln, standard deviation of ln), or
+    ("uniform", lowest, highest). Realizations with impossible parameters
+    (e.g. thetaInit >= thetaSat, or negative Ks) are thrown out
+    rainfallRate = rainfall rate (length/time)
+    duration = storm duration (units of time)
+    nRealizations = total number of realizations
+    correlation = 4 x 4 correlation matrix of the parameters' standard normal
+    scores, in the order Ks, presHead, thetaSat, thetaInit
+    chunkSize = number of realizations drawn and solved at a time
+    seed = seed of the random numbers, for reproducible results
+    workers = number of worker processes; chunks are solved in the calling
+    process if this is 1. At most 2 chunks per worker are queued at a time,
+    so stopping early only waits for the chunks that are running
+    quantiles = the quantiles to calculate, from 0 to 1
+    nBins = number of histogram bins used for the quantiles
+
+    Yields
+    ------
+    summary = dict with the number of valid ("valid"), thrown out
+    ("rejected"), and ponded ("ponded") realizations so far, the probability
+    of ponding ("pondingProbability"), the quantiles ("quantiles"), and for
+    each of "finalF" (amount infiltrated, length), "runoff" (length), and
+    "pondingTime" (of storms that ponded, units of time) a dict with its
+    "mean" and the values of its "quantiles"
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .parallel import boundedMap
+
+    if int(nRealizations) < 1:
+        raise ValueError("nRealizations must be at least 1")
+    if int(chunkSize) < 1:
+        raise ValueError("chunkSize must be at least 1")
+    nChunks = -(-int(nRealizations)//chunkSize)
+    sizes = [chunkSize]*(nChunks - 1) + [int(nRealizations)
+                                         - chunkSize*(nChunks - 1)]
+    seeds = np.random.SeedSequence(seed).spawn(nChunks)
+    tasks = ((seeds[number], sizes[number], distributions, correlation,
+              rainfallRate, duration, nBins) for number in range(nChunks))
+
+    counts = {name: np.zeros(nBins, dtype=np.int64)
+              for name in ("finalF", "runoff", "pondingTime")}
+    sums = dict.fromkeys(counts, 0.0)
+    tallies = {"valid": 0, "rejected": 0, "ponded": 0}
+
+    def accumulate(results):
+        for chunkCounts, chunkSums, chunkTallies in results:
+            for name in counts:
+                counts[name] += chunkCounts[name]
+                sums[name] += chunkSums[name]
+            for name in tallies:
+                tallies[name] += chunkTallies[name]
+            yield _summarize(counts, sums, tallies, rainfallRate, duration,
+                             quantiles)
+
+    if workers == 1:
+        yield from accumulate(map(_monteCarloChunk, tasks))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    results = boundedMap(pool, _monteCarloChunk, tasks, 2*workers)
+    try:
+        yield from accumulate(results)
+    finally:
+        # when the caller stops early, closing the generator cancels the
+        # chunks that haven't started, and shutdown() waits for the few that
+        # are running
+        results.close()
+        pool.shutdown()
+
+
+def greenAmptMonteCarlo(distributions, rainfallRate, duration, nRealizations,
+                        correlation=None, chunkSize=100000, seed=None,
+                        workers=1, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
+                        nBins=4096):
+    """Runs a Monte Carlo simulation with monteCarloRuns() and returns only
+    the final summary. The parameters and the summary are the same as
+    monteCarloRuns()'s
+    """
+    for summary in monteCarloRuns(distributions, rainfallRate, duration,
+                                  nRealizations, correlation, chunkSize, seed,
+                                  workers, quantiles, nBins):
+        pass
+    return summary
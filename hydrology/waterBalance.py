@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to tie the pieces of the water balance from
+the other weeks together over time: a daily bucket model of every cell of a
+grid, where precipitation is split into runoff (the SCS Curve Number method
+from streamflow.py) and infiltration, infiltration fills the soil, the soil
+loses water to evaporation (the Meyer equation from evaporation.py, reduced
+as the soil dries), and water above field capacity drains out of the bottom
+of the soil. Soil storage stays between the wilting point and field capacity,
+like the ones worked out in homework 3, question 1.
+
+All depths are in mm. The state arrays are updated in place every day, so a
+run doesn't allocate any arrays after it starts, and long runs save
+checkpoints that they can be resumed from. This module can be imported by
+other scripts, which would then use the methods within this module
+"""
+
+import os
+
+import numpy as np
+
+from . import evaporation as evap
+from . import streamflow as sf
+
+# water fluxes that are tracked every day, in the order of the columns of the
+# daily series
+fluxNames = ("precipitation", "runoff", "infiltration", "evaporation",
+             "drainage")
+# %%
+
+
+class BucketModel:
+    """Daily water balance of every cell of a grid. The state of each cell is
+    held in arrays with the shape of the grid: the day's precipitation,
+    runoff, infiltration, evaporation, and drainage (mm/day), the soil
+    storage (mm), and the totals of the fluxes since the start of the run
+    (mm)
+
+    Parameters
+    ----------
+    CN = curve number of each cell
+    fieldCapacity = volumetric water content at field capacity (cm3/cm3)
+    wiltingPoint = volumetric water content at the permanent wilting point
+    (cm3/cm3), which has to be below the field capacity in every cell
+    rootDepth = depth of the soil layer that holds water (mm)
+    initialStorage = water stored in the soil at the start (mm); the storage
+    at field capacity if not given
+    All of these are floats or numpy arrays that broadcast to the grid's shape
+    """
+
+    def __init__(self, CN, fieldCapacity, wiltingPoint, rootDepth,
+                 initialStorage=None):
+        CN, fieldCapacity, wiltingPoint, rootDepth = np.broadcast_arrays(
+            *[np.asarray(value, dtype=float)
+              for value in (CN, fieldCapacity, wiltingPoint, rootDepth)])
+        self.shape = CN.shape
+        # evaporation is scaled by the water above the wilting point over the
+        # available capacity, which is 0/0 without any available capacity
+        tooWet = fieldCapacity <= wiltingPoint
+        if np.any(tooWet):
+            raise ValueError(f"the field capacity is at or below the wilting "
+                             f"point in {np.count_nonzero(tooWet)} of "
+                             f"{tooWet.size} cells")
+
+        # potential max retention and initial abstraction in mm
+        self.S = 25.4*sf.potentialMaxRetention(CN)
+        self.Ia = 0.2*self.S
+        self.maxStorage = fieldCapacity*rootDepth
+        self.minStorage = wiltingPoint*rootDepth
+        self.availableCapacity = self.maxStorage - self.minStorage
+
+        self.storage = (self.maxStorage.copy() if initialStorage is None
+                        else np.array(np.broadcast_to(initialStorage,
+                                                      self.shape),
+                                      dtype=float))
+        self.fluxes = {name: np.zeros(self.shape) for name in fluxNames}
+        self.totals = {name: np.zeros(self.shape) for name in fluxNames}
+        self.day = 0
+
+        # buffers for intermediate values
+        self._saturationVP = np.empty(self.shape)
+        self._actualVP = np.empty(self.shape)
+        self._scratch = np.empty(self.shape)
+
+    def step(self, precip, temp, dewpoint, windSpeed):
+        """Moves the water balance forward by 1 day
+
+        Parameters
+        ----------
+        precip = precipitation of the day (mm)
+        temp = mean air temperature of the day in degrees Celsius
+        dewpoint = mean dewpoint of the day in degrees Celsius
+        windSpeed = mean wind speed of the day (miles/hour)
+        Each is a float or a numpy array with the shape of the grid
+        """
+        fluxes = self.fluxes
+        storage = self.storage
+        scratch = self._scratch
+
+        # runoff, and everything else infiltrates
+        np.copyto(fluxes["precipitation"], precip)
+        sf._QfromP_CNtile(fluxes["precipitation"], self.S, self.Ia,
+                          fluxes["runoff"], scratch)
+        np.subtract(fluxes["precipitation"], fluxes["runoff"],
+                    out=fluxes["infiltration"])
+        storage += fluxes["infiltration"]
+
+        # evaporation at the Meyer rate (converted from cm to mm), times the
+        # fraction of the available water that is left in the soil
+        evapo = fluxes["evaporation"]
+        evap.vaporPressure(temp, out=self._saturationVP)
+        evap.vaporPressure(dewpoint, out=self._actualVP)
+        evap._meyerEvaporationTile(self._saturationVP, self._actualVP,
+                                   windSpeed, evapo, scratch)
+        np.multiply(evapo, 10, out=evapo)
+        np.maximum(evapo, 0, out=evapo)
+        np.subtract(storage, self.minStorage, out=scratch)
+        np.clip(scratch, 0, self.availableCapacity, out=scratch)
+        np.multiply(evapo, scratch, out=evapo)
+        np.divide(evapo, self.availableCapacity, out=evapo)
+        np.minimum(evapo, scratch, out=evapo)
+        storage -= evapo
+
+        # water above field capacity drains out of the soil
+        np.subtract(storage, self.maxStorage, out=fluxes["drainage"])
+        np.maximum(fluxes["drainage"], 0, out=fluxes["drainage"])
+        storage -= fluxes["drainage"]
+
+        for name in fluxNames:
+            self.totals[name] += fluxes[name]
+        self.day += 1
+
+    def saveCheckpoint(self, path, series=None):
+        """Saves the state of the model so that a run can be resumed. The
+        checkpoint is written to a temporary file first and then moved into
+        place, so a run that is stopped while saving keeps its last checkpoint
+
+        Parameters
+        ----------
+        path = path of the checkpoint (.npz file)
+        series = daily series of the run so far, which are saved with it
+        """
+        state = {"day": self.day, "storage": self.storage,
+                 "S": self.S, "maxStorage": self.maxStorage,
+                 "minStorage": self.minStorage}
+        for name in fluxNames:
+            state["total_" + name] = self.totals[name]
+        if series is not None:
+            state["series"] = series[:self.day]
+        temporaryPath = path + ".tmp"
+        with open(temporaryPath, "wb") as file:
+            np.savez(file, **state)
+        os.replace(temporaryPath, path)
+
+    def loadCheckpoint(self, path):
+        """Loads a checkpoint saved by saveCheckpoint()
+
+        Parameters
+        ----------
+        path = path of the checkpoint (.npz file)
+
+        Returns
+        -------
+        series = daily series saved with the checkpoint, or None
+        """
+        with np.load(path) as state:
+            if (state["storage"].shape != self.shape
+                    or "minStorage" not in state
+                    or not all(np.array_equal(state[name],
+                                              getattr(self, name),
+                                              equal_nan=True)
+                               for name in ("S", "maxStorage",
+                                            "minStorage"))):
+                raise ValueError(f"the checkpoint {path} is from a model "
+                                 "with different cells or parameters")
+            self.day = int(state["day"])
+            self.storage[...] = state["storage"]
+            for name in fluxNames:
+                self.totals[name][...] = state["total_" + name]
+            series = state["series"] if "series" in state else None
+        return series
+
+    def run(self, precip, temp, dewpoint, windSpeed, checkpoint=None,
+            checkpointEvery=365):
+        """Runs the model over a record of daily weather. If the checkpoint
+        file exists, the run picks up from the day it was saved on, which has
+        to be before the end of the record
+
+        Parameters
+        ----------
+        precip = precipitation (mm) of each day, a numpy array of shape
+        (days,) + the grid's shape; can be memory-mapped or the path of a
+        .npy file, which is memory-mapped, so decades of grids don't have to
+        fit in memory
+        temp = mean air temperature in degrees Celsius; a numpy array like
+        precip, or 1-D with 1 value per day for the whole grid
+        dewpoint = mean dewpoint in degrees Celsius, like temp
+        windSpeed = mean wind speed (miles/hour), like temp
+        checkpoint = path of the checkpoint (.npz file) that is saved every
+        checkpointEvery days and at the end of the run
+        checkpointEvery = number of days between checkpoints
+
+        Returns
+        -------
+        series = 2-D numpy array of shape (days, 6) with the grid's mean
+        precipitation, runoff, infiltration, evaporation, and drainage
+        (mm/day) and the mean soil storage (mm) at the end of each day
+        """
+        forcing = []
+        for values in (precip, temp, dewpoint, windSpeed):
+            if isinstance(values, str):
+                values = np.load(values, mmap_mode="r")
+            forcing.append(values)
+        nDays = forcing[0].shape[0]
+        series = np.full((nDays, len(fluxNames) + 1), np.nan)
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with np.load(checkpoint) as state:
+                savedDay = int(state["day"])
+            if savedDay >= nDays:
+                raise ValueError(f"the checkpoint {checkpoint} is from day "
+                                 f"{savedDay}, which isn't before the end of "
+                                 f"the {nDays} days of weather; delete it to "
+                                 "run the record again")
+            saved = self.loadCheckpoint(checkpoint)
+            if saved is not None:
+                series[:saved.shape[0]] = saved
+
+        for day in range(self.day, nDays):
+            self.step(*[values[day] for values in forcing])
+            for column, name in enumerate(fluxNames):
+                series[day, column] = self.fluxes[name].mean()
+            series[day, -1] = self.storage.mean()
+            if checkpoint is not None and (self.day % checkpointEvery == 0
+                                           or self.day == nDays):
+                self.saveCheckpoint(checkpoint, series)
+        return series
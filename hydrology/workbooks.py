@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+The purpose of this module is to load Excel workbooks quickly. Parsing Excel
+files is slow, so the first time a workbook is read, all of its sheets are
+parsed at once and saved as Feather files (Apache Arrow's columnar format) in
+a cache folder next to the workbook. Later reads load the Feather files
+through memory maps instead of parsing the workbook again, as long as the
+workbook hasn't changed. Caching needs pyarrow; without it, workbooks are
+just parsed every time
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# %%
+# Cache bookkeeping
+
+
+def _cacheFolder(path):
+    """Returns the path of the cache folder of a workbook, which sits next to
+    the workbook and is named after it, e.g. .Homework 4.xlsx.cache
+
+    Parameters
+    ----------
+    path : str
+        Path of the workbook
+
+    Returns
+    -------
+    folder : str
+        Path of the cache folder
+
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    folder = os.path.join(directory, "." + name + ".cache")
+    return folder
+
+
+def _fileHash(path):
+    """Calculates the SHA-256 hash of a file, reading it in blocks
+
+    Parameters
+    ----------
+    path : str
+        Path of the file
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-256 hash of the file's contents
+
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cacheIsCurrent(path, folder):
+    """Checks whether the cached sheets of a workbook are still current. The
+    workbook's modification time and size are checked first; only if they
+    changed is the workbook hashed, so that a workbook that was touched or
+    copied without being edited doesn't have to be parsed again
+
+    Parameters
+    ----------
+    path : str
+        Path of the workbook
+    folder : str
+        Path of the workbook's cache folder
+
+    Returns
+    -------
+    manifest : dict or None
+        The cache's manifest if the cache is current, otherwise None
+
+    """
+    manifestPath = os.path.join(folder, "manifest.json")
+    try:
+        with open(manifestPath) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not os.path.isdir(os.path.join(folder, manifest["sha256"])):
+        return None
+
+    status = os.stat(path)
+    if (manifest["mtime"] == status.st_mtime_ns
+            and manifest["size"] == status.st_size):
+        return manifest
+    if manifest["sha256"] != _fileHash(path):
+        return None
+
+    manifest["mtime"] = status.st_mtime_ns
+    manifest["size"] = status.st_size
+    _writeManifest(folder, manifest)
+    return manifest
+
+
+def _writeManifest(folder, manifest):
+    """Writes the manifest of a cache folder. It is written to a temporary file
+    of its own first and then moved into place, so a half-written manifest is
+    never read, even when several processes write it at once
+
+    Parameters
+    ----------
+    folder : str
+        Path of the cache folder
+    manifest : dict
+        Workbook modification time, size, hash, and sheet names
+
+    """
+    handle, temporaryPath = tempfile.mkstemp(prefix="manifest.",
+                                             suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(handle, "w") as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(temporaryPath, os.path.join(folder, "manifest.json"))
+    except BaseException:
+        os.remove(temporaryPath)
+        raise
+# %%
+# Reading workbooks
+
+
+def _writeCache(path, folder, sheets):
+    """Saves every sheet of a workbook as an uncompressed Feather file, which
+    can be memory-mapped when it is read. The files go into a subfolder named
+    after the workbook's hash, which is written under a temporary name and
+    never changed once it is in place, and the manifest that points to it is
+    replaced last. The manifest is a single file that is swapped in with
+    os.replace(), so a reader always finds a manifest and the sheets it
+    describes, even while other processes cache the same workbook
+
+    Parameters
+    ----------
+    path : str
+        Path of the workbook
+    folder : str
+        Path of the workbook's cache folder
+    sheets : dict
+        pandas dataframes of the workbook's sheets, keyed by sheet name
+
+    Returns
+    -------
+    manifest : dict or None
+        The new cache's manifest, or None if a sheet can't be stored in
+        Arrow format (e.g. a column that mixes numbers and text), in which
+        case nothing is cached
+
+    """
+    import pyarrow as pa
+    from pyarrow import feather
+
+    os.makedirs(folder, exist_ok=True)
+    status = os.stat(path)
+    digest = _fileHash(path)
+    names = list(sheets)
+    version = os.path.join(folder, digest)
+    if not os.path.isdir(version):
+        temporary = tempfile.mkdtemp(prefix=digest + ".", dir=folder)
+        try:
+            for number, name in enumerate(names):
+                sheet = sheets[name]
+                # Feather only stores string column names and a default index
+                sheet = sheet.rename(columns=str).reset_index(drop=True)
+                feather.write_feather(sheet,
+                                      os.path.join(temporary,
+                                                   f"sheet{number}.feather"),
+                                      compression="uncompressed")
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            shutil.rmtree(temporary, ignore_errors=True)
+            return None
+        except BaseException:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+        try:
+            os.replace(temporary, version)
+        except OSError:
+            # another process cached the same workbook first
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    manifest = {"mtime": status.st_mtime_ns, "size": status.st_size,
+                "sha256": digest, "sheets": names}
+    _writeManifest(folder, manifest)
+
+    # the sheets of older versions of the workbook are deleted; a process
+    # that is still reading them parses the workbook instead
+    for entry in os.listdir(folder):
+        if len(entry) == len(digest) and entry != digest:
+            shutil.rmtree(os.path.join(folder, entry), ignore_errors=True)
+    return manifest
+
+
+def _readCache(folder, manifest, arrowBacked):
+    """Loads the cached sheets of a workbook through memory maps
+
+    Parameters
+    ----------
+    folder : str
+        Path of the workbook's cache folder
+    manifest : dict
+        The cache's manifest
+    arrowBacked : bool
+        Whether the dataframes keep Arrow-backed columns (pd.ArrowDtype)
+        instead of being converted to numpy-backed columns
+
+    Returns
+    -------
+    sheets : dict or None
+        pandas dataframes of the workbook's sheets, keyed by sheet name, or
+        None if another process deleted them since the manifest was read
+
+    """
+    import pandas as pd
+    from pyarrow import feather
+
+    typesMapper = pd.ArrowDtype if arrowBacked else None
+    version = os.path.join(folder, manifest["sha256"])
+    sheets = {}
+    for number, name in enumerate(manifest["sheets"]):
+        try:
+            table = feather.read_table(os.path.join(version,
+                                                    f"sheet{number}.feather"),
+                                       memory_map=True)
+        except FileNotFoundError:
+            return None
+        sheets[name] = table.to_pandas(types_mapper=typesMapper)
+    return sheets
+
+
+def readWorkbook(path, sheetName=None, arrowBacked=True, useCache=True):
+    """Reads the sheets of an Excel workbook, using the workbook's cache when
+    it is current and otherwise parsing every sheet once and caching them all
+
+    Parameters
+    ----------
+    path : str
+        Path of the workbook
+    sheetName : str, optional
+        Name of a single sheet to return. Every sheet is still parsed and
+        cached, so later reads of other sheets are fast too
+    arrowBacked : bool
+        Whether cached sheets are returned with Arrow-backed columns
+        (pd.ArrowDtype), which don't copy the memory-mapped data
+    useCache : bool
+        Whether the cache is used at all
+
+    Returns
+    -------
+    sheets : dict or pandas dataframe
+        pandas dataframes of the workbook's sheets, keyed by sheet name, or
+        just the sheet named sheetName
+
+    """
+    import pandas as pd
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        useCache = False
+
+    if useCache:
+        folder = _cacheFolder(path)
+        manifest = _cacheIsCurrent(path, folder)
+        sheets = None
+        if manifest is not None:
+            sheets = _readCache(folder, manifest, arrowBacked)
+        if sheets is None:
+            parsed = pd.read_excel(path, sheet_name=None)
+            manifest = _writeCache(path, folder, parsed)
+            # sheets that were just parsed are read back from the cache too,
+            # so that they are the same kind of dataframe on every run
+            if manifest is not None:
+                sheets = _readCache(folder, manifest, arrowBacked)
+            # unless the workbook can't be cached, in which case the parsed
+            # sheets are used
+            if sheets is None:
+                sheets = parsed
+    else:
+        sheets = pd.read_excel(path, sheet_name=None)
+
+    if sheetName is not None:
+        return sheets[sheetName]
+    return sheets
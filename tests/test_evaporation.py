@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the vectorized evaporation rates against the same equations
+evaluated one station reading at a time
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from hydrology import evaporation as evap
+
+
+@pytest.fixture
+def station():
+    rng = np.random.default_rng(19)
+    temp = rng.uniform(-5, 35, 300)
+    dewpoint = temp - rng.uniform(0, 15, 300)
+    windSpeed = rng.uniform(0, 20, 300)
+    netRadiation = rng.uniform(0, 25, 300)
+    return temp, dewpoint, windSpeed, netRadiation
+
+
+def test_evaporationRates_matches_readings(station):
+    temp, dewpoint, windSpeed, netRadiation = station
+    rates = evap.evaporationRates(temp, windSpeed, dewpoint=dewpoint,
+                                  netRadiation=netRadiation)
+
+    for i in range(temp.size):
+        saturationVP = 611*math.exp(17.27*temp[i]/(temp[i] + 237.3))
+        actualVP = 611*math.exp(17.27*dewpoint[i]/(dewpoint[i] + 237.3))
+        RH = 100*actualVP/saturationVP
+        assert rates["saturationVP"][i] == pytest.approx(saturationVP,
+                                                         rel=1e-13)
+        assert rates["RH"][i] == pytest.approx(RH, rel=1e-13)
+        assert rates["meyer"][i] == pytest.approx(evap.meyerEvaporation(
+            saturationVP, actualVP, windSpeed[i]), rel=1e-12)
+        assert rates["dunne"][i] == pytest.approx(evap.dunneEvaporation(
+            actualVP, RH, windSpeed[i]), rel=1e-12)
+        assert rates["penman"][i] == pytest.approx(evap.penmanEvaporation(
+            temp[i], actualVP, windSpeed[i], netRadiation[i], 101.3),
+            rel=1e-12)
+
+    # the same rates from the relative humidity instead of the dewpoint
+    fromRH = evap.evaporationRates(temp, windSpeed, RH=rates["RH"])
+    for name in ("actualVP", "meyer", "dunne"):
+        np.testing.assert_allclose(fromRH[name], rates[name], rtol=1e-12)
+    with pytest.raises(ValueError):
+        evap.evaporationRates(temp, windSpeed)
+
+
+def test_in_place_kernels_match(station):
+    temp, dewpoint, windSpeed, _ = station
+    out = np.empty(temp.shape)
+    assert evap.vaporPressure(temp, out=out) is out
+    np.testing.assert_allclose(out, evap.vaporPressure(temp), rtol=1e-14)
+
+    saturationVP = evap.vaporPressure(temp)
+    actualVP = evap.vaporPressure(dewpoint)
+    scratch = np.empty(temp.shape)
+    evap._meyerEvaporationTile(saturationVP, actualVP, windSpeed, out,
+                               scratch)
+    np.testing.assert_allclose(out, evap.meyerEvaporation(
+        saturationVP, actualVP, windSpeed), rtol=1e-12)
+
+
+def test_evaporationFromCSV_chunks(station, tmp_path):
+    pd = pytest.importorskip("pandas")
+    temp, dewpoint, windSpeed, netRadiation = station
+    table = pd.DataFrame({"T": temp, "Td": dewpoint, "wind": windSpeed,
+                          "Rn": netRadiation})
+    table.to_csv(tmp_path/"station.csv", index=False)
+
+    chunks = list(evap.evaporationFromCSV(
+        str(tmp_path/"station.csv"), "T", "wind", dewpointColumn="Td",
+        radiationColumn="Rn", chunksize=70))
+
+    assert [len(chunk) for chunk in chunks] == [70, 70, 70, 70, 20]
+    result = pd.concat(chunks)
+    rates = evap.evaporationRates(temp, windSpeed, dewpoint=dewpoint,
+                                  netRadiation=netRadiation)
+    for name, values in rates.items():
+        np.testing.assert_allclose(result[name], values, rtol=1e-12)
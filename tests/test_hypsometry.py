@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the labeled raster histograms and hypsometric curves against
+np.histogram of each sub-basin's cells
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import hypsometry as hyps
+
+
+@pytest.fixture
+def rasters(tmp_path):
+    rng = np.random.default_rng(12)
+    dem = rng.uniform(100, 900, (53, 41))
+    labels = rng.integers(-1, 4, dem.shape)
+    dem[rng.uniform(size=dem.shape) < 0.05] = np.nan
+    dem[0, :5] = -9999.0
+    np.save(tmp_path/"dem.npy", dem)
+    return dem, labels, str(tmp_path/"dem.npy")
+
+
+@pytest.mark.parametrize("tileRows", [1, 7, 1024])
+def test_elevationHistogram_matches_np_histogram(rasters, tileRows):
+    dem, labels, demPath = rasters
+    binEdges, counts = hyps.elevationHistogram(
+        demPath, labels, nBins=20, nodata=-9999.0, tileRows=tileRows)
+
+    valid = np.isfinite(dem) & (dem != -9999.0) & (labels >= 0)
+    np.testing.assert_allclose(binEdges, np.linspace(dem[valid].min(),
+                                                     dem[valid].max(), 21))
+    assert counts.shape == (4, 20)
+    for label in range(4):
+        expected, _ = np.histogram(dem[valid & (labels == label)], binEdges)
+        np.testing.assert_array_equal(counts[label], expected)
+
+
+def test_elevationHistogram_given_bins(rasters):
+    dem, labels, _ = rasters
+    binEdges = np.array([0.0, 250.0, 500.0, 600.0, 1000.0])
+    _, counts = hyps.elevationHistogram(dem, labels, binEdges, nLabels=6,
+                                        nodata=-9999.0)
+
+    valid = np.isfinite(dem) & (dem != -9999.0)
+    assert counts.shape == (6, 4)
+    np.testing.assert_array_equal(counts[4:], 0)
+    for label in range(4):
+        expected, _ = np.histogram(dem[valid & (labels == label)], binEdges)
+        np.testing.assert_array_equal(counts[label], expected)
+
+
+def test_hypsometricCurves_area_above(rasters):
+    dem, labels, _ = rasters
+    lowerAltitude, cumulArea, integral = hyps.hypsometricCurves(
+        dem, labels, nBins=20, cellArea=2.5, nodata=-9999.0)
+
+    valid = np.isfinite(dem) & (dem != -9999.0)
+    for label in range(4):
+        z = dem[valid & (labels == label)]
+        expected = [2.5*np.sum(z >= altitude) for altitude in lowerAltitude]
+        np.testing.assert_allclose(cumulArea[label], expected)
+        assert 0 < integral[label] < 1
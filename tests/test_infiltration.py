@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the vectorized infiltration functions against root finding of the
+equations they replace
+"""
+
+import numpy as np
+import pytest
+from scipy.optimize import brentq
+
+from hydrology import infiltration as infil
+
+
+@pytest.mark.parametrize("F0", [0.0, 1e-7, 1e-3, 0.5])
+def test_pondedF_matches_brentq(F0):
+    suction = 2.0
+    tStar = np.logspace(-12, 3, 61)
+    KsDt = tStar*suction
+
+    expected = []
+    for amount in KsDt:
+        # the ponded Green-Ampt equation, with log1p to keep small F exact
+        def residual(F):
+            return (F - F0 - suction*(np.log1p(F/suction)
+                                      - np.log1p(F0/suction)) - amount)
+        upper = F0 + amount + 10*np.sqrt(2*suction*amount) + 1
+        expected.append(brentq(residual, F0, upper, xtol=1e-300,
+                               rtol=1e-15))
+
+    F = infil._pondedF(np.full(KsDt.shape, F0), suction, KsDt)
+    np.testing.assert_allclose(F, expected, rtol=1e-9)
+
+
+def test_stormEndBatch_matches_stormEnd():
+    Ks = np.array([0.032, 0.1, 1.0, 0.5, 0.2])
+    presHead = np.array([20.8, 11.0, 5.0, 30.0, 16.7])
+    thetaSat = 0.5
+    thetaInit = np.array([0.1, 0.3, 0.45, 0.2, 0.499])
+    rainfallRate = np.array([0.1, 0.5, 0.8, 3.0, 0.25])
+    duration = 4.0
+
+    finalF, pondingTime, finalRate = infil.stormEndBatch(
+        Ks, presHead, thetaSat, thetaInit, rainfallRate, duration)
+
+    for i in range(Ks.size):
+        if rainfallRate[i] > Ks[i]:
+            Fp = infil.Fpond(presHead[i], Ks[i], thetaSat, thetaInit[i],
+                             rainfallRate[i])
+            tp = infil.timep(Fp, rainfallRate[i])
+        else:
+            tp = np.inf
+        if tp >= duration:
+            # never ponds, so all of the rain infiltrates
+            assert np.isinf(pondingTime[i])
+            assert finalF[i] == pytest.approx(rainfallRate[i]*duration)
+            continue
+        assert pondingTime[i] == pytest.approx(tp, rel=1e-12)
+        expected = brentq(lambda F: infil.stormEnd(
+            tp, Ks[i], F, Fp, presHead[i], thetaSat, thetaInit[i], duration),
+            Fp, Fp + rainfallRate[i]*duration, xtol=1e-14, rtol=1e-14)
+        assert finalF[i] == pytest.approx(expected, rel=1e-10)
+        assert finalRate[i] == pytest.approx(infil.infilRateGA(
+            Ks[i], presHead[i], thetaSat, thetaInit[i], expected, tp),
+            rel=1e-9)
+
+
+@pytest.mark.parametrize("rainfallRate", [None, 0.05, 0.3])
+def test_greenAmptFast_matches_brentq(rainfallRate):
+    Ks, presHead, thetaSat, thetaInit = 0.1, 11.0, 0.45, 0.15
+    suction = presHead*(thetaSat - thetaInit)
+    t = np.logspace(-6, 4, 41)
+
+    F, f = infil.greenAmptFast(t, Ks, presHead, thetaSat, thetaInit,
+                               rainfallRate)
+
+    if rainfallRate is None:
+        Fstart, tStart = 0.0, 0.0
+    elif rainfallRate > Ks:
+        Fstart = infil.Fpond(presHead, Ks, thetaSat, thetaInit, rainfallRate)
+        tStart = infil.timep(Fstart, rainfallRate)
+    else:
+        Fstart, tStart = np.inf, np.inf
+    for i, time in enumerate(t):
+        if time <= tStart:
+            expected = rainfallRate*time
+            rate = rainfallRate
+        else:
+            def residual(F):
+                return (F - Fstart - suction*(np.log1p(F/suction)
+                                              - np.log1p(Fstart/suction))
+                        - Ks*(time - tStart))
+            expected = brentq(residual, Fstart,
+                              Fstart + Ks*time + np.sqrt(2*suction*Ks*time)
+                              + 1, xtol=1e-300, rtol=1e-15)
+            rate = Ks*(1 + suction/expected)
+        assert F[i] == pytest.approx(expected, rel=1e-8)
+        assert f[i] == pytest.approx(rate, rel=1e-8)
+
+
+def _odeInfiltration(capacity, rainfall, timestep, nSteps, Finit=0.0):
+    """Integrates dF/dt = min(rainfall rate, infiltration capacity(F)) with
+    tight tolerances and returns F at the end of every timestep"""
+    from scipy.integrate import solve_ivp
+
+    def rate(t, F):
+        step = min(int(t/timestep), nSteps - 1)
+        return [min(rainfall[step], capacity(F[0]))]
+
+    F = [Finit]
+    for step in range(nSteps):
+        # one solve per timestep, so the rainfall rate is constant in each
+        solution = solve_ivp(rate, (step*timestep, (step + 1)*timestep), F,
+                             method="LSODA", rtol=1e-11, atol=1e-13,
+                             first_step=1e-9*timestep)
+        F = [solution.y[0, -1]]
+        yield F[0]
+
+
+def test_simulateGreenAmpt_matches_ode():
+    Ks, presHead, thetaSat, thetaInit = 0.1, 11.0, 0.45, 0.15
+    suction = presHead*(thetaSat - thetaInit)
+    timestep = 0.25
+    # light rain that never ponds, heavy rain that ponds partway through a
+    # timestep, then a break and more rain on a wetter soil
+    rainfall = np.array([0.05, 0.05, 0.6, 0.6, 0.6, 0.6, 0.6, 0.0, 0.3, 0.3,
+                         1.5, 0.02])
+
+    infiltration, cumulF, excess = infil.simulateGreenAmpt(
+        rainfall, timestep, Ks, presHead, thetaSat, thetaInit)
+
+    expected = list(_odeInfiltration(
+        lambda F: Ks*(1 + suction/F) if F > 0 else np.inf, rainfall,
+        timestep, rainfall.size))
+    np.testing.assert_allclose(cumulF, expected, rtol=1e-8)
+    np.testing.assert_allclose(infiltration + excess, rainfall*timestep,
+                               rtol=1e-12)
+
+
+
+
+def test_simulateGreenAmpt_writes_into_out(tmp_path):
+    rng = np.random.default_rng(5)
+    rainfall = rng.gamma(0.5, 1, (40, 3, 2))
+    Ks = np.array([0.05, 0.1, 0.5])[:, None]
+    expected = infil.simulateGreenAmpt(rainfall, 0.25, Ks, 11.0, 0.45, 0.15)
+
+    # a record in 2 chunks, written into memory-mapped .npy files
+    paths = [str(tmp_path/f"{name}.npy")
+             for name in ("infiltration", "cumulF", "excess")]
+    first = infil.simulateGreenAmpt(rainfall[:25], 0.25, Ks, 11.0, 0.45,
+                                    0.15, out=paths)
+    out = [np.empty_like(value[25:]) for value in expected]
+    second = infil.simulateGreenAmpt(rainfall[25:], 0.25, Ks, 11.0, 0.45,
+                                     0.15, Finit=first[1][-1], out=out)
+
+    assert all(result is value for result, value in zip(second, out))
+    for name, value, chunk in zip(paths, expected, second):
+        np.testing.assert_allclose(np.load(name), value[:25], rtol=1e-15)
+        np.testing.assert_allclose(chunk, value[25:], rtol=1e-12)
+
+    with pytest.raises(ValueError):
+        infil.simulateGreenAmpt(rainfall, 0.25, Ks, 11.0, 0.45, 0.15,
+                                out=[value.T for value in out])
+
+
+def test_simulateHorton_matches_ode():
+    f0, fc, k = 3.0, 0.5, 2.0
+    timestep = 0.1
+    # ponded from the start, a break, and rain that is lighter than the
+    # capacity at first and heavier later on
+    rainfall = np.array([5.0]*5 + [0.0]*5 + [0.8]*30)
+
+    infiltration, cumulF, excess = infil.simulateHorton(
+        rainfall, timestep, f0, fc, k)
+
+    # time compression: the capacity at F is the Horton capacity at the time
+    # it would have taken F to infiltrate at capacity
+    def capacity(F):
+        return infil.infilCapaHorton(f0, fc, k, infil._hortonTime(F, f0, fc,
+                                                                  k))
+    expected = np.array(list(_odeInfiltration(capacity, rainfall, timestep,
+                                              rainfall.size)))
+    # the timestep in which the capacity falls below the rainfall rate is
+    # split at the step's start, which is only first order accurate
+    np.testing.assert_allclose(cumulF, expected, rtol=1e-3)
+    np.testing.assert_allclose(infiltration + excess, rainfall*timestep,
+                               rtol=1e-12)
+
+
+def test_simulateHorton_writes_into_out():
+    rng = np.random.default_rng(6)
+    rainfall = rng.gamma(0.5, 2, (50, 4))
+    k = np.array([0.5, 1.0, 2.0, 4.0])
+    expected = infil.simulateHorton(rainfall, 0.1, 3.0, 0.5, k)
+
+    out = [np.empty(rainfall.shape) for _ in range(3)]
+    first = infil.simulateHorton(rainfall[:30], 0.1, 3.0, 0.5, k,
+                                 out=[value[:30] for value in out])
+    infil.simulateHorton(rainfall[30:], 0.1, 3.0, 0.5, k, Finit=first[1][-1],
+                         out=[value[30:] for value in out])
+
+    for value, result in zip(expected, out):
+        np.testing.assert_allclose(result, value, rtol=1e-10, atol=1e-14)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fitHorton_recovers_parameters(workers):
+    rng = np.random.default_rng(20)
+    f0 = rng.uniform(3, 10, 6)
+    fc = rng.uniform(0.2, 2, 6)
+    k = rng.uniform(0.5, 5, 6)
+    times = [np.sort(rng.uniform(0, 3, n)) for n in (8, 12, 20, 5, 30, 9)]
+    rates = [infil.infilCapaHorton(f0[i], fc[i], k[i], times[i])
+             for i in range(6)]
+
+    fit = infil.fitHorton(times, rates, workers=workers)
+
+    for value, expected in zip(fit, (f0, fc, k)):
+        np.testing.assert_allclose(value, expected, rtol=1e-6)
+    np.testing.assert_array_less(fit[3], 1e-8)
+
+
+def test_fitHorton_unfit_tests_are_nan():
+    t = np.linspace(0, 2, 15)
+    times = [t, np.array([0.0, 1.0, 1.0, 0.0]), t, np.array([0.5, 0.5])]
+    rates = [infil.infilCapaHorton(5.0, 1.0, 2.5, t),
+             np.array([3.0, 2.0, 2.0, 3.0]), np.full(15, 1.7), np.ones(2)]
+
+    with pytest.warns(RuntimeWarning, match="3 of 4 Horton fits"):
+        fit = infil.fitHorton(times, rates)
+
+    for value in fit:
+        assert np.isfinite(value[0])
+        assert np.all(np.isnan(value[1:]))
+    with pytest.raises(ValueError):
+        infil.fitHorton([], [])
+    with pytest.raises(ValueError):
+        infil.fitHorton([t], [t[:3]])
+
+
+@pytest.mark.parametrize("tol", [1e-1, 1e-2, 1e-3, 1e-4])
+def test_graphData_adaptive_error_within_tol(tol):
+    Ks, presHead, thetaSat, thetaInit = 0.44, 11.01, 0.412, 0.1
+    rainfallRate, duration = 3.0, 2.0
+    finalF = float(infil.stormEndBatch(Ks, presHead, thetaSat, thetaInit,
+                                       rainfallRate, duration)[0])
+    Fp = infil.Fpond(presHead, Ks, thetaSat, thetaInit, rainfallRate)
+    tp = infil.timep(Fp, rainfallRate)
+
+    curve = infil.graphData(finalF, rainfallRate, Ks, presHead, thetaSat,
+                            thetaInit, tol=tol)
+
+    # the curve on a dense grid of amounts infiltrated after ponding
+    F = np.linspace(Fp, finalF, 200001)[1:]
+    t = infil.time(tp, Ks, F, Fp, presHead, thetaSat, thetaInit)
+    rate = infil.infilRateGA(Ks, presHead, thetaSat, thetaInit, F, tp)
+    assert np.abs(np.interp(t, curve[0], curve[1]) - rate).max() <= tol
+    assert tp in curve[0]
+    assert curve[0, 0] == 0 and curve[0, -1] == pytest.approx(duration)
+    assert np.all(np.diff(curve[0]) > 0)
+
+    # the fixed 100 points need more points for the same accuracy
+    fixed = infil.graphData(finalF, rainfallRate, Ks, presHead, thetaSat,
+                            thetaInit)
+    fixedError = np.abs(np.interp(t, fixed[0], fixed[1]) - rate).max()
+    if tol >= fixedError:
+        assert curve.shape[1] < fixed.shape[1]
+
+
+def test_graphData_adaptive_without_ponding():
+    curve = infil.graphData(0.6, 0.3, 0.44, 11.01, 0.412, 0.1, tol=1e-3)
+    np.testing.assert_array_equal(curve, [[0, 2], [0.3, 0.3]])
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the opt-in call instrumentation: the environment switch and
+nested profiles
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from hydrology import infiltration as infil
+from hydrology import instrumentation
+from hydrology import streamflow as sf
+
+repoRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_nested_profiles_record_every_call():
+    original = infil.infilCapaHorton
+    t = np.linspace(0, 1, 50)
+    with instrumentation.profiled(infil) as outer:
+        infil.infilCapaHorton(3.0, 0.5, 2.0, t)
+        with instrumentation.profiled(infil, sf) as inner:
+            infil.infilCapaHorton(3.0, 0.5, 2.0, t)
+            sf.QfromP_CN(t, 80.0)
+        infil.infilCapaHorton(3.0, 0.5, 2.0, t)
+
+        assert outer.stats["infiltration.infilCapaHorton"]["calls"] == 3
+        assert inner.stats["infiltration.infilCapaHorton"]["calls"] == 1
+        assert inner.stats["streamflow.QfromP_CN"]["calls"] == 1
+        assert "streamflow.QfromP_CN" not in outer.stats
+        assert sf.QfromP_CN.__module__ == sf.__name__
+        assert not hasattr(sf.QfromP_CN, "__instrumented__")
+    assert infil.infilCapaHorton is original
+
+
+def test_profiles_closed_out_of_order():
+    original = infil.infilCapaHorton
+    first = instrumentation.Profile()
+    second = instrumentation.Profile()
+    firstOriginals = instrumentation.instrumentModule(infil, first)
+    secondOriginals = instrumentation.instrumentModule(infil, second)
+
+    instrumentation.uninstrumentModule(infil, firstOriginals, first)
+    infil.infilCapaHorton(3.0, 0.5, 2.0, 0.5)
+    instrumentation.uninstrumentModule(infil, secondOriginals, second)
+
+    assert "infiltration.infilCapaHorton" not in first.stats
+    assert second.stats["infiltration.infilCapaHorton"]["calls"] == 1
+    assert infil.infilCapaHorton is original
+
+
+@pytest.mark.parametrize("setting, instrumented",
+                         [("0", False), ("false", False), ("No", False),
+                          ("", False), ("report", True), ("1", True)])
+def test_environment_switch(setting, instrumented):
+    script = ("from hydrology import infiltration as infil; "
+              "print(hasattr(infil.infilCapaHorton, '__instrumented__')); "
+              "infil.infilCapaHorton(3.0, 0.5, 2.0, 0.5)")
+    environment = dict(os.environ, HYDROLOGY_PROFILE=setting,
+                       PYTHONPATH=repoRoot)
+    result = subprocess.run([sys.executable, "-c", script], cwd=repoRoot,
+                            env=environment, capture_output=True, text=True,
+                            check=True)
+
+    assert result.stdout.strip() == str(instrumented)
+    assert ("infiltration.infilCapaHorton" in result.stderr) == instrumented
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the bounded pool map shared by the pipeline, plotting, and
+uncertainty modules
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from hydrology import parallel
+
+
+def test_boundedMap_keeps_order_and_window():
+    lock = threading.Lock()
+    submitted = []
+
+    def square(value):
+        return value*value
+
+    def tasks():
+        for value in range(50):
+            with lock:
+                submitted.append(value)
+            yield value
+
+    consumed = 0
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        for result in parallel.boundedMap(pool, square, tasks(), 4):
+            assert result == consumed*consumed
+            consumed += 1
+            # no more than the window is ahead of the consumer
+            assert len(submitted) <= consumed + 4
+    assert consumed == 50
+
+
+def test_boundedMap_close_cancels_pending():
+    release = threading.Event()
+    started = []
+
+    def wait(value):
+        started.append(value)
+        release.wait(5)
+        return value
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        results = parallel.boundedMap(pool, wait, range(100), 5)
+        release.set()
+        assert next(results) == 0
+        results.close()
+    # only the tasks that were already submitted could have run
+    assert len(started) <= 6
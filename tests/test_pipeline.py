@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Checks that the rainfall-runoff pipeline gives the same results with one
+worker and with several
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import pipeline
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+
+def _tables(nBasins):
+    rng = np.random.default_rng(1)
+    unitHydrographs = pd.DataFrame({
+        f"u{i}": np.r_[rng.gamma(2, 1, 20 + i), np.full(5 - i, np.nan)]
+        for i in range(5)})
+    hyetographs = pd.DataFrame({
+        f"h{i}": np.r_[rng.uniform(0, 1, 8 + i), np.full(4 - i, np.nan)]
+        for i in range(4)})
+    manifest = pd.DataFrame({
+        "basin": [f"b{i}" for i in range(nBasins)],
+        "area": rng.uniform(10, 100, nBasins),
+        "CN": rng.uniform(50, 95, nBasins),
+        "unitHydrograph": [f"u{i % 5}" for i in range(nBasins)],
+        "hyetograph": [f"h{i % 4}" for i in range(nBasins)]})
+    return manifest, unitHydrographs, hyetographs
+
+
+def test_runPipeline_workers_match(tmp_path):
+    manifest, unitHydrographs, hyetographs = _tables(300)
+    serial = pipeline.runPipeline(manifest, unitHydrographs, hyetographs,
+                                  str(tmp_path/"serial.parquet"), workers=1,
+                                  chunkSize=20)
+    parallel = pipeline.runPipeline(manifest, unitHydrographs, hyetographs,
+                                    str(tmp_path/"parallel.parquet"),
+                                    workers=3, chunkSize=20)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert list(serial.index) == list(manifest["basin"])
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(tmp_path/"serial.parquet"),
+        pd.read_parquet(tmp_path/"parallel.parquet"))
+
+
+@pytest.mark.parametrize("column", ["u3", "h2"])
+def test_runPipeline_rejects_empty_series(tmp_path, column):
+    manifest, unitHydrographs, hyetographs = _tables(20)
+    table = unitHydrographs if column.startswith("u") else hyetographs
+    table[column] = np.nan
+
+    with pytest.raises(ValueError, match=column):
+        pipeline.runPipeline(manifest, unitHydrographs, hyetographs,
+                             str(tmp_path/"results.parquet"))
+
+
+def test_runPipeline_error_stops_the_workers(tmp_path):
+    manifest, unitHydrographs, hyetographs = _tables(100)
+    # the output can't be written, so the run fails after the pool starts
+    with pytest.raises(OSError):
+        pipeline.runPipeline(manifest, unitHydrographs, hyetographs,
+                             str(tmp_path/"missing"/"results.parquet"),
+                             workers=2, chunkSize=5)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the decimation of long series and of the batch page rendering
+"""
+
+import os
+import re
+
+import numpy as np
+import pytest
+
+from hydrology import plots
+
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+
+
+def test_decimate_keeps_peaks_and_ends():
+    rng = np.random.default_rng(21)
+    x = np.arange(10001.0)
+    y = np.cumsum(rng.normal(size=x.size))
+
+    xKept, yKept = plots.decimate(x, y, maxPoints=200)
+
+    assert xKept.size <= 200
+    assert np.all(np.diff(xKept) > 0)
+    assert yKept.max() == y.max() and yKept.min() == y.min()
+    np.testing.assert_array_equal(yKept, y[xKept.astype(int)])
+    shortX, shortY = plots.decimate(x[:50], y[:50], maxPoints=200)
+    np.testing.assert_array_equal(shortY, y[:50])
+
+
+@pytest.fixture
+def curves():
+    t = np.linspace(0, 5, 300)
+    return np.stack([np.stack((t, (k + 1)*np.exp(-t/(k + 1))))
+                     for k in range(7)])
+
+
+def test_renderBatch_png_same_with_workers(curves, tmp_path):
+    image = pytest.importorskip("matplotlib.image")
+    serial = plots.renderBatch(curves, str(tmp_path/"serial"), rows=2,
+                               cols=2, pageSize=(4, 3), dpi=40,
+                               pagesPerTask=1)
+    parallel = plots.renderBatch(curves, str(tmp_path/"parallel"), rows=2,
+                                 cols=2, pageSize=(4, 3), dpi=40, workers=2,
+                                 pagesPerTask=1)
+
+    assert [os.path.basename(path) for path in serial] == [
+        "page0001.png", "page0002.png"]
+    for first, second in zip(serial, parallel):
+        np.testing.assert_array_equal(image.imread(first),
+                                      image.imread(second))
+
+
+def test_renderBatch_pdf_pages(curves, tmp_path):
+    output = str(tmp_path/"sites.pdf")
+    paths = plots.renderBatch(curves, output, kind="unitHydrograph", rows=1,
+                              cols=2, pageSize=(4, 3), dpi=40, workers=2,
+                              pagesPerTask=1)
+
+    assert paths == [output]
+    with open(output, "rb") as file:
+        content = file.read()
+    # 7 sites at 2 per page, not counting the /Type /Pages tree
+    assert len(re.findall(rb"/Type\s*/Page(?![A-Za-z])", content)) == 4
+    with pytest.raises(ValueError):
+        plots.renderBatch(curves, output, kind="pie")
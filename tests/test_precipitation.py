@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the gridded Thiessen weights against a brute-force nearest-gauge
+assignment, and of the gridded interpolation and isohyetal EUD against
+per-cell calculations
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import precipitation as precip
+
+pytest.importorskip("scipy")
+
+
+@pytest.fixture
+def network():
+    rng = np.random.default_rng(13)
+    gaugeXY = rng.uniform(-2, 32, (9, 2))
+    mask = np.zeros((30, 25), dtype=bool)
+    mask[3:27, 2:24] = True
+    mask[20:, :10] = False
+    return gaugeXY, mask
+
+
+def _bruteForceWeights(gaugeXY, mask, active, cellSize, origin):
+    rows, cols = np.nonzero(mask)
+    cellXY = np.column_stack((origin[0] + cols*cellSize[0],
+                              origin[1] + rows*cellSize[1]))
+    distance = np.linalg.norm(cellXY[:, None] - gaugeXY[None], axis=2)
+    distance[:, ~active] = np.inf
+    nearest = np.argmin(distance, axis=1)
+    return np.bincount(nearest, minlength=len(gaugeXY))/nearest.size
+
+
+def test_thiessen_weights_match_brute_force(network):
+    gaugeXY, mask = network
+    cellSize, origin = (1.5, -1.0), (0.5, 30.0)
+    thiessen = precip.ThiessenNetwork(gaugeXY, mask, cellSize, origin,
+                                      nNearest=2)
+
+    rng = np.random.default_rng(14)
+    drops = [np.ones(9, dtype=bool)] + [rng.uniform(size=9) < 0.6
+                                        for _ in range(6)]
+    # dropping more gauges than nNearest, so some cells need a new search
+    drops.append(np.isin(np.arange(9), [0, 8]))
+    for active in drops:
+        if not active.any():
+            continue
+        expected = _bruteForceWeights(gaugeXY, mask, active, cellSize, origin)
+        np.testing.assert_allclose(thiessen.weights(active), expected)
+        np.testing.assert_allclose(thiessen.weights(np.flatnonzero(active)),
+                                   expected)
+    np.testing.assert_allclose(thiessen.areas().sum(), mask.sum()*1.5)
+    assert not thiessen.weights().flags.writeable
+    with pytest.raises(ValueError):
+        thiessen.weights(np.zeros(9, dtype=bool))
+
+
+def test_thiessen_seriesEUD_with_missing_readings(network):
+    gaugeXY, mask = network
+    thiessen = precip.ThiessenNetwork(gaugeXY, mask)
+    rng = np.random.default_rng(15)
+    readings = rng.gamma(1, 10, (50, 9))
+    readings[rng.uniform(size=readings.shape) < 0.2] = np.nan
+    readings[7] = np.nan
+
+    EUD = thiessen.seriesEUD(readings)
+
+    for time, reading in enumerate(readings):
+        working = ~np.isnan(reading)
+        if not working.any():
+            assert np.isnan(EUD[time])
+            continue
+        weights = _bruteForceWeights(gaugeXY, mask, working, (1.0, 1.0),
+                                     (0.0, 0.0))
+        assert EUD[time] == pytest.approx(
+            np.sum(weights[working]*reading[working]), rel=1e-12)
+
+
+def test_idw_matches_per_cell_formula(network):
+    gaugeXY, mask = network
+    weights = precip.interpolationWeights(gaugeXY, mask, nNeighbors=20,
+                                          power=2.0)
+    readings = np.random.default_rng(16).gamma(1, 10, (4, 9))
+
+    grid = precip.griddedPrecip(readings, weights)
+
+    rows, cols = np.nonzero(mask)
+    assert grid.shape == (4, rows.size)
+    for cell, (x, y) in enumerate(zip(cols, rows)):
+        inverse = 1/np.sum((gaugeXY - [x, y])**2, axis=1)
+        np.testing.assert_allclose(grid[:, cell],
+                                   readings @ inverse/inverse.sum(),
+                                   rtol=1e-12)
+
+
+def test_kriging_matches_per_cell_system(network):
+    gaugeXY, mask = network
+    # a gauge right on a cell center, where kriging has to return its reading
+    gaugeXY = np.vstack((gaugeXY, [[10.0, 10.0]]))
+    weights = precip.interpolationWeights(gaugeXY, mask, method="kriging",
+                                          nNeighbors=5, chunkSize=37)
+    readings = np.random.default_rng(17).gamma(1, 10, 10)
+
+    grid = precip.griddedPrecip(readings, weights)
+
+    rows, cols = np.nonzero(mask)
+    for cell, (x, y) in enumerate(zip(cols, rows)):
+        distance = np.linalg.norm(gaugeXY - [x, y], axis=1)
+        near = np.argsort(distance)[:5]
+        system = np.ones((6, 6))
+        system[:5, :5] = np.linalg.norm(gaugeXY[near, None]
+                                        - gaugeXY[None, near], axis=2)
+        system[5, 5] = 0
+        cellWeights = np.linalg.solve(system,
+                                      np.r_[distance[near], 1])[:5]
+        assert grid[cell] == pytest.approx(cellWeights @ readings[near],
+                                           rel=1e-9)
+    onGauge = np.flatnonzero((cols == 10) & (rows == 10))
+    assert grid[onGauge[0]] == pytest.approx(readings[-1], rel=1e-9)
+    with pytest.raises(ValueError):
+        precip.interpolationWeights(gaugeXY, mask, method="spline")
+
+
+def test_isohyetalEUD_matches_band_loop():
+    rng = np.random.default_rng(18)
+    grid = rng.uniform(0, 60, (3, 500))
+    isohyetes = np.array([10.0, 20.0, 35.0, 50.0])
+
+    bandAreas, EUD = precip.isohyetalEUD(grid, isohyetes, cellArea=0.25)
+
+    bounds = np.r_[-np.inf, isohyetes, np.inf]
+    for time in range(3):
+        total = 0.0
+        for band in range(5):
+            inBand = ((grid[time] >= bounds[band])
+                      & (grid[time] < bounds[band + 1]))
+            area = 0.25*inBand.sum()
+            assert bandAreas[time, band] == area
+            total += precip.isohyetalSinglesEUD(
+                isohyetes[max(band - 1, 0):band + 1], area, 125.0)
+        assert EUD[time] == pytest.approx(total, rel=1e-12)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Checks that the texture raster lookups give the same parameters as looking up
+each cell in the table one at a time
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import infiltration as infil
+from hydrology import soils
+
+
+def test_textureParameters_matches_cell_lookup():
+    rng = np.random.default_rng(0)
+    textures = rng.integers(-2, len(soils.textureNames) + 2, (30, 40))
+    textures[0, :5] = 99
+
+    parameters = soils.textureParameters(textures, nodata=99)
+
+    for index, code in np.ndenumerate(textures):
+        for row, name in enumerate(soils.parameterNames):
+            if 0 <= code < len(soils.textureNames):
+                assert parameters[name][index] == soils.textureTable[row,
+                                                                      code]
+            else:
+                assert np.isnan(parameters[name][index])
+
+
+def test_greenAmptParameters_of_named_textures():
+    codes = np.array([soils.textureCode("Silt Loam"),
+                      soils.textureCode("clay ")])
+    Ks, presHead, thetaSat, thetaInit = soils.greenAmptParameters(codes, 0.3)
+
+    np.testing.assert_allclose(Ks, [0.65, 0.03])
+    np.testing.assert_allclose(presHead, [16.68, 31.63])
+    np.testing.assert_allclose(thetaSat, [0.501, 0.475])
+    # residual + effective saturation*effective porosity
+    np.testing.assert_allclose(thetaInit, [0.015 + 0.3*0.486,
+                                           0.090 + 0.3*0.385])
+    with pytest.raises(ValueError):
+        soils.textureCode("peat")
+
+
+def test_nodata_cells_give_nan_in_stormEndBatch():
+    textures = np.array([[3, 7], [-9999, 10]])
+    parameters = soils.greenAmptParameters(textures, 0.2, nodata=-9999)
+    results = infil.stormEndBatch(*parameters, 2.0, 3.0)
+
+    for result in results:
+        result = np.asarray(result)
+        assert np.isnan(result[1, 0])
+        assert not np.isnan(np.delete(result.ravel(), 2)).any()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the storm hydrograph convolution, unit hydrograph fitting, Curve
+Number runoff, and baseflow filters against simple loops
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import streamflow as sf
+
+
+def _lagAndAdd(unitHydro, excessRain, pulseSpacing):
+    """The hand calculation: one lagged, scaled copy of the unit hydrograph
+    for every pulse of effective rainfall"""
+    Q = np.zeros((len(excessRain) - 1)*pulseSpacing + len(unitHydro))
+    for pulse, depth in enumerate(excessRain):
+        start = pulse*pulseSpacing
+        Q[start:start + len(unitHydro)] += depth*unitHydro
+    return Q
+
+
+@pytest.mark.parametrize("pulseSpacing", [1, 3])
+@pytest.mark.parametrize("method", ["direct", "fft", "auto"])
+def test_stormHydrograph_matches_lag_and_add(method, pulseSpacing):
+    rng = np.random.default_rng(3)
+    unitHydro = rng.gamma(2, 1, (2, 1, 150))
+    excessRain = rng.uniform(0, 2, (4, 90))
+
+    Q = sf.stormHydrograph(unitHydro, excessRain, baseflow=5.0,
+                           pulseSpacing=pulseSpacing, method=method)
+
+    assert Q.shape == (2, 4, 89*pulseSpacing + 150)
+    for basin in range(2):
+        for storm in range(4):
+            expected = _lagAndAdd(unitHydro[basin, 0], excessRain[storm],
+                                  pulseSpacing) + 5.0
+            np.testing.assert_allclose(Q[basin, storm], expected, rtol=1e-12,
+                                       atol=1e-12*expected.max())
+
+
+def test_stormHydrograph_direct_matches_fft():
+    rng = np.random.default_rng(4)
+    unitHydro = rng.gamma(2, 1, 400)
+    excessRain = rng.uniform(0, 2, (3, 1000))
+
+    direct = sf.stormHydrograph(unitHydro, excessRain, method="direct")
+    fft = sf.stormHydrograph(unitHydro, excessRain, method="fft")
+    np.testing.assert_allclose(fft, direct, rtol=1e-12,
+                               atol=1e-12*direct.max())
+
+
+@pytest.mark.parametrize("nonNegative", [True, False])
+def test_deriveUnitHydrographs_round_trip(nonNegative):
+    ordinates = np.arange(24)
+    truths = [ordinates**2*np.exp(-ordinates/3.0),
+              ordinates*np.exp(-ordinates/5.0)]
+    rng = np.random.default_rng(8)
+
+    basinEvents = []
+    for truth in truths:
+        events = []
+        for _ in range(3):
+            excessRain = rng.uniform(0, 2, 6)
+            flow = sf.stormHydrograph(truth, excessRain, pulseSpacing=2)
+            events.append((excessRain, flow))
+        basinEvents.append(events)
+
+    unitHydros, diagnostics = sf.deriveUnitHydrographs(
+        basinEvents, 24, pulseSpacing=2, nonNegative=nonNegative)
+
+    np.testing.assert_allclose(unitHydros, truths, rtol=1e-8,
+                               atol=1e-10*np.max(truths))
+    np.testing.assert_array_equal(diagnostics["events"], [3, 3])
+    assert np.all(diagnostics["nse"] > 1 - 1e-12)
+
+
+def test_deriveUnitHydrographs_smoothing_is_scale_free():
+    rng = np.random.default_rng(9)
+    truth = np.r_[0, 1, 3, 5, 4, 3, 2, 1.4, 1, 0.6, 0.3, 0.1]
+    excessRain = rng.uniform(0.5, 1.5, 4)
+    flow = (sf.stormHydrograph(truth, excessRain)
+            + rng.normal(0, 0.05, 15))
+
+    # the same storm in cm and in mm, with the unit hydrograph per mm
+    perCm = sf.deriveUnitHydrographs([[(excessRain, flow)]], 12,
+                                     smoothing=0.5)[0]
+    perMm = sf.deriveUnitHydrographs([[(10*excessRain, flow)]], 12,
+                                     smoothing=0.5)[0]
+    np.testing.assert_allclose(10*perMm, perCm, rtol=1e-9)
+
+
+def test_deriveUnitHydrographs_rejects_too_few_values():
+    with pytest.raises(ValueError, match="basin 0"):
+        sf.deriveUnitHydrographs([[(np.ones(2), np.ones(5))]], 12)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_QfromP_CNgrid_matches_QfromP_CN(workers, tmp_path):
+    rng = np.random.default_rng(10)
+    CN = rng.uniform(40, 98, (37, 23))
+    P = rng.gamma(0.8, 1.5, (5, 37, 23))
+    np.save(tmp_path/"P.npy", P)
+
+    Q = sf.QfromP_CNgrid(str(tmp_path/"P.npy"), CN,
+                         out=str(tmp_path/"Q.npy"), tileSize=100,
+                         workers=workers)
+
+    expected = sf.QfromP_CN(P, CN)
+    np.testing.assert_allclose(Q, expected, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(np.load(tmp_path/"Q.npy"), expected,
+                               rtol=1e-12, atol=1e-15)
+    # no runoff until the initial abstraction is satisfied
+    assert np.all(Q[P <= 0.2*(1000/CN - 10)] == 0)
+
+
+def test_QfromP_CNgrid_checks_out():
+    P = np.ones((2, 4, 3))
+    with pytest.raises(ValueError):
+        sf.QfromP_CNgrid(P, np.full((4, 3), 80.0), out=np.empty((2, 3, 4)))
+    with pytest.raises(ValueError):
+        sf.QfromP_CNgrid(P, np.full((4, 3), 80.0),
+                         out=np.empty((2, 3, 4)).transpose(0, 2, 1))
+
+
+def test_scenarioRunoff_matches_parcel_loop():
+    rng = np.random.default_rng(11)
+    area = rng.uniform(1, 50, 200)
+    CN = rng.choice([55.0, 61.0, 74.0, 80.0, 98.0], 200)
+    scenario = rng.choice([3, 7, 9], 200)
+    P = np.array([0.5, 2.0, 5.0])
+
+    scenarioIds, volume, percentChange = sf.scenarioRunoff(
+        area, CN, scenario, P, baseline=7)
+
+    np.testing.assert_array_equal(scenarioIds, [3, 7, 9])
+    for row, scenarioId in enumerate(scenarioIds):
+        for column, depth in enumerate(P):
+            expected = sum(parcelArea*sf.QfromP_CN(depth, parcelCN)/12
+                           for parcelArea, parcelCN, parcelScenario
+                           in zip(area, CN, scenario)
+                           if parcelScenario == scenarioId)
+            assert volume[row, column] == pytest.approx(expected, rel=1e-12)
+    np.testing.assert_allclose(percentChange,
+                               100*(volume/volume[1] - 1), rtol=1e-12,
+                               atol=1e-12)
+
+
+def test_scenarioRunoff_baseline_without_runoff():
+    # only the paved parcels of scenario 2 give runoff from 0.3 inches
+    _, volume, percentChange = sf.scenarioRunoff(
+        [10.0, 10.0], [60.0, 98.0], [1, 2], [0.3, 4.0])
+
+    assert volume[0, 0] == 0
+    assert np.isnan(percentChange[1, 0])
+    assert np.all(np.isfinite(percentChange[:, 1]))
+    with pytest.raises(ValueError):
+        sf.scenarioRunoff([10.0], [60.0], [1], 2.0, baseline=5)
+
+
+def _streamflow(nGauges, nSteps, seed=0):
+    """Storm peaks with recessions on a slowly changing baseflow"""
+    rng = np.random.default_rng(seed)
+    storms = rng.exponential(20, (nGauges, nSteps))*(rng.random(
+        (nGauges, nSteps)) < 0.03)
+    recession = np.exp(-np.arange(60)/8)
+    quickflow = np.array([np.convolve(gauge, recession)[:nSteps]
+                          for gauge in storms])
+    return 2 + np.sin(np.arange(nSteps)/200) + quickflow
+
+
+def _lyneHollickLoop(Q, alpha):
+    """The filter one time step at a time, with the quickflow limited to
+    between 0 and the streamflow before the next step"""
+    quickflow = np.zeros_like(Q)
+    for t in range(1, len(Q)):
+        step = alpha*quickflow[t - 1] + (1 + alpha)/2*(Q[t] - Q[t - 1])
+        quickflow[t] = min(max(step, 0.0), Q[t])
+    return Q - quickflow
+
+
+def _eckhardtLoop(Q, alpha, BFImax):
+    """The filter one time step at a time, starting from the steady state
+    and with the baseflow limited to the streamflow before the next step"""
+    decay = (1 - BFImax)*alpha/(1 - alpha*BFImax)
+    gain = (1 - alpha)*BFImax/(1 - alpha*BFImax)
+    baseflow = np.empty_like(Q)
+    previous = gain*Q[0]/(1 - decay)
+    for t in range(len(Q)):
+        baseflow[t] = previous = min(decay*previous + gain*Q[t], Q[t])
+    return baseflow
+
+
+def test_baseflow_filters_match_step_loop():
+    Q = _streamflow(3, 3000)
+
+    lyneHollick, _ = sf.lyneHollickBaseflow(Q, 0.925)
+    eckhardt, _ = sf.eckhardtBaseflow(Q, 0.98, 0.8)
+
+    for gauge in range(len(Q)):
+        np.testing.assert_allclose(lyneHollick[gauge],
+                                   _lyneHollickLoop(Q[gauge], 0.925),
+                                   rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(eckhardt[gauge],
+                                   _eckhardtLoop(Q[gauge], 0.98, 0.8),
+                                   rtol=1e-12, atol=1e-12)
+    # the limits were reached, so they had to be applied in the recursion
+    assert (eckhardt == Q).any() and (lyneHollick == Q).any()
+    assert (lyneHollick >= 0).all() and (lyneHollick <= Q).all()
+
+
+@pytest.mark.parametrize("separate", [sf.lyneHollickBaseflow,
+                                      sf.eckhardtBaseflow])
+def test_baseflow_filters_carry_state_between_chunks(separate):
+    Q = _streamflow(2, 3000, seed=1)
+    whole, wholeState = separate(Q)
+
+    chunks, state = [], None
+    for start in range(0, Q.shape[-1], 700):
+        chunk, state = separate(Q[:, start:start + 700], zi=state)
+        chunks.append(chunk)
+
+    np.testing.assert_allclose(np.concatenate(chunks, axis=-1), whole,
+                               rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(state, wholeState, rtol=1e-12)
+
+
+def _routeReachByReach(downstream, lateralInflow, K, X, dt):
+    """Routes each reach in its listed order with the Muskingum recursion,
+    one time step at a time, adding its outflow to the reach below"""
+    inflow = np.array(lateralInflow, dtype=float)
+    outflow = np.empty_like(inflow)
+    for reach in range(len(downstream)):
+        C0, C1, C2 = sf.muskingumCoefficients(K[reach], X[reach], dt)
+        outflow[reach, 0] = inflow[reach, 0]
+        for t in range(1, inflow.shape[1]):
+            outflow[reach, t] = (C0*inflow[reach, t]
+                                 + C1*inflow[reach, t - 1]
+                                 + C2*outflow[reach, t - 1])
+        if downstream[reach] >= 0:
+            inflow[downstream[reach]] += outflow[reach]
+    return outflow
+
+
+@pytest.mark.parametrize("method", ["vectorized", "lfilter", "auto"])
+def test_routeNetwork_matches_reach_loop(method):
+    rng = np.random.default_rng(2)
+    nReaches = 150
+    # a random tree: every reach flows into a later reach, or out
+    downstream = np.array([rng.integers(reach + 1, nReaches)
+                           if reach < nReaches - 3 else -1
+                           for reach in range(nReaches)])
+    lateralInflow = rng.gamma(2, 5, (nReaches, 300))
+    K = rng.uniform(1, 3, nReaches)
+    X = rng.uniform(0, 0.3, nReaches)
+
+    outflow = sf.routeNetwork(downstream, lateralInflow, K, X, 1.0,
+                              method=method)
+
+    np.testing.assert_allclose(
+        outflow, _routeReachByReach(downstream, lateralInflow, K, X, 1.0),
+        rtol=1e-10)
+    # routing stores but doesn't lose water
+    outlets = downstream < 0
+    assert outflow[outlets].sum() == pytest.approx(lateralInflow.sum(),
+                                                   rel=0.05)
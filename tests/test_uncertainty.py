@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the Monte Carlo simulation of uncertain Green-Ampt parameters:
+known parameters give the analytical ponding time, the results don't depend
+on the number of workers, and stopping early doesn't queue every chunk
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import uncertainty
+
+distributions = {"Ks": ("lognormal", np.log(0.4), 0.5),
+                 "presHead": ("uniform", 5, 15),
+                 "thetaSat": 0.45,
+                 "thetaInit": ("normal", 0.15, 0.03)}
+
+
+def test_known_parameters_give_ponding_time():
+    known = {"Ks": 0.4, "presHead": 11.0, "thetaSat": 0.45, "thetaInit": 0.1}
+    summary = uncertainty.greenAmptMonteCarlo(known, 2.0, 3.0, 1000,
+                                              chunkSize=300, seed=1)
+    # tp = Ks*presHead*(thetaSat - thetaInit)/(i*(i - Ks))
+    assert summary["valid"] == 1000
+    assert summary["pondingProbability"] == 1.0
+    assert np.isclose(summary["pondingTime"]["mean"],
+                      0.4*11*0.35/(2.0*1.6))
+    assert np.isclose(summary["finalF"]["mean"] + summary["runoff"]["mean"],
+                      2.0*3.0)
+
+
+def test_workers_give_same_summary():
+    serial = uncertainty.greenAmptMonteCarlo(distributions, 2.0, 3.0, 5000,
+                                             chunkSize=1000, seed=7)
+    pooled = uncertainty.greenAmptMonteCarlo(distributions, 2.0, 3.0, 5000,
+                                             chunkSize=1000, seed=7,
+                                             workers=2)
+    for key in ("valid", "rejected", "ponded", "pondingProbability"):
+        assert serial[key] == pooled[key]
+    for name in ("finalF", "runoff", "pondingTime"):
+        assert serial[name]["mean"] == pytest.approx(pooled[name]["mean"])
+        np.testing.assert_array_equal(serial[name]["quantiles"],
+                                      pooled[name]["quantiles"])
+
+
+def test_stopping_early_only_submits_a_window(monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+
+    submitted = []
+    submit = ProcessPoolExecutor.submit
+
+    def countingSubmit(pool, *args, **kwargs):
+        submitted.append(args[1:])
+        return submit(pool, *args, **kwargs)
+
+    monkeypatch.setattr(ProcessPoolExecutor, "submit", countingSubmit)
+    runs = uncertainty.monteCarloRuns(distributions, 2.0, 3.0, 4*10**6,
+                                      chunkSize=10000, seed=3, workers=2)
+    first = next(runs)
+    runs.close()
+    assert first["valid"] + first["rejected"] == 10000
+    # 2 chunks per worker are queued, not all 400
+    assert len(submitted) <= 5
+
+
+def test_nRealizations_must_be_positive():
+    with pytest.raises(ValueError):
+        next(uncertainty.monteCarloRuns(distributions, 2.0, 3.0, 0))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the gridded bucket model against a cell by cell water balance
+written with the textbook functions, and of its checkpoints
+"""
+
+import numpy as np
+import pytest
+
+from hydrology import evaporation as evap
+from hydrology import streamflow as sf
+from hydrology import waterBalance as wb
+
+nDays = 60
+shape = (3, 4)
+
+
+@pytest.fixture
+def weather():
+    rng = np.random.default_rng(7)
+    precip = rng.gamma(0.4, 20, (nDays,) + shape)
+    precip[rng.uniform(size=precip.shape) < 0.5] = 0
+    temp = rng.uniform(5, 30, nDays)
+    dewpoint = temp - rng.uniform(1, 10, nDays)
+    windSpeed = rng.uniform(0, 15, nDays)
+    return precip, temp, dewpoint, windSpeed
+
+
+def _model():
+    CN = np.linspace(55, 95, np.prod(shape)).reshape(shape)
+    return wb.BucketModel(CN, 0.3, 0.1, 500.0, initialStorage=100.0)
+
+
+def test_bucketModel_matches_cell_by_cell(weather):
+    precip, temp, dewpoint, windSpeed = weather
+    model = _model()
+    model.run(precip, temp, dewpoint, windSpeed)
+
+    CN = np.linspace(55, 95, np.prod(shape)).reshape(shape)
+    for index in np.ndindex(shape):
+        storage = 100.0
+        totals = dict.fromkeys(wb.fluxNames, 0.0)
+        for day in range(nDays):
+            P = precip[(day,) + index]
+            runoff = 25.4*sf.QfromP_CN(P/25.4, CN[index])
+            storage += P - runoff
+            evapo = 10*max(evap.meyerEvaporation(
+                evap.vaporPressure(temp[day]),
+                evap.vaporPressure(dewpoint[day]), windSpeed[day]), 0)
+            available = min(max(storage - 50.0, 0), 100.0)
+            evapo = min(evapo*available/100.0, available)
+            storage -= evapo
+            drainage = max(storage - 150.0, 0)
+            storage -= drainage
+            for name, flux in zip(wb.fluxNames, (P, runoff, P - runoff, evapo,
+                                                 drainage)):
+                totals[name] += flux
+
+        assert model.storage[index] == pytest.approx(storage, rel=1e-10)
+        for name in wb.fluxNames:
+            assert model.totals[name][index] == pytest.approx(
+                totals[name], rel=1e-10, abs=1e-9)
+
+
+def test_bucketModel_mass_balance(weather):
+    model = _model()
+    model.run(*weather)
+
+    totals = model.totals
+    np.testing.assert_allclose(
+        totals["precipitation"] - totals["runoff"] - totals["evaporation"]
+        - totals["drainage"], model.storage - 100.0, atol=1e-9)
+    assert np.all(model.storage >= model.minStorage - 1e-12)
+    assert np.all(model.storage <= model.maxStorage + 1e-12)
+
+
+def test_bucketModel_resumes_from_checkpoint(weather, tmp_path):
+    precip, temp, dewpoint, windSpeed = weather
+    checkpoint = str(tmp_path/"bucket.npz")
+    full = _model().run(precip, temp, dewpoint, windSpeed)
+
+    # a run that was stopped after 25 days, with a checkpoint every 10
+    stopped = _model()
+    stopped.run(precip[:25], temp[:25], dewpoint[:25], windSpeed[:25],
+                checkpoint=checkpoint, checkpointEvery=10)
+    resumed = _model()
+    series = resumed.run(precip, temp, dewpoint, windSpeed,
+                         checkpoint=checkpoint, checkpointEvery=10)
+
+    np.testing.assert_array_equal(series, full)
+    with pytest.raises(ValueError):
+        _model().run(precip[:30], temp[:30], dewpoint[:30], windSpeed[:30],
+                     checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        wb.BucketModel(50.0, 0.3, 0.1, 500.0).loadCheckpoint(checkpoint)
+
+
+def test_bucketModel_needs_available_capacity():
+    fieldCapacity = np.full(shape, 0.3)
+    fieldCapacity[1, 2] = 0.1
+    with pytest.raises(ValueError, match="1 of 12 cells"):
+        wb.BucketModel(70.0, fieldCapacity, 0.1, 500.0)
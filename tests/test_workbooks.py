@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the cached workbook loader: the cache is used while the workbook is
+unchanged and rebuilt once it changes
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from hydrology import workbooks
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("openpyxl")
+
+
+def _writeWorkbook(path, scale):
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"time": np.arange(5.0),
+                      "rate": scale*np.linspace(1, 2, 5)}).to_excel(
+            writer, sheet_name="Sheet1", index=False)
+        pd.DataFrame({"gauge": ["a", "b"], "area": [1.5, 2.5]}).to_excel(
+            writer, sheet_name="Areas", index=False)
+
+
+def test_cache_is_reused_and_invalidated(tmp_path, monkeypatch):
+    path = str(tmp_path/"Homework.xlsx")
+    _writeWorkbook(path, 1.0)
+
+    first = workbooks.readWorkbook(path, arrowBacked=False)
+    assert list(first) == ["Sheet1", "Areas"]
+    np.testing.assert_allclose(first["Sheet1"]["rate"], np.linspace(1, 2, 5))
+
+    # while the workbook is unchanged, it isn't parsed again
+    def failingRead(*args, **kwargs):
+        raise AssertionError("the workbook was parsed again")
+    with monkeypatch.context() as patch:
+        patch.setattr(pd, "read_excel", failingRead)
+        again = workbooks.readWorkbook(path, sheetName="Areas",
+                                       arrowBacked=False)
+        # touching the workbook without changing it keeps the cache too
+        os.utime(path, ns=(0, 10**18))
+        workbooks.readWorkbook(path)
+    pd.testing.assert_frame_equal(again, first["Areas"])
+
+    # an edited workbook is parsed and cached again, and the old sheets are
+    # deleted
+    _writeWorkbook(path, 3.0)
+    edited = workbooks.readWorkbook(path, sheetName="Sheet1",
+                                    arrowBacked=False)
+    np.testing.assert_allclose(edited["rate"], 3*np.linspace(1, 2, 5))
+    folder = workbooks._cacheFolder(path)
+    assert sorted(os.listdir(folder)) == sorted(
+        ["manifest.json", workbooks._fileHash(path)])
+
+
+def test_uncacheable_workbook_is_parsed(tmp_path):
+    path = str(tmp_path/"Mixed.xlsx")
+    pd.DataFrame({"value": [1.0, "text", 3.0]}).to_excel(path, index=False)
+
+    sheet = workbooks.readWorkbook(path, sheetName="Sheet1")
+
+    assert list(sheet["value"]) == [1.0, "text", 3.0]
+    assert not os.path.exists(os.path.join(workbooks._cacheFolder(path),
+                                           "manifest.json"))
+
+
+def test_sheets_deleted_by_another_process(tmp_path):
+    path = str(tmp_path/"Homework.xlsx")
+    _writeWorkbook(path, 1.0)
+    expected = workbooks.readWorkbook(path, arrowBacked=False)
+
+    # another process deleted the sheets after this one read the manifest
+    folder = workbooks._cacheFolder(path)
+    manifest = workbooks._cacheIsCurrent(path, folder)
+    shutil.rmtree(os.path.join(folder, manifest["sha256"]))
+    assert workbooks._readCache(folder, manifest, False) is None
+
+    sheets = workbooks.readWorkbook(path, arrowBacked=False)
+    for name in expected:
+        pd.testing.assert_frame_equal(sheets[name], expected[name])
+    assert os.path.isdir(os.path.join(folder, manifest["sha256"]))